@@ -1,27 +1,33 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal
 
 from app.models.user import User
+from app.schemas.user_schema import UserOut
+from app.auth.user_cache import user_cache
+from app.auth.password_pool import pwd_context, password_hasher
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 # Configuration - move these to environment variables in production
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT Bearer token scheme
 security = HTTPBearer()
 
@@ -36,6 +42,16 @@ class AuthService:
         """Verify a password against its hash"""
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password on the bcrypt worker pool (503 when saturated)"""
+        return await password_hasher.hash(password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the bcrypt worker pool (503 when saturated)"""
+        return await password_hasher.verify(plain_password, hashed_password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         """Create a JWT access token"""
@@ -64,9 +80,13 @@ class AuthService:
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+    db: Session = Depends(get_read_db)
+) -> UserOut:
+    """Get current authenticated user from JWT token.
+
+    The resolved user is cached per (user id, token), so warm requests never
+    touch the database; it is only queried on a cache miss.
+    """
     token = credentials.credentials
     payload = AuthService.verify_token(token)
     
@@ -78,7 +98,12 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user_id = int(user_id)
+    cached_user = user_cache.get(user_id, token)
+    if cached_user is not None:
+        return cached_user
+    
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -86,9 +111,11 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    current_user = UserOut.model_validate(user)
+    user_cache.set(user_id, token, current_user, payload.get("exp"))
+    return current_user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserOut = Depends(get_current_user)) -> UserOut:
     """Get current active user"""
     return current_user
 
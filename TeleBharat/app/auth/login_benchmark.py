@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Seeds a throwaway SQLite database and drives the app in-process, so the
+# logins and the other requests share one event loop as in a uvicorn worker.
+# Only a path here: the pool's spawned workers import this module too.
+DATABASE_PATH = os.path.join(tempfile.gettempdir(), f"login-benchmark-{os.getpid()}.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+
+import httpx
+from app.auth.password_pool import PASSWORD_HASH_WORKERS, hash_password, password_hasher, verify_password
+from app.database import engine
+from app.main import create_app
+from app.models.user import User
+
+PASSWORD = "correct horse battery staple"
+PROBE_INTERVAL_SECONDS = 0.01
+
+def seed(users: int):
+    """``users`` users sharing one bcrypt hash, so seeding costs a single hash"""
+    password_hash = hash_password(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": password_hash, "role": "patient"}
+            for index in range(1, users + 1)
+        ])
+
+async def verify_inline(plain_password: str, hashed_password: str) -> bool:
+    """What login did before the pool: bcrypt straight on the event loop"""
+    return verify_password(plain_password, hashed_password)
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> Dict:
+    """Fire ``logins`` logins, ``concurrency`` at a time, while probing /health"""
+    gate = asyncio.Semaphore(concurrency)
+    statuses: Dict[int, int] = {}
+    probes: List[float] = []
+    done = asyncio.Event()
+
+    async def login(index: int):
+        async with gate:
+            response = await client.post("/users/login", data={"username": f"person{index % logins + 1}@example.com", "password": PASSWORD})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            (await client.get("/health")).raise_for_status()
+            probes.append(time.perf_counter() - started)
+            await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(login(index) for index in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    return {"elapsed": elapsed, "statuses": statuses, "probes": probes}
+
+async def run(logins: int, concurrency: int, workers: int) -> int:
+    app = create_app()
+    modes = (
+        (f"process pool (workers={workers})", workers, password_hasher.verify),
+        ("thread pool", 0, password_hasher.verify),
+        ("inline on the event loop", 0, verify_inline),
+    )
+    results = []
+    # Keep the app's startup messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        async with app.router.lifespan_context(app):
+            seed(logins)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=300) as client:
+                for name, mode_workers, verify in modes:
+                    password_hasher.shutdown()
+                    password_hasher.max_workers = mode_workers
+                    password_hasher.verify = verify
+                    # Start the workers before the clock does
+                    await password_hasher.hash(PASSWORD)
+                    results.append((name, await storm(client, logins, concurrency)))
+                    del password_hasher.verify
+
+    print(f"{logins} logins, {concurrency} at a time, with /health requested every {PROBE_INTERVAL_SECONDS * 1000:.0f}ms alongside")
+    print(f"{'mode':28} {'logins/s':>9} {'ok':>5} {'503':>5} {'health p50':>11} {'health p99':>11} {'health max':>11}")
+    failed = False
+    for name, result in results:
+        statuses, probes = result["statuses"], result["probes"]
+        print(f"{name:28} {statuses.get(200, 0) / result['elapsed']:9.2f} {statuses.get(200, 0):>5} {statuses.get(503, 0):>5} "
+              f"{percentile(probes, 0.5) * 1000:9.2f}ms {percentile(probes, 0.99) * 1000:9.2f}ms {max(probes, default=0) * 1000:9.2f}ms")
+        unexpected = {code: count for code, count in statuses.items() if code not in (200, 503)}
+        if unexpected:
+            print(f"❌ {name}: unexpected responses {unexpected}")
+            failed = True
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare login throughput and API responsiveness with and without the bcrypt process pool")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=max(PASSWORD_HASH_WORKERS, 1), help="process pool size")
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run(args.logins, args.concurrency, args.workers))
+    finally:
+        if os.path.exists(DATABASE_PATH):
+            os.remove(DATABASE_PATH)
+
+if __name__ == "__main__":
+    sys.exit(main())
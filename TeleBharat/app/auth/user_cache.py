@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.schemas.user_schema import UserOut
+
+# Cache configuration - override through environment variables
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_REDIS_URL = os.getenv("AUTH_CACHE_REDIS_URL")
+
+def token_fingerprint(token: str) -> str:
+    """Hash a bearer token so raw credentials are never used as cache keys"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class UserCacheBackend:
+    """Storage interface for authenticated-user snapshots"""
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[UserOut]:
+        raise NotImplementedError
+
+    def set(self, user_id: int, fingerprint: str, user: UserOut, ttl: float):
+        raise NotImplementedError
+
+    def invalidate_user(self, user_id: int):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class InMemoryUserCacheBackend(UserCacheBackend):
+    """Bounded per-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, UserOut]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[UserOut]:
+        key = (user_id, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, user_id: int, fingerprint: str, user: UserOut, ttl: float):
+        key = (user_id, fingerprint)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(fingerprint)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for fingerprint in self._by_user.pop(user_id, set()):
+                self._entries.pop((user_id, fingerprint), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key: Tuple[int, str]):
+        self._entries.pop(key, None)
+        fingerprints = self._by_user.get(key[0])
+        if fingerprints is not None:
+            fingerprints.discard(key[1])
+            if not fingerprints:
+                del self._by_user[key[0]]
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisUserCacheBackend(UserCacheBackend):
+    """Shared backend so every worker sees the same entries and invalidations.
+
+    Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "auth:user"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _entry_key(self, user_id: int, fingerprint: str) -> str:
+        return f"{self.prefix}:{user_id}:{fingerprint}"
+
+    def _index_key(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[UserOut]:
+        raw = self.client.get(self._entry_key(user_id, fingerprint))
+        if raw is None:
+            return None
+        return UserOut.model_validate_json(raw)
+
+    def set(self, user_id: int, fingerprint: str, user: UserOut, ttl: float):
+        ttl_ms = max(int(ttl * 1000), 1)
+        entry_key = self._entry_key(user_id, fingerprint)
+        pipe = self.client.pipeline()
+        pipe.set(entry_key, user.model_dump_json(), px=ttl_ms)
+        pipe.sadd(self._index_key(user_id), entry_key)
+        pipe.pexpire(self._index_key(user_id), ttl_ms)
+        pipe.execute()
+
+    def invalidate_user(self, user_id: int):
+        index_key = self._index_key(user_id)
+        keys = self.client.smembers(index_key)
+        self.client.delete(index_key, *keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.prefix}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+class UserCache:
+    """Caches the principal resolved from a bearer token.
+
+    Entries are keyed by user id and token and live for at most ``ttl``
+    seconds, never past the token's own expiry. ``update_user`` and
+    ``delete_user`` call ``invalidate_user`` so changes show up immediately.
+    """
+
+    def __init__(self, backend: UserCacheBackend, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, token: str) -> Optional[UserOut]:
+        user = self.backend.get(user_id, token_fingerprint(token))
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set(self, user_id: int, token: str, user: UserOut, token_expires_at: Optional[float] = None):
+        ttl = self.ttl
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl > 0:
+            self.backend.set(user_id, token_fingerprint(token), user, ttl)
+
+    def invalidate_user(self, user_id: int):
+        self.invalidations += 1
+        self.backend.invalidate_user(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(self.backend, InMemoryUserCacheBackend):
+            stats["size"] = len(self.backend)
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+def create_user_cache() -> UserCache:
+    if AUTH_CACHE_REDIS_URL:
+        return UserCache(RedisUserCacheBackend(AUTH_CACHE_REDIS_URL))
+    return UserCache(InMemoryUserCacheBackend())
+
+# Global cache instance
+user_cache = create_user_cache()
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+# Seeds a throwaway SQLite database and drives the app in-process, so the
+# numbers are the server's and not an HTTP client's
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="cache-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'cache_benchmark.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+
+from app.caching.response_cache import response_cache
+from app.database import engine
+from app.main import create_app
+from app.models.doctor import Doctor
+from app.models.user import User
+
+SEED_BATCH_SIZE = 50000
+SPECIALIZATIONS = ("Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics", "Psychiatry", "Oncology", "Radiology")
+
+def seed(doctors: int):
+    """``doctors`` doctors with their users, inserted with Core"""
+    with engine.begin() as conn:
+        for offset in range(0, doctors, SEED_BATCH_SIZE):
+            ids = range(offset + 1, min(offset + SEED_BATCH_SIZE, doctors) + 1)
+            conn.execute(User.__table__.insert(), [
+                {"id": index, "name": f"Doctor {index}", "email": f"doctor{index}@example.com", "password_hash": "x", "role": "doctor"}
+                for index in ids
+            ])
+            conn.execute(Doctor.__table__.insert(), [
+                {"id": index, "specialization": SPECIALIZATIONS[index % len(SPECIALIZATIONS)], "license_number": f"KA-{index:07d}"}
+                for index in ids
+            ])
+
+async def get(app, url: str) -> Tuple[int, bytes]:
+    """(status, body) of one GET sent straight to the ASGI app"""
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    requested = False
+    status, body = 0, []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(body)
+
+async def requests_per_second(app, url: str, requests: int, concurrency: int) -> float:
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            status, _ = await get(app, url)
+            if status != 200:
+                raise RuntimeError(f"GET {url} returned {status}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+async def run(doctors: int, requests: int, concurrency: int) -> int:
+    middle = doctors // 2 + 1
+    urls = ("/doctors/", f"/doctors/{middle}", f"/doctors/license/KA-{middle:07d}", "/doctors/specializations/")
+    ttl = response_cache.ttl or 60.0
+    app = create_app()
+    results = []
+    # Keep the app's startup messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        async with app.router.lifespan_context(app):
+            started = time.perf_counter()
+            seed(doctors)
+            seeded = time.perf_counter() - started
+            for url in urls:
+                rates, bodies = [], []
+                # Cold is RESPONSE_CACHE_TTL_SECONDS=0: every request reaches the route
+                for mode_ttl in (0.0, ttl):
+                    response_cache.ttl = mode_ttl
+                    response_cache.backend.clear()
+                    bodies.append((await get(app, url))[1])
+                    rates.append(await requests_per_second(app, url, requests, concurrency))
+                results.append((url, rates, bodies[0] == bodies[1]))
+    response_cache.ttl = ttl
+
+    print(f"Seeded {doctors} doctors in {seeded:.1f}s")
+    print(f"{requests} requests per run, {concurrency} at a time")
+    print(f"{'endpoint':28} {'cache off':>11} {'cache warm':>11} {'speedup':>8}")
+    for url, (cold, warm), same in results:
+        print(f"{url:28} {cold:7.0f} r/s {warm:7.0f} r/s {warm / cold:7.1f}x")
+    mismatched = [url for url, _, same in results if not same]
+    if mismatched:
+        print(f"❌ Cached bodies differ from fresh ones for {', '.join(mismatched)}")
+        return 1
+    print("✅ Cached responses match fresh ones")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Requests per second on the doctor directory with the response cache off and warm")
+    parser.add_argument("--doctors", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run(args.doctors, args.requests, args.concurrency))
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
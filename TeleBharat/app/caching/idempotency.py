@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Idempotency configuration - override through environment variables.
+# IDEMPOTENCY_TTL_SECONDS=0 turns replays off; the header is then ignored.
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_HEADER_NAME = "Idempotency-Key"
+# Set on responses answered from the store instead of the route
+IDEMPOTENCY_REPLAYED_HEADER_NAME = "Idempotent-Replayed"
+
+# (status, headers, body) of the first response to a key
+StoredResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+class IdempotencyStore:
+    """First responses per (path, key), plus the requests still computing one.
+
+    Finished entries live for ``ttl`` seconds, and the oldest are dropped
+    once there are more than ``max_entries``. Requests in flight are
+    tracked separately so eviction never drops a key a duplicate is
+    waiting on. Used from the event loop only, so it takes no lock.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, bytes, StoredResponse]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, bytes], Tuple[bytes, asyncio.Event]] = {}
+        self.paths: Set[str] = set()
+        self.replays = 0
+        self.waits = 0
+        self.mismatches = 0
+        self.evictions = 0
+
+    def protect_paths(self, *paths: str):
+        """Honour Idempotency-Key on POSTs to exactly these paths"""
+        self.paths.update(paths)
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[Tuple[bytes, StoredResponse]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return fingerprint, response
+
+    def in_flight(self, key: Tuple[str, bytes]) -> Optional[Tuple[bytes, asyncio.Event]]:
+        return self._in_flight.get(key)
+
+    def begin(self, key: Tuple[str, bytes], fingerprint: bytes):
+        self._in_flight[key] = (fingerprint, asyncio.Event())
+
+    def finish(self, key: Tuple[str, bytes], response: Optional[StoredResponse]):
+        """Store the response (None when it should not be kept) and wake the duplicates"""
+        fingerprint, done = self._in_flight.pop(key)
+        if response is not None:
+            now = time.monotonic()
+            self._entries[key] = (now + self.ttl, fingerprint, response)
+            self._entries.move_to_end(key)
+            # Entries share one TTL, so the oldest are at the front
+            while self._entries:
+                oldest_key, (expires_at, _, _) = next(iter(self._entries.items()))
+                if len(self._entries) <= self.max_entries and expires_at > now:
+                    break
+                del self._entries[oldest_key]
+                if expires_at > now:
+                    self.evictions += 1
+        done.set()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "waits": self.waits,
+            "mismatches": self.mismatches,
+            "evictions": self.evictions,
+        }
+
+def fingerprint_body(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+async def send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class IdempotencyMiddleware:
+    """ASGI middleware replaying the first response to a repeated Idempotency-Key.
+
+    Only POSTs to the store's protected paths that carry the header are
+    handled. A duplicate arriving while the first request still runs waits
+    for it instead of running the route again. Server errors are not kept,
+    so a retry after one runs the route again. Reusing a key with a
+    different body is answered with 422.
+
+    Entries are per worker: a retry routed to another worker runs the route
+    again, where the email check and the booking lock still reject it.
+    """
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "POST" or self.store.ttl <= 0
+                or scope["path"] not in self.store.paths):
+            return await self.app(scope, receive, send)
+        idempotency_key = dict(scope["headers"]).get(IDEMPOTENCY_HEADER_NAME.lower().encode())
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return await send_error(send, 400, f"{IDEMPOTENCY_HEADER_NAME} must be 1 to {IDEMPOTENCY_MAX_KEY_LENGTH} characters")
+
+        body = await read_body(receive)
+        fingerprint = fingerprint_body(body)
+        key = (scope["path"], idempotency_key)
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    self.store.mismatches += 1
+                    return await send_error(send, 422, f"{IDEMPOTENCY_HEADER_NAME} was already used with a different request body")
+                self.store.replays += 1
+                return await self._replay(send, stored[1])
+            in_flight = self.store.in_flight(key)
+            if in_flight is None:
+                break
+            if in_flight[0] != fingerprint:
+                self.store.mismatches += 1
+                return await send_error(send, 422, f"{IDEMPOTENCY_HEADER_NAME} was already used with a different request body")
+            # Wait for the first request, then replay its response or take over if it kept none
+            self.store.waits += 1
+            await in_flight[1].wait()
+
+        self.store.begin(key, fingerprint)
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            else:
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, replay_body, capture)
+            if start and start["status"] < 500:
+                response = (start["status"], list(start.get("headers", [])), b"".join(chunks))
+        finally:
+            self.store.finish(key, response)
+
+    async def _replay(self, send, response: StoredResponse):
+        status, headers, body = response
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers + [(IDEMPOTENCY_REPLAYED_HEADER_NAME.lower().encode(), b"true")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
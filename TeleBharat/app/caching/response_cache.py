@@ -0,0 +1,221 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+# Cache configuration - override through environment variables.
+# RESPONSE_CACHE_TTL_SECONDS=0 turns the cache off.
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Headers stored and replayed with a cached body
+CACHED_HEADERS = (b"content-type", b"x-next-cursor")
+
+# (status, headers, body) of a cached 200 response
+CachedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+class ResponseCacheBackend:
+    """Storage interface for pre-serialized responses, grouped by namespace"""
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, response: CachedResponse, ttl: float):
+        raise NotImplementedError
+
+    def invalidate(self, namespace: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    """Bounded per-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return response
+
+    def set(self, namespace: str, key: str, response: CachedResponse, ttl: float):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class ResponseCache:
+    """Serves repeated GETs from stored response bytes with an ETag.
+
+    Only paths matching a registered rule are cached, and only 200
+    responses. Entries live for ``ttl`` seconds; write routes call
+    ``invalidate`` with the rule's namespace so changes show up on this
+    worker immediately (other workers catch up within ``ttl``).
+    """
+
+    def __init__(self, backend: ResponseCacheBackend, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.rules: List[Tuple[Pattern, str]] = []
+        # Bumped by invalidate so a response computed before it is not stored after it
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def cache_paths(self, namespace: str, *patterns: str):
+        """Cache GET responses for paths fully matching any of ``patterns``"""
+        self.rules.extend((re.compile(pattern), namespace) for pattern in patterns)
+
+    def namespace_for(self, path: str) -> Optional[str]:
+        for pattern, namespace in self.rules:
+            if pattern.fullmatch(path):
+                return namespace
+        return None
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        response = self.backend.get(namespace, key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def set(self, namespace: str, key: str, response: CachedResponse, generation: int):
+        if generation == self.generation(namespace):
+            self.backend.set(namespace, key, response, self.ttl)
+
+    def invalidate(self, namespace: str):
+        self.invalidations += 1
+        self._generations[namespace] = self.generation(namespace) + 1
+        self.backend.invalidate(namespace)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(self.backend, InMemoryResponseCacheBackend):
+            stats["size"] = len(self.backend)
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+def etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(b",")]
+    # Weak comparison, as If-None-Match requires
+    return b"*" in candidates or any(tag.removeprefix(b"W/") == etag for tag in candidates)
+
+class ResponseCacheMiddleware:
+    """ASGI middleware answering cached GETs before routing touches the database"""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or self.cache.ttl <= 0:
+            return await self.app(scope, receive, send)
+        namespace = self.cache.namespace_for(scope["path"])
+        if namespace is None:
+            return await self.app(scope, receive, send)
+
+        # Same parameters in any order share an entry
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)))
+        key = f"{scope['path']}?{query}"
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+
+        cached = self.cache.get(namespace, key)
+        if cached is not None:
+            return await self._replay(send, cached, if_none_match)
+
+        # Buffer the response so the ETag can go out with the headers
+        generation = self.cache.generation(namespace)
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(chunks)
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            headers = [(name, value) for name, value in start["headers"] if name.lower() in CACHED_HEADERS]
+            response = (200, headers + [(b"etag", make_etag(body))], body)
+            self.cache.set(namespace, key, response, generation)
+            await self._replay(send, response, if_none_match)
+
+        await self.app(scope, receive, capture)
+
+    async def _replay(self, send, response: CachedResponse, if_none_match: Optional[bytes]):
+        status, headers, body = response
+        etag = headers[-1][1]
+        if etag_matches(if_none_match, etag):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers + [(b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def create_response_cache() -> ResponseCache:
+    return ResponseCache(InMemoryResponseCacheBackend())
+
+# Global response cache instance
+response_cache = create_response_cache()
@@ -1,6 +1,13 @@
+import itertools
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 import logging
 
@@ -13,17 +20,158 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in .env file")
 
-# Enable SQLAlchemy logging
-logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+# Connection pool tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 
-# Create SQLAlchemy engine
-try:
-    engine = create_engine(DATABASE_URL)
-    print("✅ Connected to DB engine")
-except Exception as e:
-    print("❌ Failed to connect to DB:", e)
+# Comma-separated read replica URLs; read-only routes are spread across them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a replica that failed a connection is skipped before it is tried again
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    return parsed.set(drivername=ASYNC_DRIVERS.get(backend, parsed.drivername)).render_as_string(hide_password=False)
+
+def get_pool_options(url: str) -> dict:
+    """Pool arguments for create_engine; in-memory SQLite uses a static pool that takes none"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+# Log every statement with its parameters. Debugging only: it costs CPU per
+# query and writes patient data to the logs.
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+if SQL_ECHO:
+    logging.basicConfig()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+# Create SQLAlchemy engines. Neither connects until first used; the app's
+# lifespan checks the connection at startup and disposes the pools on shutdown.
+engine = create_engine(DATABASE_URL, **get_pool_options(DATABASE_URL))
+# Async engine for routes running on the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_pool_options(ASYNC_DATABASE_URL))
+
+class ReplicaPool:
+    """Round-robin over read replicas, skipping any that recently failed.
+
+    A replica that cannot hand out a connection is marked down for
+    ``retry_seconds``; after that the next read tries it again, so a
+    recovered replica rejoins without a restart.
+    """
+
+    def __init__(self, urls: List[str], retry_seconds: float = DB_REPLICA_RETRY_SECONDS):
+        self.engines: List[Engine] = [create_engine(url, **get_pool_options(url)) for url in urls]
+        self.retry_seconds = retry_seconds
+        self._down_until = {replica: 0.0 for replica in self.engines}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for replica in self.engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect and context.engine is not None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, replica: Engine):
+        with self._lock:
+            self._down_until[replica] = time.monotonic() + self.retry_seconds
+        print(f"❌ Read replica {replica.url.render_as_string()} is down; skipping it for {self.retry_seconds:g}s")
+
+    def healthy(self) -> List[Engine]:
+        """Usable replicas, starting from the next one in round-robin order"""
+        if not self.engines:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._counter) % len(self.engines)
+            ordered = self.engines[start:] + self.engines[:start]
+            return [replica for replica in ordered if self._down_until[replica] <= now]
+
+class RoutingSession(Session):
+    """Reads from a replica of ``replicas`` until the session writes, then stays on the primary.
+
+    The replica is picked, and its connection checked out, when the
+    session first runs a query, so a request that never queries (a cached
+    user, say) costs no connection. A dead replica is skipped at that
+    point. Sticking to the primary after the first flush means a request
+    always reads back its own writes.
+    """
+
+    def __init__(self, replicas: Optional[ReplicaPool] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+        self.replica: Optional[Engine] = None
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.wrote or self._flushing:
+            return engine
+        if self.replicas is not None:
+            self.replica = self._pick_replica()
+            self.replicas = None
+        return self.replica or engine
+
+    def _pick_replica(self) -> Optional[Engine]:
+        for replica in self.replicas.healthy():
+            try:
+                # An explicit bind skips get_bind; the connection then serves the whole session
+                self.connection(bind_arguments={"bind": replica})
+                return replica
+            except OperationalError:
+                self.rollback()
+                self.replicas.mark_down(replica)
+        return None
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session.wrote = True
+
+replica_pool = ReplicaPool(DATABASE_REPLICA_URLS)
 
 # Create session and base
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+def ReadSessionLocal() -> Session:
+    """Session for read-only routes: a healthy replica if any, else the primary"""
+    return RoutingSession(replicas=replica_pool if replica_pool.engines else None, autoflush=False)
+# Objects stay usable after commit so async routes never trigger implicit IO
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
+
+def check_database_connection() -> bool:
+    """Open one connection to the primary so a bad DATABASE_URL shows up at startup"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError as e:
+        print("❌ Failed to connect to DB:", e)
+        return False
+    print("✅ Connected to DB engine")
+    if replica_pool.engines:
+        print(f"✅ Routing reads across {len(replica_pool.engines)} read replica(s)")
+    return True
+
+async def dispose_engines():
+    """Close every pooled connection; called when the app shuts down"""
+    engine.dispose()
+    await async_engine.dispose()
+    for replica in replica_pool.engines:
+        replica.dispose()
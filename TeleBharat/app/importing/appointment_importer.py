@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User  # noqa: F401 - patients and doctors reference users
+from app.reporting.appointment_stats import apply_deltas, import_deltas
+from app.scheduling.conflict_index import scheduler, DoctorSchedule, ACTIVE_STATUSES, appointment_interval
+from app.scheduling.reservations import (
+    BOOKING_MAX_RETRIES, booking_lock_key, booking_locks, load_stored_schedules, lock_doctor_schedules,
+    retry_delay, retry_on_lock_errors
+)
+from app.schemas.appointment_schema import AppointmentImport
+from app.websocket.backplane import UnixSocketBackplane, create_backplane
+
+# Rows validated, checked and inserted per transaction
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Per-row errors kept in a report; the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+FORMATS = ("csv", "ndjson")
+
+# A parsed input row: (row number, decoded object or the error that stopped decoding it)
+ParsedRow = Tuple[int, object]
+
+class RowParser:
+    """Incrementally turns CSV or NDJSON text into rows.
+
+    Text can be fed in arbitrary pieces; only complete lines are parsed.
+    CSV input needs a header line and one record per line.
+    """
+
+    def __init__(self, format: str):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported import format: {format}")
+        self.format = format
+        self.header: Optional[List[str]] = None
+        self.line_number = 0
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[ParsedRow]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse(lines)
+
+    def close(self) -> List[ParsedRow]:
+        lines, self._buffer = [self._buffer], ""
+        return self._parse(lines)
+
+    def _parse(self, lines: List[str]) -> List[ParsedRow]:
+        rows = []
+        for line in lines:
+            self.line_number += 1
+            line = line.rstrip("\r")
+            if not line.strip():
+                continue
+            if self.format == "ndjson":
+                try:
+                    rows.append((self.line_number, json.loads(line)))
+                except ValueError as e:
+                    rows.append((self.line_number, e))
+                continue
+            values = next(csv.reader([line]))
+            if self.header is None:
+                self.header = [value.strip() for value in values]
+                continue
+            # Empty cells fall back to the schema defaults
+            rows.append((self.line_number, {key: value for key, value in zip(self.header, values) if value != ""}))
+        return rows
+
+def chunked(rows: Iterable[ParsedRow], size: int = IMPORT_CHUNK_SIZE) -> Iterable[List[ParsedRow]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class ImportReport:
+    """Running totals of an import; errors past the cap are only counted"""
+
+    def __init__(self, max_errors: int = IMPORT_MAX_REPORTED_ERRORS):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+        self.max_errors = max_errors
+
+    def add_error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": error})
+
+    def summary(self) -> Dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+def describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())
+
+def validate_chunk(
+    rows: List[ParsedRow],
+    report: ImportReport,
+    schema: Type[BaseModel] = AppointmentImport
+) -> List[Tuple[int, BaseModel]]:
+    """The rows of a chunk that pass ``schema``; the rest are reported"""
+    valid: List[Tuple[int, BaseModel]] = []
+    for row, data in rows:
+        if isinstance(data, Exception):
+            report.add_error(row, f"Invalid JSON: {data}")
+            continue
+        if not isinstance(data, dict):
+            report.add_error(row, "Expected an object")
+            continue
+        try:
+            valid.append((row, schema(**data)))
+        except ValidationError as e:
+            report.add_error(row, describe_validation_error(e))
+    return valid
+
+def write_chunk(db: Session, valid: List[Tuple[int, BaseModel]], report: ImportReport) -> List[Dict]:
+    """Check and insert validated rows in a single transaction.
+
+    Rows that reference unknown patients or doctors, or overlap an active
+    appointment (already stored or earlier in the chunk) are reported and
+    skipped. Stored appointments are read under the same per-doctor locks
+    a single booking takes, so the two cannot double-book a slot. Returns
+    the inserted rows as column dicts including ``id``.
+
+    Lock timeouts and deadlocks raise OperationalError for the caller to
+    retry; row errors only reach ``report`` once the chunk is settled, so
+    a retried chunk reports them once.
+    """
+    # One lookup per table for the whole chunk
+    patient_ids = {item.patient_id for _, item in valid}
+    doctor_ids = {item.doctor_id for _, item in valid}
+    known_patients = set(db.scalars(select(Patient.id).where(Patient.id.in_(patient_ids))))
+    known_doctors = set(db.scalars(select(Doctor.id).where(Doctor.id.in_(doctor_ids))))
+    active = [
+        (row, item) for row, item in valid
+        if item.patient_id in known_patients and item.doctor_id in known_doctors
+        and getattr(item, "status", AppointmentStatus.PENDING) in ACTIVE_STATUSES
+    ]
+    stored: Dict[int, DoctorSchedule] = {}
+    if active:
+        # The same locks a single booking takes, held until the commit below,
+        # so nothing can be booked into a slot between this check and the insert
+        intervals = [appointment_interval(item.appointment_date, item.duration_minutes) for _, item in active]
+        try:
+            lock_doctor_schedules(db, (item.doctor_id for _, item in active))
+            stored = load_stored_schedules(
+                db, {item.doctor_id for _, item in active},
+                min(start for start, _ in intervals), max(end for _, end in intervals)
+            )
+        except OperationalError:
+            raise
+        except SQLAlchemyError as e:
+            db.rollback()
+            report_database_error(report, valid, e)
+            return []
+
+    errors: List[Tuple[int, str]] = []
+    accepted: List[Tuple[int, Dict]] = []
+    pending: Dict[int, DoctorSchedule] = {}
+    for row, item in valid:
+        if item.patient_id not in known_patients:
+            errors.append((row, "Patient not found"))
+            continue
+        if item.doctor_id not in known_doctors:
+            errors.append((row, "Doctor not found"))
+            continue
+        status = AppointmentStatus(getattr(item, "status", AppointmentStatus.PENDING).value)
+        if status in ACTIVE_STATUSES:
+            start, end = appointment_interval(item.appointment_date, item.duration_minutes)
+            batch_schedule = pending.setdefault(item.doctor_id, DoctorSchedule())
+            if stored[item.doctor_id].find_overlap(start, end) or batch_schedule.find_overlap(start, end):
+                errors.append((row, "Doctor already has an appointment at this time"))
+                continue
+            batch_schedule.add(row, start, end, refresh=False)
+        accepted.append((row, {**item.model_dump(), "status": status}))
+    if not accepted:
+        # Releases the schedule locks
+        db.rollback()
+        for row, error in errors:
+            report.add_error(row, error)
+        return []
+
+    values = [{column: data.get(column) for column in ("patient_id", "doctor_id", "appointment_date", "duration_minutes", "status", "reason", "notes")} for _, data in accepted]
+    try:
+        ids = db.scalars(insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True), values).all()
+        # Core inserts skip the ORM events that keep the stats rollup current
+        apply_deltas(db.connection(), import_deltas(values))
+        db.commit()
+    except OperationalError:
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        for row, error in errors:
+            report.add_error(row, error)
+        report_database_error(report, accepted, e)
+        return []
+
+    for row, error in errors:
+        report.add_error(row, error)
+    created = [{"id": appointment_id, **data} for appointment_id, data in zip(ids, values)]
+    for appointment in created:
+        scheduler.sync_row(
+            appointment["doctor_id"], appointment["id"], appointment["appointment_date"],
+            appointment["duration_minutes"], appointment["status"]
+        )
+    report.imported += len(created)
+    return created
+
+def report_database_error(report: ImportReport, rows: List[Tuple[int, object]], error: SQLAlchemyError):
+    for row, _ in rows:
+        report.add_error(row, f"Database error: {error.__class__.__name__}")
+
+def import_chunk(
+    db: Session,
+    rows: List[ParsedRow],
+    report: ImportReport,
+    schema: Type[BaseModel] = AppointmentImport
+) -> List[Dict]:
+    """Validate, check and insert one chunk of rows, retrying lock timeouts and deadlocks like a single booking"""
+    valid = validate_chunk(rows, report, schema)
+    if not valid:
+        return []
+    for attempt in range(BOOKING_MAX_RETRIES + 1):
+        try:
+            return write_chunk(db, valid, report)
+        except OperationalError as e:
+            db.rollback()
+            if attempt == BOOKING_MAX_RETRIES:
+                report_database_error(report, valid, e)
+                return []
+            time.sleep(retry_delay(attempt))
+
+async def import_chunk_async(
+    db: AsyncSession,
+    rows: List[ParsedRow],
+    report: ImportReport,
+    schema: Type[BaseModel] = AppointmentImport
+) -> List[Dict]:
+    """``import_chunk`` for the request path.
+
+    Queues behind single bookings of the same doctors on ``booking_locks``
+    (every booking, on SQLite) and retries through ``retry_on_lock_errors``.
+    """
+    valid = validate_chunk(rows, report, schema)
+    if not valid:
+        return []
+    dialect = db.bind.dialect.name
+    # Check out the connection first, as single bookings do: a holder of
+    # these locks must never wait on a pool drained by their waiters
+    await db.connection()
+    async with booking_locks.hold_many(booking_lock_key(dialect, item.doctor_id) for _, item in valid):
+        try:
+            return await retry_on_lock_errors(db, lambda: db.run_sync(write_chunk, valid, report))
+        except OperationalError as e:
+            report_database_error(report, valid, e)
+            return []
+
+async def publish_schedule_invalidation(doctor_ids: Iterable[int], timeout: float = 2.0):
+    """Tell running workers to reload the conflict indexes of these doctors.
+
+    Only reaches workers over a unix:// backplane; there is nothing to tell
+    when WS_BACKPLANE_URL is unset or in-memory.
+    """
+    backplane = create_backplane(os.getenv("WS_BACKPLANE_URL"))
+    if not isinstance(backplane, UnixSocketBackplane):
+        return
+    backplane.embed_broker = False
+
+    async def ignore(message: Dict):
+        pass
+
+    await backplane.start(ignore)
+    try:
+        await asyncio.wait_for(backplane.connected.wait(), timeout)
+        await backplane.publish({"kind": "schedule_invalidate", "doctor_ids": sorted(set(doctor_ids)), "origin": "importer"})
+    except asyncio.TimeoutError:
+        print("❌ No backplane broker reachable; restart workers to reload conflict indexes")
+    finally:
+        await backplane.stop()
+
+def import_file(path: str, format: Optional[str] = None, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
+    """Import a CSV or NDJSON file chunk by chunk"""
+    format = format or ("csv" if path.endswith(".csv") else "ndjson")
+    parser = RowParser(format)
+    report = ImportReport()
+    doctor_ids = set()
+
+    def rows():
+        with open(path, encoding="utf-8-sig") as source:
+            for line in source:
+                yield from parser.feed(line)
+        yield from parser.close()
+
+    db = SessionLocal()
+    try:
+        for chunk in chunked(rows(), chunk_size):
+            created = import_chunk(db, chunk, report)
+            doctor_ids.update(appointment["doctor_id"] for appointment in created)
+            print(f"Imported {report.imported} rows, {report.failed} failed")
+    finally:
+        db.close()
+    if doctor_ids:
+        asyncio.run(publish_schedule_invalidation(doctor_ids))
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import appointments from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--errors", help="write the error report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = import_file(args.path, args.format, args.chunk_size)
+    summary = report.summary()
+    if args.errors:
+        with open(args.errors, "w") as errors_file:
+            json.dump(summary, errors_file, indent=2)
+    else:
+        for error in summary["errors"]:
+            print(f"Row {error['row']}: {error['error']}")
+    print(f"✅ Imported {report.imported} appointments, {report.failed} failed")
+    return 1 if report.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
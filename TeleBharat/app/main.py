@@ -1,61 +1,126 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import user_routes, patient_routes, doctor_routes, appointment_routes
-from app.database import engine, Base
-from sqlalchemy import inspect
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Medical Appointment System",
-    description="A comprehensive medical appointment booking system with real-time notifications",
-    version="1.0.0"
-)
-
-def check_user_table_columns():
-    inspector = inspect(engine)
-    columns = inspector.get_columns("users")
-    print("=== USERS TABLE COLUMNS SEEN BY SQLALCHEMY ===")
-    for column in columns:
-        print(column["name"])
+from fastapi.responses import PlainTextResponse
 
-if __name__ == "__main__":
-    check_user_table_columns()
-
-# Add CORS middleware for frontend integration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure this properly in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(user_routes.router)
-app.include_router(patient_routes.router)
-app.include_router(doctor_routes.router)
-app.include_router(appointment_routes.router)
-
-@app.get("/")
-def read_root():
-    return {
-        "message": "Medical Appointment System API",
-        "version": "1.0.0",
-        "endpoints": {
-            "users": "/users",
-            "patients": "/patients", 
-            "doctors": "/doctors",
-            "appointments": "/appointments",
-            "websocket": "/appointments/ws"
+# Run pending migrations on startup. Off by default: apply them once per
+# deploy with `python -m app.migrations.migrator upgrade` instead of having
+# every worker race to do it while booting.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.auth.password_pool import password_hasher
+    from app.database import check_database_connection, dispose_engines
+    from app.websocket.manager import manager
+
+    check_database_connection()
+    if DB_AUTO_MIGRATE:
+        from app.migrations.migrator import setup_schema
+        setup_schema()
+    await manager.start()
+    try:
+        yield
+    finally:
+        await manager.stop()
+        password_hasher.shutdown()
+        await dispose_engines()
+
+def create_app() -> FastAPI:
+    """Build the API. Nothing touches the database until the lifespan starts.
+
+    Run with `uvicorn app.main:create_app --factory`; `app.main:app` still
+    works and builds the same app on first access.
+    """
+    # Imported here so importing this module stays cheap
+    from app.routes import user_routes, patient_routes, doctor_routes, appointment_routes
+    from app.pagination.keyset import NEXT_CURSOR_HEADER
+    from app.caching.response_cache import ResponseCacheMiddleware, response_cache
+    from app.caching.idempotency import IdempotencyMiddleware, idempotency_store, IDEMPOTENCY_REPLAYED_HEADER_NAME
+    from app.database import engine, async_engine, replica_pool
+    from app.monitoring.query_stats import QueryStatsMiddleware, query_stats, QUERY_STATS_HEADER_NAME
+    from app.monitoring.metrics import MetricsMiddleware, render_metrics, METRICS_ENABLED, METRICS_CONTENT_TYPE
+
+    app = FastAPI(
+        title="Medical Appointment System",
+        description="A comprehensive medical appointment booking system with real-time notifications",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Time the queries of sampled requests; innermost, so cache hits are not sampled
+    query_stats.instrument(engine, async_engine.sync_engine, *replica_pool.engines)
+    app.add_middleware(QueryStatsMiddleware, stats=query_stats)
+
+    # Answer cached GETs before routing; added first so CORS still wraps cached responses
+    app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+    # Replay the first response to a retried POST carrying an Idempotency-Key
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+    # Add CORS middleware for frontend integration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure this properly in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, QUERY_STATS_HEADER_NAME, IDEMPOTENCY_REPLAYED_HEADER_NAME],
+    )
+
+    # Outermost, so latency includes cached responses and CORS
+    if METRICS_ENABLED:
+        routers = (user_routes.router, patient_routes.router, doctor_routes.router, appointment_routes.router)
+        app.add_middleware(MetricsMiddleware, routes=[route for router in routers for route in router.routes])
+
+    # Include routers
+    app.include_router(user_routes.router)
+    app.include_router(patient_routes.router)
+    app.include_router(doctor_routes.router)
+    app.include_router(appointment_routes.router)
+
+    @app.get("/")
+    def read_root():
+        return {
+            "message": "Medical Appointment System API",
+            "version": "1.0.0",
+            "endpoints": {
+                "users": "/users",
+                "patients": "/patients", 
+                "doctors": "/doctors",
+                "appointments": "/appointments",
+                "websocket": "/appointments/ws"
+            }
         }
-    }
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy", "service": "medical-appointment-system"}
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy", "service": "medical-appointment-system"}
+
+    if METRICS_ENABLED:
+        @app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics():
+            """Request, database, WebSocket and bcrypt pool metrics for Prometheus"""
+            # Runs on the event loop, the only place the histograms are updated
+            return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+    # Shows the slowest SQL per route, so only served when metrics are on and queries are sampled
+    if METRICS_ENABLED and query_stats.enabled:
+        @app.get("/metrics/queries")
+        def query_metrics():
+            """Per-route query counts and DB time of sampled requests"""
+            return query_stats.summary()
+
+    return app
+
+def __getattr__(name: str):
+    # `app.main:app` builds the app lazily on first access
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
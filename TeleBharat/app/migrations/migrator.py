@@ -0,0 +1,97 @@
+import sys
+from datetime import datetime
+from typing import Callable, List, Set, Tuple
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from app.database import Base, engine
+# Model imports register every table on Base.metadata
+from app.models.user import User
+from app.models.patient import Patient
+from app.models.doctor import Doctor
+from app.models.appointment import Appointment
+from app.models.appointment_stat import AppointmentDailyStat
+from app.reporting.appointment_stats import rebuild as rebuild_appointment_stats
+from app.search.search_index import search_backend
+
+# Tracks which migrations have run; kept out of Base so create_all never touches it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+# Serializes concurrent upgrades from several workers on PostgreSQL
+POSTGRES_LOCK_ID = 7_419_001
+
+def _initial_schema(conn: Connection):
+    # Fresh databases get the current models, indexes included. Databases made
+    # by the old create_all call already have every table and are left alone.
+    Base.metadata.create_all(conn)
+
+def _appointment_indexes(conn: Connection):
+    for index in Appointment.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def _appointment_stats(conn: Connection):
+    # Counts the existing appointments; later writes keep the rollup current
+    AppointmentDailyStat.__table__.create(conn, checkfirst=True)
+    rebuild_appointment_stats(conn)
+
+# (version, description, apply). Migrations must be idempotent: 0001 builds
+# the current models on a fresh database, so later ones may find their
+# change already in place.
+MIGRATIONS: List[Tuple[str, str, Callable[[Connection], None]]] = [
+    ("0001", "initial schema", _initial_schema),
+    ("0002", "composite indexes for appointment listings", _appointment_indexes),
+    ("0003", "daily appointment stats rollup", _appointment_stats),
+]
+
+def applied_versions(conn: Connection) -> Set[str]:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def upgrade(engine: Engine = engine) -> List[str]:
+    """Apply pending migrations in order, each in its own transaction"""
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": POSTGRES_LOCK_ID})
+                if version in applied_versions(conn):
+                    continue
+                apply(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another worker recorded the same version first
+            continue
+        print(f"✅ Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+def setup_schema(engine: Engine = engine) -> List[str]:
+    """Migrate tables, then create the search index and its sync triggers if missing"""
+    applied = upgrade(engine)
+    search_backend.setup(engine)
+    return applied
+
+def status(engine: Engine = engine) -> List[Tuple[str, str, bool]]:
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(version, description, version in done) for version, description, _ in MIGRATIONS]
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "upgrade":
+        if not setup_schema():
+            print("✅ Database schema is up to date")
+    elif command == "status":
+        for version, description, done in status():
+            print(f"{'✅' if done else '❌'} {version} {description}")
+    else:
+        sys.exit(f"Unknown command {command!r}; use upgrade or status")
@@ -0,0 +1,70 @@
+import sys
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.engine import Engine
+from app.database import engine
+from app.migrations.migrator import upgrade
+from app.models.appointment import Appointment, AppointmentStatus
+from app.routes.appointment_routes import filter_appointments
+from app.scheduling.conflict_index import ACTIVE_STATUSES
+
+SAMPLE_DATE = datetime(2030, 1, 1)
+
+def route_queries() -> Dict[str, object]:
+    """The appointment access paths each listing route and the scheduler run"""
+    listing = select(Appointment.id)
+    by_date = (Appointment.appointment_date, Appointment.id)
+    return {
+        "GET /appointments": filter_appointments(listing, None, None, None, None, None).order_by(*by_date),
+        "GET /appointments?cursor": listing.where(tuple_(*by_date) > (SAMPLE_DATE, 1)).order_by(*by_date),
+        "GET /appointments?status": filter_appointments(listing, AppointmentStatus.PENDING, None, None, None, None).order_by(*by_date),
+        "GET /appointments?doctor_id": filter_appointments(listing, None, None, 1, None, None).order_by(*by_date),
+        "GET /appointments?patient_id": filter_appointments(listing, None, 1, None, None, None).order_by(*by_date),
+        "GET /appointments?date_from&date_to": filter_appointments(listing, None, None, None, SAMPLE_DATE, SAMPLE_DATE).order_by(*by_date),
+        "GET /appointments/doctor/{id}": listing.where(Appointment.doctor_id == 1).order_by(Appointment.appointment_date),
+        "GET /appointments/doctor/{id}?date": listing.where(
+            Appointment.doctor_id == 1, Appointment.appointment_date >= SAMPLE_DATE, Appointment.appointment_date < SAMPLE_DATE
+        ).order_by(Appointment.appointment_date),
+        "GET /appointments/patient/{id}": listing.where(Appointment.patient_id == 1).order_by(Appointment.appointment_date),
+        "GET /appointments/export": filter_appointments(listing, AppointmentStatus.COMPLETED, None, None, SAMPLE_DATE, None).order_by(*by_date),
+        "conflict index load": listing.where(Appointment.doctor_id == 1, Appointment.status.in_(ACTIVE_STATUSES)),
+    }
+
+def explain(engine: Engine, query) -> List[str]:
+    sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # Tiny tables make a sequential scan cheapest; ask whether an index is usable at all
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            return [row[0] for row in conn.execute(text("EXPLAIN " + sql))]
+        return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+def full_scans(engine: Engine, plan: List[str]) -> List[str]:
+    """Plan lines that read the whole appointments table or sort it afterwards"""
+    if engine.dialect.name == "postgresql":
+        return [line for line in plan if "Seq Scan on appointments" in line]
+    return [
+        line for line in plan
+        if (line.startswith("SCAN appointments") and "INDEX" not in line) or "TEMP B-TREE" in line
+    ]
+
+def check_query_plans(engine: Engine = engine) -> List[Tuple[str, List[str]]]:
+    """Return (route, offending plan lines) for every query not served by an index"""
+    failures = []
+    for route, query in route_queries().items():
+        bad = full_scans(engine, explain(engine, query))
+        if bad:
+            failures.append((route, bad))
+    return failures
+
+if __name__ == "__main__":
+    if engine.dialect.name not in ("sqlite", "postgresql"):
+        sys.exit(f"Query plan checks support sqlite and postgresql, not {engine.dialect.name}")
+    upgrade(engine)
+    failures = check_query_plans(engine)
+    for route, lines in failures:
+        print(f"❌ {route}: " + "; ".join(lines))
+    if failures:
+        sys.exit(1)
+    print(f"✅ All {len(route_queries())} appointment queries use an index")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Index
 from app.database import Base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -13,6 +13,14 @@ class AppointmentStatus(str, enum.Enum):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    # Every listing filters on one of these columns and orders by appointment_date.
+    # Existing databases get them through migration 0002.
+    __table_args__ = (
+        Index("ix_appointments_doctor_id_appointment_date", "doctor_id", "appointment_date"),
+        Index("ix_appointments_patient_id_appointment_date", "patient_id", "appointment_date"),
+        Index("ix_appointments_status_appointment_date", "status", "appointment_date"),
+        Index("ix_appointments_appointment_date_id", "appointment_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
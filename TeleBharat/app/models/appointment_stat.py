@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, Enum
+from app.database import Base
+from app.models.appointment import AppointmentStatus
+
+class AppointmentDailyStat(Base):
+    """How many appointments a doctor has on one day in one status.
+
+    Kept up to date by app.reporting.appointment_stats as appointments are
+    written; rebuild it with `python -m app.reporting.appointment_stats rebuild`.
+    """
+    __tablename__ = "appointment_daily_stats"
+    
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<AppointmentDailyStat(doctor_id={self.doctor_id}, day={self.day}, status='{self.status}', count={self.count})>"
\ No newline at end of file
@@ -0,0 +1,110 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# Seeds a throwaway SQLite database; the export reads it through the app's engine
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="export-memory-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'export_memory.db')}"
+
+from app.database import engine
+from app.migrations.migrator import setup_schema
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.routes.appointment_routes import export_query, export_rows
+
+# Most memory an export may hold at once, whatever its size
+EXPORT_MEMORY_BUDGET_MB = 16.0
+SEED_BATCH_SIZE = 50000
+
+def seed(rows: int, doctors: int):
+    """One patient with ``rows`` appointments spread over ``doctors`` doctors, inserted with Core"""
+    start = datetime(2026, 1, 5, 9, 0)
+    statuses = list(AppointmentStatus)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": "x", "role": "doctor"}
+            for index in range(1, doctors + 2)
+        ])
+        conn.execute(Patient.__table__.insert(), [{"id": 1, "diagnosis": "Hypertension"}])
+        conn.execute(Doctor.__table__.insert(), [
+            {"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"}
+            for index in range(2, doctors + 2)
+        ])
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            conn.execute(Appointment.__table__.insert(), [
+                {
+                    "patient_id": 1, "doctor_id": index % doctors + 2,
+                    "appointment_date": start + timedelta(minutes=30 * index), "duration_minutes": 30,
+                    "status": statuses[index % len(statuses)], "reason": "Follow-up visit",
+                    "created_at": start, "updated_at": start,
+                }
+                for index in range(offset, min(offset + SEED_BATCH_SIZE, rows))
+            ])
+
+def measure(format: str, date_to: Optional[datetime]) -> Tuple[int, int, float]:
+    """Lines exported, peak traced bytes and seconds for one export, discarding the output"""
+    lines = 0
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for block in export_rows(export_query(None, None, None, None, date_to), format):
+        lines += block.count("\n")
+    elapsed = time.perf_counter() - started
+    return lines, tracemalloc.get_traced_memory()[1] - baseline, elapsed
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the appointment export's memory stays flat as the row count grows")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--small-rows", type=int, default=10000, help="size of the export compared against")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--budget-mb", type=float, default=EXPORT_MEMORY_BUDGET_MB)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    args = parser.parse_args(argv)
+    if args.small_rows >= args.rows:
+        parser.error("--small-rows must be below --rows")
+
+    try:
+        setup_schema()
+        started = time.perf_counter()
+        seed(args.rows, args.doctors)
+        print(f"Seeded {args.rows} appointments in {time.perf_counter() - started:.1f}s")
+
+        # The small export stops at the date of its last row
+        small_date_to = datetime(2026, 1, 5, 9, 0) + timedelta(minutes=30 * (args.small_rows - 1))
+        # Traced from here on, so the seeding and imports are not counted
+        tracemalloc.start()
+        results = {}
+        for name, rows, date_to in (("small", args.small_rows, small_date_to), ("full", args.rows, None)):
+            lines, peak, elapsed = measure(args.format, date_to)
+            header = 1 if args.format == "csv" else 0
+            print(f"{name:6} {lines - header:>9} rows  peak {peak / 2 ** 20:7.2f} MiB  {elapsed:6.1f}s")
+            if lines - header != rows:
+                print(f"❌ The {name} export returned {lines - header} rows, expected {rows}")
+                return 1
+            results[name] = peak
+        tracemalloc.stop()
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+    small, full = results["small"], results["full"]
+    if full > args.budget_mb * 2 ** 20:
+        print(f"❌ Exporting {args.rows} rows peaked at {full / 2 ** 20:.2f} MiB, over the {args.budget_mb} MiB budget")
+        return 1
+    # Constant memory: the full export may not cost noticeably more than the small one
+    if full > small * 1.5 + 2 ** 20:
+        print(f"❌ Memory grows with the export: {small / 2 ** 20:.2f} MiB for {args.small_rows} rows, {full / 2 ** 20:.2f} MiB for {args.rows}")
+        return 1
+    print(f"✅ Exporting {args.rows} rows peaked at {full / 2 ** 20:.2f} MiB, within {args.budget_mb} MiB and flat against {args.small_rows} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
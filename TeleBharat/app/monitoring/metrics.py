@@ -0,0 +1,229 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+from starlette.routing import Match
+
+# Metrics configuration - override through environment variables.
+# METRICS_ENABLED=false removes the middleware and the /metrics and /metrics/queries endpoints.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latency spans cached hits to slow exports, a broadcast only queues messages
+REQUEST_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FANOUT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label set.
+
+    Updated from the event loop only, so it takes no lock.
+    """
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}")
+        return lines
+
+class Histogram:
+    """Bucketed observations per label set, rendered cumulatively as Prometheus expects.
+
+    Updated from the event loop only, so it takes no lock.
+    """
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = REQUEST_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (le,))} {cumulative}")
+            label_text = format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+def snapshot(name: str, help: str, samples: List[Tuple[Tuple[str, ...], Tuple, float]], kind: str = "gauge") -> List[str]:
+    """Render values read at scrape time from (label names, label values, value) samples"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for names, labels, value in samples:
+        lines.append(f"{name}{format_labels(names, labels)} {format_value(value)}")
+    return lines
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+# Observed by the websocket manager for every local broadcast
+broadcast_fanout_duration = Histogram(
+    "websocket_broadcast_fanout_seconds", "Time to queue one broadcast on every local socket of a user type",
+    ("user_type",), FANOUT_BUCKETS
+)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template.
+
+    Added outermost so cached responses count too. Those never reach
+    routing, so their route is looked up in ``routes`` instead.
+    """
+
+    def __init__(self, app, routes: List, max_remembered_paths: int = 10000):
+        self.app = app
+        self.routes = routes
+        # (method, path) -> label for requests answered without routing
+        self._labels: Dict[Tuple[str, str], str] = {}
+        self.max_remembered_paths = max_remembered_paths
+
+    def route_label(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        key = (scope["method"], scope["path"])
+        label = self._labels.get(key)
+        if label is None:
+            # Unmatched paths share one label so scanners cannot grow the series without bound
+            label = "unmatched"
+            for candidate in self.routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    label = candidate.path
+                    break
+            if len(self._labels) >= self.max_remembered_paths:
+                self._labels.clear()
+            self._labels[key] = label
+        return label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self.route_label(scope)
+            request_duration.observe(time.perf_counter() - started, scope["method"], route)
+            requests_total.inc(scope["method"], route, str(status_code))
+
+def pool_samples(engines: List[Tuple[str, object]]) -> Dict[str, List]:
+    samples = {"size": [], "checked_out": [], "overflow": []}
+    for name, engine in engines:
+        pool = engine.pool
+        # Static and null pools (in-memory SQLite) have nothing to report
+        if not hasattr(pool, "checkedout"):
+            continue
+        labels = (("engine",), (name,))
+        samples["size"].append((*labels, pool.size()))
+        samples["checked_out"].append((*labels, pool.checkedout()))
+        # overflow() counts up from -size; only connections past the pool size are overflow
+        samples["overflow"].append((*labels, max(pool.overflow(), 0)))
+    return samples
+
+def render_metrics() -> str:
+    """Current metrics in the Prometheus text exposition format"""
+    # Imported here so the websocket manager can import this module
+    from app.auth.password_pool import password_hasher
+    from app.auth.user_cache import user_cache
+    from app.caching.idempotency import idempotency_store
+    from app.caching.response_cache import response_cache
+    from app.database import engine, async_engine, replica_pool
+    from app.monitoring.query_stats import query_stats
+    from app.websocket.manager import manager
+
+    lines = request_duration.render() + requests_total.render()
+
+    engines = [("primary", engine), ("async", async_engine.sync_engine)]
+    engines += [(f"replica{index}", replica) for index, replica in enumerate(replica_pool.engines)]
+    pools = pool_samples(engines)
+    lines += snapshot("db_pool_size", "Connections kept open by the pool", pools["size"])
+    lines += snapshot("db_pool_checked_out", "Connections currently checked out", pools["checked_out"])
+    lines += snapshot("db_pool_overflow", "Checked-out connections beyond the pool size", pools["overflow"])
+
+    if query_stats.enabled:
+        routes = query_stats.summary()["routes"]
+        lines += snapshot("db_sampled_queries_total", "Queries run by sampled requests", [
+            (("route",), (route,), stats["queries"]) for route, stats in routes.items()
+        ], "counter")
+        lines += snapshot("db_sampled_query_seconds_total", "DB time spent by sampled requests", [
+            (("route",), (route,), stats["db_ms"] / 1000) for route, stats in routes.items()
+        ], "counter")
+
+    lines += snapshot("websocket_connections", "Open WebSocket connections on this worker", [
+        (("user_type",), (user_type,), len(connections)) for user_type, connections in manager.active_connections.items()
+    ])
+    lines += broadcast_fanout_duration.render()
+    lines += snapshot("websocket_dropped_messages_total", "Messages dropped for slow consumers", [
+        ((), (), manager.dropped_messages)
+    ], "counter")
+
+    lines += snapshot("password_hash_queue_depth", "bcrypt jobs waiting for a worker", [((), (), password_hasher.queue_depth)])
+    lines += snapshot("password_hash_in_flight", "bcrypt jobs admitted and not finished", [((), (), password_hasher.in_flight)])
+    lines += snapshot("password_hash_rejected_total", "bcrypt jobs rejected with 503", [
+        ((), (), password_hasher.rejected)
+    ], "counter")
+
+    caches = (("response", response_cache.stats()), ("auth_user", user_cache.stats()))
+    lines += snapshot("cache_hits_total", "Cache hits", [
+        (("cache",), (name,), stats["hits"]) for name, stats in caches
+    ], "counter")
+    lines += snapshot("cache_misses_total", "Cache misses", [
+        (("cache",), (name,), stats["misses"]) for name, stats in caches
+    ], "counter")
+
+    idempotency = idempotency_store.stats()
+    lines += snapshot("idempotency_replays_total", "Retried POSTs answered with the stored first response", [
+        ((), (), idempotency["replays"])
+    ], "counter")
+    lines += snapshot("idempotency_waits_total", "Retried POSTs that waited for the first request to finish", [
+        ((), (), idempotency["waits"])
+    ], "counter")
+    lines += snapshot("idempotency_entries", "Stored first responses on this worker", [((), (), idempotency["size"])])
+    return "\n".join(lines) + "\n"
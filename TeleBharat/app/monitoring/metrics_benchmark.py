@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+# Seeds a throwaway SQLite database and drives the app in-process
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="metrics-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'metrics_benchmark.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+# Every request has to reach the route, not the response cache
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+import httpx
+from app.database import engine
+from app.main import create_app
+from app.models.doctor import Doctor
+from app.models.user import User
+from app.monitoring import metrics
+
+PATHS = ("/health", "/doctors/?limit=20", "/appointments/stats")
+
+def seed(doctors: int):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": index, "name": f"Dr {index}", "email": f"dr{index}@example.com", "password_hash": "x", "role": "doctor"}
+            for index in range(1, doctors + 1)
+        ])
+        conn.execute(Doctor.__table__.insert(), [
+            {"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"}
+            for index in range(1, doctors + 1)
+        ])
+
+def build_app(enabled: bool):
+    # create_app reads the flag when called, so each app gets its own setting
+    configured, metrics.METRICS_ENABLED = metrics.METRICS_ENABLED, enabled
+    try:
+        return create_app()
+    finally:
+        metrics.METRICS_ENABLED = configured
+
+async def request_time(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    """Seconds per request, over ``requests`` sequential requests"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    return (time.perf_counter() - started) / requests
+
+async def middleware_time(requests: int) -> float:
+    """Seconds MetricsMiddleware adds to one request around a no-op app"""
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def discard(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/doctors/", "headers": []}
+    wrapped = metrics.MetricsMiddleware(endpoint, routes=[])
+    timings = {}
+    for name, app in (("bare", endpoint), ("wrapped", wrapped)):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await app(scope, None, discard)
+        timings[name] = (time.perf_counter() - started) / requests
+    return timings["wrapped"] - timings["bare"]
+
+async def run(requests: int, rounds: int, max_overhead: float) -> int:
+    with_metrics, without_metrics = build_app(True), build_app(False)
+    # Keep the app's startup messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        async with with_metrics.router.lifespan_context(with_metrics):
+            seed(100)
+            clients = {
+                name: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+                for name, app in (("on", with_metrics), ("off", without_metrics))
+            }
+            timings = {(path, name): [] for path in PATHS for name in clients}
+            for path in PATHS:
+                for client in clients.values():
+                    await request_time(client, path, requests // 10)
+            # Alternate the apps so drift in machine load hits both alike
+            for _ in range(rounds):
+                for path in PATHS:
+                    for name, client in clients.items():
+                        timings[(path, name)].append(await request_time(client, path, requests))
+            for client in clients.values():
+                await client.aclose()
+            added = statistics.median([await middleware_time(requests * 10) for _ in range(rounds)])
+            started = time.perf_counter()
+            for _ in range(100):
+                metrics.render_metrics()
+            scrape = (time.perf_counter() - started) / 100
+
+    print(f"Median of {rounds} rounds of {requests} sequential requests per app")
+    print(f"{'path':22} {'metrics off':>12} {'metrics on':>12} {'difference':>11}")
+    failed = False
+    for path in PATHS:
+        off = statistics.median(timings[(path, "off")])
+        on = statistics.median(timings[(path, "on")])
+        print(f"{path:22} {off * 1e6:10.1f}us {on * 1e6:10.1f}us {(on - off) / off * 100:+10.1f}%")
+        # Judged on the isolated middleware cost; end-to-end differences are mostly noise
+        if added / off * 100 > max_overhead:
+            failed = True
+    fastest = min(statistics.median(timings[(path, "off")]) for path in PATHS)
+    print(f"MetricsMiddleware adds {added * 1e6:.1f}us per request ({added / fastest * 100:.2f}% of the fastest route); "
+          f"one /metrics render takes {scrape * 1000:.2f}ms")
+    if failed:
+        print(f"❌ The middleware costs more than {max_overhead}% of a request")
+        return 1
+    print(f"✅ Metrics overhead stays under {max_overhead}% of every request")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure what the metrics middleware adds to request latency")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-overhead", type=float, default=2.0, help="largest allowed middleware cost, in percent of a request")
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run(args.requests, args.rounds, args.max_overhead))
+    finally:
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
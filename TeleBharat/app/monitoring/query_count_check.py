@@ -0,0 +1,114 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# Seeds a throwaway SQLite database and counts statements through the
+# X-Query-Stats header, so every request is sampled and reported
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="query-count-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'query_count.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+os.environ["QUERY_STATS_SAMPLE_RATE"] = "1"
+os.environ["QUERY_STATS_HEADER"] = "true"
+# Cached responses skip the routes, and with them the queries being counted
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from app.database import SessionLocal
+from app.main import create_app
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.monitoring.query_stats import QUERY_STATS_HEADER_NAME
+
+# Most statements any list endpoint may issue per request
+MAX_QUERIES_PER_REQUEST = 2
+
+# The doctor and patient with a long history and the ones with a short one
+BUSY_ID, QUIET_ID = 1, 2
+
+def seed(people: int, busy: int, quiet: int):
+    """Doctors and patients sharing user ids, with one busy and one quiet history each"""
+    db = SessionLocal()
+    try:
+        for index in range(1, people + 1):
+            db.add(User(id=index, name=f"Person {index}", email=f"person{index}@example.com", password_hash="x", role="doctor"))
+            db.add(Doctor(id=index, specialization=("Cardiology", "Dermatology")[index % 2], license_number=f"KA-{index}"))
+            db.add(Patient(id=index, diagnosis=("Hypertension", "Asthma")[index % 2]))
+        start = datetime(2026, 1, 5, 9, 0)
+        for owner, count in ((BUSY_ID, busy), (QUIET_ID, quiet)):
+            for index in range(count):
+                # The other side rotates, so every row nests a different patient or doctor
+                other = index % people + 1
+                for patient_id, doctor_id, day in ((owner, other, 0), (other, owner, 1)):
+                    db.add(Appointment(
+                        patient_id=patient_id, doctor_id=doctor_id,
+                        appointment_date=start + timedelta(days=owner * 10 + day, minutes=30 * index),
+                        duration_minutes=30, status=AppointmentStatus.CONFIRMED, reason="Follow-up visit",
+                    ))
+        db.commit()
+    finally:
+        db.close()
+
+def endpoints(small: int, large: int) -> List[Tuple[str, str, str]]:
+    """(name, URL returning few rows, URL returning many rows)"""
+    return [
+        ("GET /appointments/", f"/appointments/?limit={small}", f"/appointments/?limit={large}"),
+        ("GET /appointments/?view=basic", f"/appointments/?view=basic&limit={small}", f"/appointments/?view=basic&limit={large}"),
+        ("GET /appointments/patient/{id}", f"/appointments/patient/{QUIET_ID}", f"/appointments/patient/{BUSY_ID}"),
+        ("GET /appointments/doctor/{id}", f"/appointments/doctor/{QUIET_ID}", f"/appointments/doctor/{BUSY_ID}"),
+        ("GET /doctors/", f"/doctors/?limit={small}", f"/doctors/?limit={large}"),
+        ("GET /patients/", f"/patients/?limit={small}", f"/patients/?limit={large}"),
+        ("GET /doctors/search/", f"/doctors/search/?q=cardio&limit={small}", f"/doctors/search/?q=cardio&limit={large}"),
+        ("GET /patients/search/", f"/patients/search/?q=asthma&limit={small}", f"/patients/search/?q=asthma&limit={large}"),
+    ]
+
+def count_queries(client: TestClient, url: str) -> Tuple[int, int]:
+    """Statements issued and rows returned by one request"""
+    response = client.get(url)
+    response.raise_for_status()
+    stats = dict(part.strip().split("=") for part in response.headers[QUERY_STATS_HEADER_NAME].split(";"))
+    return int(stats["count"]), len(response.json())
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fail if a list endpoint's query count grows with the number of rows it returns")
+    parser.add_argument("--small", type=int, default=5, help="rows on the small page")
+    parser.add_argument("--large", type=int, default=100, help="rows on the large page")
+    parser.add_argument("--max-queries", type=int, default=MAX_QUERIES_PER_REQUEST)
+    args = parser.parse_args(argv)
+    if args.small >= args.large:
+        parser.error("--small must be below --large")
+
+    failed = False
+    try:
+        # Starting the client runs the migrations
+        with TestClient(create_app()) as client:
+            # Enough doctors and patients for a full large page of each
+            seed(people=args.large * 2, busy=args.large, quiet=args.small)
+            print(f"{'endpoint':32} {'rows':>11} {'queries':>9}")
+            for name, small_url, large_url in endpoints(args.small, args.large):
+                small_queries, small_rows = count_queries(client, small_url)
+                large_queries, large_rows = count_queries(client, large_url)
+                print(f"{name:32} {small_rows:>5}/{large_rows:<5} {small_queries:>4}/{large_queries:<4}")
+                if large_rows <= small_rows:
+                    print(f"❌ {name}: the large request returned {large_rows} rows, no more than the small one")
+                    failed = True
+                elif large_queries != small_queries:
+                    print(f"❌ {name}: {small_queries} queries for {small_rows} rows but {large_queries} for {large_rows}")
+                    failed = True
+                elif large_queries > args.max_queries:
+                    print(f"❌ {name}: {large_queries} queries, over the limit of {args.max_queries}")
+                    failed = True
+    finally:
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+    if failed:
+        return 1
+    print(f"✅ Every list endpoint stays within {args.max_queries} queries whatever the page size")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Instrumentation configuration - override through environment variables.
+# QUERY_STATS_SAMPLE_RATE is the fraction of requests whose queries are
+# timed; 0 (the default) leaves the engines without any hooks and does not
+# register /metrics/queries.
+QUERY_STATS_SAMPLE_RATE = float(os.getenv("QUERY_STATS_SAMPLE_RATE", "0"))
+# Adds X-Query-Stats to sampled responses; meant for development, not production
+QUERY_STATS_HEADER = os.getenv("QUERY_STATS_HEADER", "false").lower() in ("1", "true", "yes")
+# Longest statement text kept as a route's slowest query
+QUERY_STATS_MAX_STATEMENT = int(os.getenv("QUERY_STATS_MAX_STATEMENT", "300"))
+
+QUERY_STATS_HEADER_NAME = "X-Query-Stats"
+
+def compact_statement(statement: str, limit: int = QUERY_STATS_MAX_STATEMENT) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+class RequestQueryStats:
+    """Queries run while handling one sampled request"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            # Only the SQL text is kept; bound parameters may hold patient data
+            self.slowest_statement = statement
+
+    def header_value(self) -> str:
+        return f"count={self.count}; db_ms={self.total_time * 1000:.2f}; slowest_ms={self.slowest_time * 1000:.2f}"
+
+class RouteQueryStats:
+    """Running totals for one route across its sampled requests"""
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, stats: RequestQueryStats):
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.total_time += stats.total_time
+        if stats.slowest_time > self.slowest_time:
+            self.slowest_time = stats.slowest_time
+            self.slowest_statement = compact_statement(stats.slowest_statement)
+
+    def summary(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            "max_queries": self.max_queries,
+            "db_ms": round(self.total_time * 1000, 2),
+            "db_ms_per_request": round(self.total_time * 1000 / self.requests, 3) if self.requests else 0.0,
+            "slowest_ms": round(self.slowest_time * 1000, 3),
+            "slowest_statement": self.slowest_statement,
+        }
+
+# Stats of the request being handled; threadpool routes see it through the copied context
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+class QueryStats:
+    """Sampled per-route query counts and DB time, gathered from engine events.
+
+    Only requests picked by ``sample_rate`` are timed. Engines are hooked
+    by ``instrument``; nothing is attached while sampling is off.
+    """
+
+    def __init__(self, sample_rate: float = QUERY_STATS_SAMPLE_RATE, header: bool = QUERY_STATS_HEADER):
+        self.sample_rate = sample_rate
+        self.header = header
+        self.routes: Dict[str, RouteQueryStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def instrument(self, *engines: Engine):
+        if not self.enabled:
+            return
+        for engine in engines:
+            if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def start(self) -> RequestQueryStats:
+        stats = RequestQueryStats()
+        _current.set(stats)
+        return stats
+
+    def finish(self, route: str, stats: RequestQueryStats):
+        _current.set(None)
+        with self._lock:
+            self.routes.setdefault(route, RouteQueryStats()).add(stats)
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def summary(self) -> Dict:
+        with self._lock:
+            routes = {route: stats.summary() for route, stats in self.routes.items()}
+        return {
+            "sample_rate": self.sample_rate,
+            # Routes with the most DB time first
+            "routes": dict(sorted(routes.items(), key=lambda item: item[1]["db_ms"], reverse=True)),
+        }
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started)
+
+def route_name(scope) -> str:
+    """The matched route's path template, so /doctors/1 and /doctors/2 add up together"""
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope['method']} {path}"
+
+class QueryStatsMiddleware:
+    """ASGI middleware timing the queries of sampled HTTP requests"""
+
+    def __init__(self, app, stats: "QueryStats"):
+        self.app = app
+        self.stats = stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.stats.enabled or not self.stats.sample():
+            return await self.app(scope, receive, send)
+        request_stats = self.stats.start()
+
+        async def send_with_header(message):
+            # Queries run after the headers went out (streamed bodies) still count in the totals
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [
+                        (QUERY_STATS_HEADER_NAME.lower().encode(), request_stats.header_value().encode())
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header if self.stats.header else send)
+        finally:
+            self.stats.finish(route_name(scope), request_stats)
+
+# Global query stats instance
+query_stats = QueryStats()
@@ -0,0 +1,115 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+# Seeds a throwaway SQLite database and requests pages through the app
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="pagination-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'pagination_benchmark.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+# Every request has to reach the route, not the response cache
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.database import engine
+from app.main import create_app
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.pagination.keyset import encode_cursor
+
+SEED_BATCH_SIZE = 50000
+START = datetime(2020, 1, 1, 9, 0)
+
+def seed(rows: int):
+    """``rows`` users, each a doctor and a patient, and ``rows`` appointments, inserted with Core"""
+    with engine.begin() as conn:
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            ids = range(offset + 1, min(offset + SEED_BATCH_SIZE, rows) + 1)
+            conn.execute(User.__table__.insert(), [
+                {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": "x", "role": "doctor"}
+                for index in ids
+            ])
+            conn.execute(Doctor.__table__.insert(), [{"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"} for index in ids])
+            conn.execute(Patient.__table__.insert(), [{"id": index, "diagnosis": "Hypertension"} for index in ids])
+            conn.execute(Appointment.__table__.insert(), [
+                {
+                    # Dates out of id order, so the (appointment_date, id) key is really used
+                    "patient_id": index, "doctor_id": (index * 7) % rows + 1,
+                    "appointment_date": START + timedelta(minutes=30 * ((index * 7919) % rows)), "duration_minutes": 30,
+                    "status": AppointmentStatus.CONFIRMED, "created_at": START, "updated_at": START,
+                }
+                for index in ids
+            ])
+
+def time_it(function: Callable[[], List[int]], repeat: int) -> float:
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the first and a deep page of each listing with skip/limit and with cursors")
+    parser.add_argument("--page", type=int, default=10000, help="deep page to compare with page 1")
+    parser.add_argument("--limit", type=int, default=20, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    rows = args.page * args.limit
+    skip = (args.page - 1) * args.limit
+
+    try:
+        with TestClient(create_app()) as client:
+            started = time.perf_counter()
+            seed(rows)
+            print(f"Seeded {rows} users, doctors, patients and appointments in {time.perf_counter() - started:.1f}s")
+
+            with engine.connect() as conn:
+                # The sort key of the row before the deep page, as the previous page's X-Next-Cursor would carry it
+                appointment_key = conn.execute(
+                    select(Appointment.appointment_date, Appointment.id)
+                    .order_by(Appointment.appointment_date, Appointment.id).offset(skip - 1).limit(1)
+                ).one()
+                id_key = conn.execute(select(Doctor.id).order_by(Doctor.id).offset(skip - 1).limit(1)).scalar_one()
+            listings = (
+                ("/appointments/", encode_cursor(*appointment_key)),
+                ("/doctors/", encode_cursor(id_key)),
+                ("/patients/", encode_cursor(id_key)),
+            )
+
+            def fetch(url: str) -> Callable[[], List[int]]:
+                def request() -> List[int]:
+                    response = client.get(url)
+                    response.raise_for_status()
+                    return [row["id"] for row in response.json()]
+                return request
+
+            print(f"Median of {args.repeat} requests, {args.limit} rows per page")
+            print(f"{'listing':16} {'page':>6} {'skip/limit':>11} {'cursor':>10} {'speedup':>8}")
+            for path, cursor in listings:
+                for page, skip_url, cursor_url in (
+                    (1, f"{path}?limit={args.limit}", f"{path}?limit={args.limit}"),
+                    (args.page, f"{path}?limit={args.limit}&skip={skip}", f"{path}?limit={args.limit}&cursor={cursor}"),
+                ):
+                    if fetch(skip_url)() != fetch(cursor_url)():
+                        print(f"❌ {path} page {page} differs between skip and cursor")
+                        return 1
+                    skip_time = time_it(fetch(skip_url), args.repeat)
+                    cursor_time = time_it(fetch(cursor_url), args.repeat)
+                    print(f"{path:16} {page:>6} {skip_time * 1000:9.2f}ms {cursor_time * 1000:8.2f}ms {skip_time / cursor_time:7.1f}x")
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
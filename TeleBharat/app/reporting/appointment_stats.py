@@ -0,0 +1,170 @@
+import sys
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, func, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.appointment_stat import AppointmentDailyStat
+from app.models.doctor import Doctor  # noqa: F401 - appointments reference patients and doctors
+from app.models.patient import Patient  # noqa: F401
+from app.models.user import User  # noqa: F401
+
+stats_table = AppointmentDailyStat.__table__
+# "count" is also a ColumnCollection method, so the column is looked up by key
+count_column = stats_table.c["count"]
+
+# (doctor_id, day, status) - one row of the rollup
+StatKey = Tuple[int, date, AppointmentStatus]
+
+def stat_key(doctor_id: Optional[int], appointment_date: Optional[datetime], status: Optional[AppointmentStatus]) -> Optional[StatKey]:
+    """The rollup row an appointment counts towards; None while it is incomplete"""
+    if doctor_id is None or appointment_date is None:
+        return None
+    return doctor_id, appointment_date.date(), AppointmentStatus(status or AppointmentStatus.PENDING)
+
+def transition_deltas(before: Optional[StatKey], after: Optional[StatKey]) -> Dict[StatKey, int]:
+    """-1 for the row an appointment leaves and +1 for the one it joins"""
+    if before == after:
+        return {}
+    deltas: Dict[StatKey, int] = {}
+    if before is not None:
+        deltas[before] = -1
+    if after is not None:
+        deltas[after] = deltas.get(after, 0) + 1
+    return deltas
+
+def apply_deltas(conn: Connection, deltas: Dict[StatKey, int]):
+    """Add each delta to its rollup row, creating the row if needed.
+
+    Runs on the connection of the write that caused it, so the counts
+    commit or roll back together with the appointments.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = [
+        {"doctor_id": doctor_id, "day": day, "status": status, "count": delta}
+        for (doctor_id, day, status), delta in deltas.items()
+    ]
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(stats_table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[column.name for column in stats_table.primary_key],
+            set_={"count": count_column + statement.excluded["count"]}
+        )
+        conn.execute(statement, values)
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(stats_table)
+        statement = statement.on_duplicate_key_update({"count": count_column + statement.inserted["count"]})
+        conn.execute(statement, values)
+    else:
+        for row in values:
+            result = conn.execute(
+                update(stats_table)
+                .where(
+                    stats_table.c.doctor_id == row["doctor_id"],
+                    stats_table.c.day == row["day"],
+                    stats_table.c.status == row["status"]
+                )
+                .values({"count": count_column + row["count"]})
+            )
+            if not result.rowcount:
+                conn.execute(stats_table.insert().values(row))
+
+def import_deltas(rows: Iterable[Dict]) -> Dict[StatKey, int]:
+    """+1 per row inserted without the ORM, as the bulk importer does"""
+    return dict(Counter(
+        stat_key(row["doctor_id"], row["appointment_date"], row.get("status")) for row in rows
+    ))
+
+def _previous(target: Appointment, name: str):
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(target, name)
+
+# ORM writes to appointments keep the rollup in step inside the same flush.
+# Core statements bypass these; the importer calls apply_deltas itself.
+@event.listens_for(Appointment, "after_insert")
+def _count_inserted(mapper, conn: Connection, target: Appointment):
+    apply_deltas(conn, transition_deltas(None, stat_key(target.doctor_id, target.appointment_date, target.status)))
+
+@event.listens_for(Appointment, "after_update")
+def _count_updated(mapper, conn: Connection, target: Appointment):
+    before = stat_key(_previous(target, "doctor_id"), _previous(target, "appointment_date"), _previous(target, "status"))
+    after = stat_key(target.doctor_id, target.appointment_date, target.status)
+    apply_deltas(conn, transition_deltas(before, after))
+
+@event.listens_for(Appointment, "after_delete")
+def _count_deleted(mapper, conn: Connection, target: Appointment):
+    apply_deltas(conn, transition_deltas(stat_key(target.doctor_id, target.appointment_date, target.status), None))
+
+def rebuild(conn: Connection) -> int:
+    """Recompute every rollup row from the appointments table; returns the row count"""
+    if conn.dialect.name == "postgresql":
+        # Holds off appointment writes so none lands between the delete and the recount
+        conn.execute(text("LOCK TABLE appointments IN SHARE MODE"))
+    conn.execute(delete(stats_table))
+    day = func.date(Appointment.appointment_date)
+    conn.execute(stats_table.insert().from_select(
+        ["doctor_id", "day", "status", "count"],
+        select(Appointment.doctor_id, day, Appointment.status, func.count())
+        .group_by(Appointment.doctor_id, day, Appointment.status)
+    ))
+    return conn.execute(select(func.count()).select_from(stats_table)).scalar_one()
+
+def summarize(db: Session, date_from: date, date_to: date, doctor_id: Optional[int] = None) -> Dict:
+    """Appointment counts per status, per doctor and per day between two dates, inclusive.
+
+    Reads at most one row per doctor, day and status, however many
+    appointments there are.
+    """
+    query = select(stats_table.c.doctor_id, stats_table.c.day, stats_table.c.status, count_column).where(
+        stats_table.c.day >= date_from,
+        stats_table.c.day <= date_to,
+        count_column != 0
+    )
+    if doctor_id is not None:
+        query = query.where(stats_table.c.doctor_id == doctor_id)
+    query = query.order_by(stats_table.c.day, stats_table.c.doctor_id)
+
+    by_status: Counter = Counter()
+    doctors: Dict[int, Counter] = {}
+    days: Dict[date, Counter] = {}
+    cells: List[Dict] = []
+    for row_doctor_id, day, status, count in db.execute(query):
+        by_status[status.value] += count
+        doctors.setdefault(row_doctor_id, Counter())[status.value] += count
+        days.setdefault(day, Counter())[status.value] += count
+        cells.append({"doctor_id": row_doctor_id, "day": day, "status": status, "count": count})
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "total": sum(by_status.values()),
+        "by_status": dict(by_status),
+        "by_doctor": [
+            {"doctor_id": key, "total": sum(counts.values()), "by_status": dict(counts)}
+            for key, counts in sorted(doctors.items())
+        ],
+        "by_day": [
+            {"day": key, "total": sum(counts.values()), "by_status": dict(counts)}
+            for key, counts in days.items()
+        ],
+        "cells": cells,
+    }
+
+if __name__ == "__main__":
+    from app.database import engine
+    command = sys.argv[1] if len(sys.argv) > 1 else "rebuild"
+    if command == "rebuild":
+        with engine.begin() as conn:
+            rows = rebuild(conn)
+        print(f"✅ Rebuilt appointment stats: {rows} rows")
+    else:
+        sys.exit(f"Unknown command {command!r}; use rebuild")
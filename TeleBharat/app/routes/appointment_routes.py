@@ -1,20 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.database import SessionLocal, ReadSessionLocal, AsyncSessionLocal
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.patient import Patient
 from app.models.doctor import Doctor
 from app.schemas.appointment_schema import (
     AppointmentCreate, AppointmentOut, AppointmentUpdate, 
-    AppointmentBasicOut, DoctorStatusUpdate
+    AppointmentBasicOut, DoctorStatusUpdate, DoctorAvailability, DoctorFreeSlot,
+    AppointmentImport, AppointmentImportResult, AppointmentStats
 )
+from app.importing.appointment_importer import ImportReport, RowParser, chunked, import_chunk_async, IMPORT_CHUNK_SIZE
 from app.websocket.manager import manager
-from typing import List, Optional
-from datetime import datetime, timedelta
+from app.scheduling.conflict_index import scheduler, ACTIVE_STATUSES, SLOT_MINUTES
+from app.scheduling.reservations import book_slot, check_conflict
+from app.caching.idempotency import idempotency_store
+from app.pagination.keyset import decode_datetime_cursor, set_next_cursor
+from app.search.search_index import escape_like
+from app.serialization.orm_json import orm_json_response
+from app.serialization.fieldsets import FieldSets, View
+from app.reporting.appointment_stats import summarize
+from typing import Iterator, List, Literal, Optional, Union
+from datetime import date, datetime, timedelta
+import codecs
+import csv
+import io
 import json
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
+# Retried bookings with the same Idempotency-Key get the first response back
+idempotency_store.protect_paths("/appointments/")
+
+# Longest date range a single availability query may scan
+MAX_AVAILABILITY_DAYS = 31
+# Longest date range the stats endpoint summarizes at once
+MAX_STATS_DAYS = 366
+# Largest JSON array accepted by the batch booking endpoint
+MAX_BATCH_SIZE = 1000
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+# Rows fetched from the database and written out per chunk of an export
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = (
+    "id", "patient_id", "doctor_id", "appointment_date", "duration_minutes",
+    "status", "reason", "notes", "created_at", "updated_at"
+)
+
+# AppointmentOut nests patient and doctor; load them in the same SELECT
+# instead of two lazy loads per row
+APPOINTMENT_OUT_OPTIONS = (joinedload(Appointment.patient), joinedload(Appointment.doctor))
+# view=basic and fields= list appointments without those joins or unused columns
+APPOINTMENT_FIELDSETS = FieldSets(
+    Appointment, AppointmentOut, AppointmentBasicOut, joins=("patient", "doctor"), keys=("id", "appointment_date")
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -22,6 +63,31 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def load_appointment(db: AsyncSession, appointment_id: int) -> Optional[Appointment]:
+    """Fetch an appointment with the relationships AppointmentOut serializes.
+
+    Lazy loads are not possible on an AsyncSession, so patient and doctor are
+    loaded up front.
+    """
+    result = await db.execute(
+        select(Appointment)
+        .options(*APPOINTMENT_OUT_OPTIONS)
+        .where(Appointment.id == appointment_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
 # WebSocket endpoint for real-time notifications
 @router.websocket("/ws/{user_type}/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_type: str, user_id: int):
@@ -39,6 +105,8 @@ async def websocket_endpoint(websocket: WebSocket, user_type: str, user_id: int)
                 if message.get("type") == "status_update" and user_type == "doctors":
                     status = message.get("status", "online")
                     await manager.update_doctor_status(user_id, status)
+                elif message.get("type") == "heartbeat" and user_type == "doctors":
+                    manager.doctor_heartbeat(user_id)
                     
             except json.JSONDecodeError:
                 # If not JSON, treat as simple message
@@ -47,8 +115,8 @@ async def websocket_endpoint(websocket: WebSocket, user_type: str, user_id: int)
     except WebSocketDisconnect:
         manager.disconnect(websocket, user_type, user_id)
         
-        # If doctor disconnects, mark as offline
-        if user_type == "doctors":
+        # If the doctor's last session disconnects, mark as offline
+        if user_type == "doctors" and not manager.is_connected(user_id):
             await manager.update_doctor_status(user_id, "offline")
 
 # WebSocket endpoint for general notifications
@@ -62,33 +130,38 @@ async def general_websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket, "general")
 
 @router.post("/", response_model=AppointmentOut)
-async def create_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
+async def create_appointment(appointment: AppointmentCreate, db: AsyncSession = Depends(get_async_db)):
     # Verify patient exists
-    patient = db.query(Patient).filter(Patient.id == appointment.patient_id).first()
+    patient = await db.get(Patient, appointment.patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     # Verify doctor exists
-    doctor = db.query(Doctor).filter(Doctor.id == appointment.doctor_id).first()
+    doctor = await db.get(Doctor, appointment.doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     
-    # Check for conflicting appointments
-    conflicting_appointment = db.query(Appointment).filter(
-        Appointment.doctor_id == appointment.doctor_id,
-        Appointment.appointment_date <= appointment.appointment_date + timedelta(minutes=appointment.duration_minutes),
-        Appointment.appointment_date + timedelta(minutes=30) > appointment.appointment_date,  # Assuming default 30 min
-        Appointment.status.in_([AppointmentStatus.CONFIRMED, AppointmentStatus.PENDING])
-    ).first()
+    # Check for conflicting appointments; the in-memory index turns most clashes away without locking
+    conflicting_id = await db.run_sync(
+        check_conflict, appointment.doctor_id, appointment.appointment_date, appointment.duration_minutes
+    )
     
-    if conflicting_appointment:
+    if conflicting_id:
         raise HTTPException(status_code=400, detail="Doctor already has an appointment at this time")
     
-    # Create appointment
-    db_appointment = Appointment(**appointment.dict())
-    db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    # Create appointment, re-checking under the doctor's lock so concurrent bookings cannot overlap
+    db_appointment = Appointment(**appointment.model_dump())
+    def add_appointment():
+        db.add(db_appointment)
+        return db_appointment
+    
+    conflicting_id = await book_slot(
+        db, appointment.doctor_id, appointment.appointment_date, appointment.duration_minutes, add_appointment
+    )
+    if conflicting_id:
+        raise HTTPException(status_code=400, detail="Doctor already has an appointment at this time")
+    db_appointment = await load_appointment(db, db_appointment.id)
+    await manager.publish_schedule_change(db_appointment)
     
     # Send real-time notification
     await manager.notify_appointment_update({
@@ -101,49 +174,181 @@ async def create_appointment(appointment: AppointmentCreate, db: Session = Depen
     
     return db_appointment
 
+async def import_and_notify(db: AsyncSession, chunk, report: ImportReport, schema=AppointmentImport):
+    """Import one chunk, then tell its patients and doctors with one message each"""
+    created = await import_chunk_async(db, chunk, report, schema)
+    if created:
+        await manager.notify_appointments_imported(created)
+        await manager.invalidate_schedules(sorted({appointment["doctor_id"] for appointment in created}))
+    return created
+
+@router.post("/batch", response_model=AppointmentImportResult)
+async def create_appointments_batch(
+    appointments: List[dict] = Body(..., max_length=MAX_BATCH_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Book many appointments at once; invalid or conflicting rows are reported by position (1-based)"""
+    report = ImportReport()
+    await import_and_notify(db, list(enumerate(appointments, start=1)), report, AppointmentCreate)
+    return report.summary()
+
+@router.post("/import", response_model=AppointmentImportResult)
+async def import_appointments(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Stream a CSV (text/csv) or NDJSON (application/x-ndjson) body into the database.
+
+    Rows are committed in chunks as they arrive; errors are reported by line.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in IMPORT_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson")
+    parser = RowParser(IMPORT_CONTENT_TYPES[content_type])
+    report = ImportReport()
+    # Incremental decoding copes with characters split across body chunks
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = []
+    async for data in request.stream():
+        pending.extend(parser.feed(decoder.decode(data)))
+        while len(pending) >= IMPORT_CHUNK_SIZE:
+            await import_and_notify(db, pending[:IMPORT_CHUNK_SIZE], report)
+            pending = pending[IMPORT_CHUNK_SIZE:]
+    pending.extend(parser.feed(decoder.decode(b"", final=True)))
+    pending.extend(parser.close())
+    for chunk in chunked(pending):
+        await import_and_notify(db, chunk, report)
+    return report.summary()
+
+def filter_appointments(query, status, patient_id, doctor_id, date_from, date_to):
+    """Apply the filters shared by the list and export endpoints"""
+    if status:
+        query = query.filter(Appointment.status == status)
+    if patient_id:
+        query = query.filter(Appointment.patient_id == patient_id)
+    if doctor_id:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    if date_from:
+        query = query.filter(Appointment.appointment_date >= date_from)
+    if date_to:
+        query = query.filter(Appointment.appointment_date <= date_to)
+    return query
+
+def export_query(status, patient_id, doctor_id, date_from, date_to):
+    """The export's columns for every matching appointment, ordered by appointment date"""
+    query = select(*(getattr(Appointment, column) for column in EXPORT_COLUMNS))
+    query = filter_appointments(query, status, patient_id, doctor_id, date_from, date_to)
+    return query.order_by(Appointment.appointment_date, Appointment.id)
+
+def export_rows(query, format: str) -> Iterator[str]:
+    """Serialize query rows to NDJSON or CSV, one block of text per fetched batch.
+
+    Owns its session: the response keeps streaming after request-scoped
+    dependencies have been torn down. Reads from a replica when one is configured.
+    """
+    db = ReadSessionLocal()
+    try:
+        # yield_per streams from a server-side cursor where the driver has one
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+        for rows in result.partitions():
+            for row in rows:
+                values = [
+                    value.isoformat() if isinstance(value, datetime) else value.value if isinstance(value, AppointmentStatus) else value
+                    for value in row
+                ]
+                if format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_appointments(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    status: Optional[AppointmentStatus] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None)
+):
+    """Stream every matching appointment as NDJSON or CSV, ordered by appointment date"""
+    query = export_query(status, patient_id, doctor_id, date_from, date_to)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="appointments.{format}"'}
+    )
+
+@router.get("/stats", response_model=AppointmentStats)
+def get_appointment_stats(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """Appointment counts per status, doctor and day (default: the last 30 days), from the daily rollup"""
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= MAX_STATS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_STATS_DAYS} days")
+    return summarize(db, date_from, date_to, doctor_id)
+
 @router.get("/{appointment_id}", response_model=AppointmentOut)
-def get_appointment(appointment_id: int, db: Session = Depends(get_db)):
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+def get_appointment(appointment_id: int, db: Session = Depends(get_read_db)):
+    appointment = db.query(Appointment).options(*APPOINTMENT_OUT_OPTIONS).filter(Appointment.id == appointment_id).first()
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return appointment
 
-@router.get("/", response_model=List[AppointmentOut])
+@router.get("/", response_model=Union[List[AppointmentOut], List[AppointmentBasicOut]])
 def get_appointments(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; replaces skip"),
     status: Optional[AppointmentStatus] = Query(None),
     patient_id: Optional[int] = Query(None),
     doctor_id: Optional[int] = Query(None),
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    view: View = Query("full", description="basic drops the nested patient and doctor and the notes"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return instead of a view"),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Appointment)
+    fieldset = APPOINTMENT_FIELDSETS.resolve(view, fields)
+    query = fieldset.query(db)
+    query = filter_appointments(query, status, patient_id, doctor_id, date_from, date_to)
     
-    if status:
-        query = query.filter(Appointment.status == status)
-    if patient_id:
-        query = query.filter(Appointment.patient_id == patient_id)
-    if doctor_id:
-        query = query.filter(Appointment.doctor_id == doctor_id)
-    if date_from:
-        query = query.filter(Appointment.appointment_date >= date_from)
-    if date_to:
-        query = query.filter(Appointment.appointment_date <= date_to)
+    # Stable (appointment_date, id) order so pages never overlap or skip rows
+    query = query.order_by(Appointment.appointment_date, Appointment.id)
+    if cursor:
+        query = query.filter(tuple_(Appointment.appointment_date, Appointment.id) > decode_datetime_cursor(cursor))
+    else:
+        query = query.offset(skip)
     
-    appointments = query.offset(skip).limit(limit).all()
-    return appointments
+    appointments = query.limit(limit).all()
+    set_next_cursor(response, appointments, limit, lambda a: (a.appointment_date, a.id))
+    return orm_json_response(appointments, fieldset.model, response)
 
 @router.get("/patient/{patient_id}", response_model=List[AppointmentOut])
 def get_patient_appointments(
     patient_id: int,
     status: Optional[AppointmentStatus] = Query(None),
     upcoming_only: bool = Query(False),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all appointments for a specific patient"""
-    query = db.query(Appointment).filter(Appointment.patient_id == patient_id)
+    query = db.query(Appointment).options(*APPOINTMENT_OUT_OPTIONS).filter(Appointment.patient_id == patient_id)
     
     if status:
         query = query.filter(Appointment.status == status)
@@ -151,18 +356,21 @@ def get_patient_appointments(
         query = query.filter(Appointment.appointment_date >= datetime.utcnow())
     
     appointments = query.order_by(Appointment.appointment_date).all()
-    return appointments
+    return orm_json_response(appointments, AppointmentOut)
 
-@router.get("/doctor/{doctor_id}", response_model=List[AppointmentOut])
+@router.get("/doctor/{doctor_id}", response_model=Union[List[AppointmentOut], List[AppointmentBasicOut]])
 def get_doctor_appointments(
     doctor_id: int,
     status: Optional[AppointmentStatus] = Query(None),
     date: Optional[datetime] = Query(None),
     upcoming_only: bool = Query(False),
-    db: Session = Depends(get_db)
+    view: View = Query("full", description="basic drops the nested patient and doctor and the notes"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return instead of a view"),
+    db: Session = Depends(get_read_db)
 ):
     """Get all appointments for a specific doctor"""
-    query = db.query(Appointment).filter(Appointment.doctor_id == doctor_id)
+    fieldset = APPOINTMENT_FIELDSETS.resolve(view, fields)
+    query = fieldset.query(db).filter(Appointment.doctor_id == doctor_id)
     
     if status:
         query = query.filter(Appointment.status == status)
@@ -178,38 +386,51 @@ def get_doctor_appointments(
         query = query.filter(Appointment.appointment_date >= datetime.utcnow())
     
     appointments = query.order_by(Appointment.appointment_date).all()
-    return appointments
+    return orm_json_response(appointments, fieldset.model)
 
 @router.put("/{appointment_id}", response_model=AppointmentOut)
 async def update_appointment(
     appointment_id: int, 
     appointment_update: AppointmentUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await load_appointment(db, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    # If updating appointment date, check for conflicts
-    if appointment_update.appointment_date:
-        conflicting_appointment = db.query(Appointment).filter(
-            Appointment.doctor_id == appointment.doctor_id,
-            Appointment.id != appointment_id,  # Exclude current appointment
-            Appointment.appointment_date <= appointment_update.appointment_date + timedelta(minutes=appointment.duration_minutes),
-            Appointment.appointment_date + timedelta(minutes=30) > appointment_update.appointment_date,
-            Appointment.status.in_([AppointmentStatus.CONFIRMED, AppointmentStatus.PENDING])
-        ).first()
+    # If the slot or status changes, check the resulting slot for conflicts
+    update_data = appointment_update.model_dump(exclude_unset=True)
+    new_status = update_data.get("status") or appointment.status
+    claims_slot = new_status in ACTIVE_STATUSES and update_data.keys() & {"appointment_date", "duration_minutes", "status"}
+    doctor_id = appointment.doctor_id
+    start = update_data.get("appointment_date") or appointment.appointment_date
+    duration_minutes = update_data.get("duration_minutes") or appointment.duration_minutes
+    if claims_slot:
+        conflicting_id = await db.run_sync(
+            check_conflict, doctor_id, start, duration_minutes, exclude_id=appointment_id
+        )
         
-        if conflicting_appointment:
+        if conflicting_id:
             raise HTTPException(status_code=400, detail="Doctor already has an appointment at this time")
     
     # Update appointment
-    for key, value in appointment_update.dict(exclude_unset=True).items():
-        setattr(appointment, key, value)
+    def apply_update():
+        for key, value in update_data.items():
+            setattr(appointment, key, value)
+        appointment.updated_at = datetime.utcnow()
+        return appointment
     
-    appointment.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(appointment)
+    if claims_slot:
+        # Re-checked under the doctor's lock so a concurrent booking cannot take the slot
+        conflicting_id = await book_slot(db, doctor_id, start, duration_minutes, apply_update, exclude_id=appointment_id)
+        if conflicting_id:
+            raise HTTPException(status_code=400, detail="Doctor already has an appointment at this time")
+    else:
+        apply_update()
+        await db.commit()
+        scheduler.sync(appointment)
+    appointment = await load_appointment(db, appointment_id)
+    await manager.publish_schedule_change(appointment)
     
     # Send real-time notification
     await manager.notify_appointment_update({
@@ -223,15 +444,17 @@ async def update_appointment(
     return appointment
 
 @router.delete("/{appointment_id}")
-async def cancel_appointment(appointment_id: int, db: Session = Depends(get_db)):
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+async def cancel_appointment(appointment_id: int, db: AsyncSession = Depends(get_async_db)):
+    appointment = await db.get(Appointment, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
     # Instead of deleting, mark as cancelled
     appointment.status = AppointmentStatus.CANCELLED
     appointment.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    scheduler.sync(appointment)
+    await manager.publish_schedule_change(appointment)
     
     # Send real-time notification
     await manager.notify_appointment_update({
@@ -244,7 +467,93 @@ async def cancel_appointment(appointment_id: int, db: Session = Depends(get_db))
     
     return {"detail": "Appointment cancelled successfully"}
 
+# Availability endpoints
+def availability_search(
+    db: Session,
+    doctor_ids: Optional[List[int]],
+    specialization: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    duration_minutes: int,
+    step_minutes: Optional[int]
+):
+    """Validate an availability query and return its (doctor_ids, start, end, step_minutes)"""
+    if not doctor_ids and not specialization:
+        raise HTTPException(status_code=400, detail="Provide doctor_ids or specialization")
+    now = datetime.utcnow()
+    start = max(start or now, now)
+    end = end or start + timedelta(days=7)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_AVAILABILITY_DAYS} days")
+    step_minutes = step_minutes or duration_minutes
+    if step_minutes % SLOT_MINUTES:
+        raise HTTPException(status_code=400, detail=f"step_minutes must be a multiple of {SLOT_MINUTES}")
+    
+    if specialization:
+        query = db.query(Doctor.id).filter(Doctor.specialization.ilike(escape_like(specialization), escape="\\"))
+        if doctor_ids:
+            query = query.filter(Doctor.id.in_(doctor_ids))
+        doctor_ids = [doctor_id for doctor_id, in query.order_by(Doctor.id)]
+    return doctor_ids, start, end, step_minutes
+
+def find_free_slots(
+    db: Session,
+    doctor_ids: Optional[List[int]],
+    specialization: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    duration_minutes: int,
+    step_minutes: Optional[int],
+    limit: int
+):
+    doctor_ids, start, end, step_minutes = availability_search(db, doctor_ids, specialization, start, end, duration_minutes, step_minutes)
+    return scheduler.find_free_slots(db, doctor_ids, start, end, duration_minutes, step_minutes, limit)
+
+@router.get("/doctors/availability", response_model=List[DoctorAvailability])
+def get_doctor_availability(
+    doctor_ids: Optional[List[int]] = Query(None, max_length=1000),
+    specialization: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    duration_minutes: int = Query(30, ge=15, le=180),
+    step_minutes: Optional[int] = Query(None, ge=SLOT_MINUTES, le=180),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Get free slots for one or many doctors over a date range (default: next 7 days)"""
+    slots = find_free_slots(db, doctor_ids, specialization, start, end, duration_minutes, step_minutes, limit)
+    return [
+        {"doctor_id": doctor_id, "slots": [{"start": slot_start, "end": slot_end} for slot_start, slot_end in doctor_slots]}
+        for doctor_id, doctor_slots in slots.items()
+    ]
+
+@router.get("/doctors/availability/first", response_model=Optional[DoctorFreeSlot])
+def get_first_free_slot(
+    doctor_ids: Optional[List[int]] = Query(None, max_length=1000),
+    specialization: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    duration_minutes: int = Query(30, ge=15, le=180),
+    step_minutes: Optional[int] = Query(None, ge=SLOT_MINUTES, le=180),
+    db: Session = Depends(get_db)
+):
+    """Get the earliest free slot across the matching doctors, or null if none"""
+    doctor_ids, start, end, step_minutes = availability_search(db, doctor_ids, specialization, start, end, duration_minutes, step_minutes)
+    earliest = scheduler.find_first_free_slot(db, doctor_ids, start, end, duration_minutes, step_minutes)
+    if earliest is None:
+        return None
+    doctor_id, slot_start, slot_end = earliest
+    return {"doctor_id": doctor_id, "start": slot_start, "end": slot_end}
+
 # Doctor status endpoints
+@router.get("/doctors/status")
+def get_doctor_statuses(doctor_ids: List[int] = Query(..., max_length=1000)):
+    """Get current online status of many doctors in one call"""
+    statuses = manager.get_doctor_statuses(doctor_ids)
+    return [{"doctor_id": doctor_id, **status} for doctor_id, status in statuses.items()]
+
 @router.get("/doctor/{doctor_id}/status")
 def get_doctor_status(doctor_id: int):
     """Get current online status of a doctor"""
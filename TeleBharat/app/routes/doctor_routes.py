@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from app.database import SessionLocal, ReadSessionLocal
 from app.models.doctor import Doctor
 from app.models.user import User
 from app.schemas.doctor_schema import DoctorCreate, DoctorOut, DoctorUpdate, DoctorBasicOut
-from typing import List, Optional
+from app.pagination.keyset import decode_id_cursor, decode_rank_cursor, set_next_cursor
+from app.search.search_index import search_backend
+from app.caching.response_cache import response_cache
+from app.serialization.orm_json import orm_json_response
+from app.serialization.fieldsets import FieldSets, View
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/doctors", tags=["Doctors"])
 
+# DoctorOut nests the user; view=basic and fields= list doctors without that join
+DOCTOR_FIELDSETS = FieldSets(Doctor, DoctorOut, DoctorBasicOut, joins=("user",))
+
+# Directory reads are served from the response cache; every doctor write
+# below (and user updates, which change the nested user) invalidates it
+DOCTOR_CACHE_NAMESPACE = "doctors"
+response_cache.cache_paths(
+    DOCTOR_CACHE_NAMESPACE,
+    r"/doctors/",
+    r"/doctors/\d+",
+    r"/doctors/\d+/basic",
+    r"/doctors/user/\d+",
+    r"/doctors/license/[^/]+",
+    r"/doctors/specializations/",
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,6 +36,13 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("/", response_model=DoctorOut)
 def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db)):
     # Check if user exists
@@ -44,33 +72,47 @@ def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db)):
     )
     db.add(db_doctor)
     db.commit()
+    response_cache.invalidate(DOCTOR_CACHE_NAMESPACE)
     db.refresh(db_doctor)
     return db_doctor
 
 @router.get("/{doctor_id}", response_model=DoctorOut)
-def get_doctor(doctor_id: int, db: Session = Depends(get_db)):
+def get_doctor(doctor_id: int, db: Session = Depends(get_read_db)):
     doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     return doctor
 
-@router.get("/", response_model=List[DoctorOut])
+@router.get("/", response_model=Union[List[DoctorOut], List[DoctorBasicOut]])
 def get_doctors(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; replaces skip"),
     specialization: Optional[str] = Query(None, description="Filter by specialization"),
-    db: Session = Depends(get_db)
+    view: View = Query("full", description="basic drops the nested user"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return instead of a view"),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Doctor)
+    # The full view loads the nested user in the same SELECT
+    fieldset = DOCTOR_FIELDSETS.resolve(view, fields)
+    query = fieldset.query(db)
     
     if specialization:
         query = query.filter(Doctor.specialization.ilike(f"%{specialization}%"))
     
-    doctors = query.offset(skip).limit(limit).all()
-    return doctors
+    query = query.order_by(Doctor.id)
+    if cursor:
+        query = query.filter(Doctor.id > decode_id_cursor(cursor))
+    else:
+        query = query.offset(skip)
+    
+    doctors = query.limit(limit).all()
+    set_next_cursor(response, doctors, limit, lambda d: (d.id,))
+    return orm_json_response(doctors, fieldset.model, response)
 
 @router.get("/user/{user_id}", response_model=DoctorOut)
-def get_doctor_by_user_id(user_id: int, db: Session = Depends(get_db)):
+def get_doctor_by_user_id(user_id: int, db: Session = Depends(get_read_db)):
     """Get doctor record by user ID"""
     doctor = db.query(Doctor).filter(Doctor.id == user_id).first()
     if not doctor:
@@ -78,7 +120,7 @@ def get_doctor_by_user_id(user_id: int, db: Session = Depends(get_db)):
     return doctor
 
 @router.get("/license/{license_number}", response_model=DoctorOut)
-def get_doctor_by_license(license_number: str, db: Session = Depends(get_db)):
+def get_doctor_by_license(license_number: str, db: Session = Depends(get_read_db)):
     """Get doctor by license number"""
     doctor = db.query(Doctor).filter(Doctor.license_number == license_number).first()
     if not doctor:
@@ -97,10 +139,11 @@ def update_doctor(doctor_id: int, doctor_update: DoctorUpdate, db: Session = Dep
         if existing_license:
             raise HTTPException(status_code=400, detail="License number already registered")
     
-    for key, value in doctor_update.dict(exclude_unset=True).items():
+    for key, value in doctor_update.model_dump(exclude_unset=True).items():
         setattr(doctor, key, value)
     
     db.commit()
+    response_cache.invalidate(DOCTOR_CACHE_NAMESPACE)
     db.refresh(doctor)
     return doctor
 
@@ -112,39 +155,42 @@ def delete_doctor(doctor_id: int, db: Session = Depends(get_db)):
     
     db.delete(doctor)
     db.commit()
+    response_cache.invalidate(DOCTOR_CACHE_NAMESPACE)
     return {"detail": "Doctor record deleted successfully"}
 
 @router.get("/search/", response_model=List[DoctorOut])
 def search_doctors(
+    response: Response,
     name: Optional[str] = Query(None, description="Search by doctor name"),
     email: Optional[str] = Query(None, description="Search by doctor email"),
     specialization: Optional[str] = Query(None, description="Search by specialization"),
     license_number: Optional[str] = Query(None, description="Search by license number"),
-    db: Session = Depends(get_db)
+    q: Optional[str] = Query(None, description="Free-text search across all fields, ranked by relevance"),
+    limit: int = Query(50, ge=1, le=200, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: Session = Depends(get_read_db)
 ):
-    """Search doctors by various criteria"""
-    query = db.query(Doctor).join(User)
-    
-    if name:
-        query = query.filter(User.name.ilike(f"%{name}%"))
-    if email:
-        query = query.filter(User.email.ilike(f"%{email}%"))
-    if specialization:
-        query = query.filter(Doctor.specialization.ilike(f"%{specialization}%"))
-    if license_number:
-        query = query.filter(Doctor.license_number.ilike(f"%{license_number}%"))
+    """Search doctors by various criteria (substring match, served from the search index)"""
+    filters = {field: value for field, value in (
+        ("name", name), ("email", email), ("specialization", specialization), ("license_number", license_number)
+    ) if value}
+    after = decode_rank_cursor(cursor) if cursor else None
+    hits = search_backend.search_doctors(db, filters, q, limit, after)
     
-    doctors = query.all()
-    return doctors
+    # Load the page in relevance order
+    ids = [doctor_id for _, doctor_id in hits]
+    found = {d.id: d for d in db.query(Doctor).options(joinedload(Doctor.user)).filter(Doctor.id.in_(ids))}
+    set_next_cursor(response, hits, limit, lambda hit: hit)
+    return orm_json_response([found[doctor_id] for doctor_id in ids if doctor_id in found], DoctorOut, response)
 
 @router.get("/specializations/", response_model=List[str])
-def get_specializations(db: Session = Depends(get_db)):
+def get_specializations(db: Session = Depends(get_read_db)):
     """Get all unique specializations"""
     specializations = db.query(Doctor.specialization).distinct().all()
     return [spec[0] for spec in specializations if spec[0]]
 
 @router.get("/{doctor_id}/basic", response_model=DoctorBasicOut)
-def get_doctor_basic(doctor_id: int, db: Session = Depends(get_db)):
+def get_doctor_basic(doctor_id: int, db: Session = Depends(get_read_db)):
     """Get doctor record without user details (for privacy-sensitive contexts)"""
     doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
     if not doctor:
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from app.database import SessionLocal, ReadSessionLocal
 from app.models.patient import Patient
 from app.models.user import User
 from app.schemas.patient_schema import PatientCreate, PatientOut, PatientUpdate, PatientBasicOut
-from typing import List, Optional
+from app.pagination.keyset import decode_id_cursor, decode_rank_cursor, set_next_cursor
+from app.search.search_index import search_backend
+from app.serialization.orm_json import orm_json_response
+from app.serialization.fieldsets import FieldSets, View
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
+# PatientOut nests the user; view=basic and fields= list patients without that join
+PATIENT_FIELDSETS = FieldSets(Patient, PatientOut, PatientBasicOut, joins=("user",))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,6 +22,13 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 @router.post("/", response_model=PatientOut)
 def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
     # Check if user exists
@@ -42,29 +56,42 @@ def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
     return db_patient
 
 @router.get("/{patient_id}", response_model=PatientOut)
-def get_patient(patient_id: int, db: Session = Depends(get_db)):
+def get_patient(patient_id: int, db: Session = Depends(get_read_db)):
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return patient
 
-@router.get("/", response_model=List[PatientOut])
+@router.get("/", response_model=Union[List[PatientOut], List[PatientBasicOut]])
 def get_patients(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; replaces skip"),
     diagnosis: Optional[str] = Query(None, description="Filter by diagnosis"),
-    db: Session = Depends(get_db)
+    view: View = Query("full", description="basic drops the nested user"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return instead of a view"),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Patient)
+    # The full view loads the nested user in the same SELECT
+    fieldset = PATIENT_FIELDSETS.resolve(view, fields)
+    query = fieldset.query(db)
     
     if diagnosis:
         query = query.filter(Patient.diagnosis.ilike(f"%{diagnosis}%"))
     
-    patients = query.offset(skip).limit(limit).all()
-    return patients
+    query = query.order_by(Patient.id)
+    if cursor:
+        query = query.filter(Patient.id > decode_id_cursor(cursor))
+    else:
+        query = query.offset(skip)
+    
+    patients = query.limit(limit).all()
+    set_next_cursor(response, patients, limit, lambda p: (p.id,))
+    return orm_json_response(patients, fieldset.model, response)
 
 @router.get("/user/{user_id}", response_model=PatientOut)
-def get_patient_by_user_id(user_id: int, db: Session = Depends(get_db)):
+def get_patient_by_user_id(user_id: int, db: Session = Depends(get_read_db)):
     """Get patient record by user ID"""
     patient = db.query(Patient).filter(Patient.id == user_id).first()
     if not patient:
@@ -77,7 +104,7 @@ def update_patient(patient_id: int, patient_update: PatientUpdate, db: Session =
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    for key, value in patient_update.dict(exclude_unset=True).items():
+    for key, value in patient_update.model_dump(exclude_unset=True).items():
         setattr(patient, key, value)
     
     db.commit()
@@ -96,26 +123,30 @@ def delete_patient(patient_id: int, db: Session = Depends(get_db)):
 
 @router.get("/search/", response_model=List[PatientOut])
 def search_patients(
+    response: Response,
     name: Optional[str] = Query(None, description="Search by patient name"),
     email: Optional[str] = Query(None, description="Search by patient email"),
     diagnosis: Optional[str] = Query(None, description="Search by diagnosis"),
-    db: Session = Depends(get_db)
+    q: Optional[str] = Query(None, description="Free-text search across all fields, ranked by relevance"),
+    limit: int = Query(50, ge=1, le=200, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: Session = Depends(get_read_db)
 ):
-    """Search patients by various criteria"""
-    query = db.query(Patient).join(User)
-    
-    if name:
-        query = query.filter(User.name.ilike(f"%{name}%"))
-    if email:
-        query = query.filter(User.email.ilike(f"%{email}%"))
-    if diagnosis:
-        query = query.filter(Patient.diagnosis.ilike(f"%{diagnosis}%"))
+    """Search patients by various criteria (substring match, served from the search index)"""
+    filters = {field: value for field, value in (
+        ("name", name), ("email", email), ("diagnosis", diagnosis)
+    ) if value}
+    after = decode_rank_cursor(cursor) if cursor else None
+    hits = search_backend.search_patients(db, filters, q, limit, after)
     
-    patients = query.all()
-    return patients
+    # Load the page in relevance order
+    ids = [patient_id for _, patient_id in hits]
+    found = {p.id: p for p in db.query(Patient).options(joinedload(Patient.user)).filter(Patient.id.in_(ids))}
+    set_next_cursor(response, hits, limit, lambda hit: hit)
+    return orm_json_response([found[patient_id] for patient_id in ids if patient_id in found], PatientOut, response)
 
 @router.get("/{patient_id}/basic", response_model=PatientBasicOut)
-def get_patient_basic(patient_id: int, db: Session = Depends(get_db)):
+def get_patient_basic(patient_id: int, db: Session = Depends(get_read_db)):
     """Get patient record without user details (for privacy-sensitive contexts)"""
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
@@ -1,16 +1,27 @@
 # Updated FastAPI user authentication + registration flow with JWT and bcrypt
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal, AsyncSessionLocal
 from app.models.user import User
 from app.schemas.user_schema import UserCreate, UserOut, UserUpdate
 from app.auth.auth_service import AuthService, get_current_active_user
+from app.auth.user_cache import user_cache
+from app.caching.response_cache import response_cache
+from app.caching.idempotency import idempotency_store
+from app.serialization.orm_json import orm_json_response
+from app.routes.doctor_routes import DOCTOR_CACHE_NAMESPACE
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import List
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# Retried registrations with the same Idempotency-Key get the first response back
+idempotency_store.protect_paths("/users/register")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,25 +29,42 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # --------------------- Public Registration ---------------------
 @router.post("/register", response_model=UserOut)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await db.scalar(select(User).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = AuthService.hash_password(user.password_hash)
-    db_user = User(**user.dict(exclude={"password_hash"}), password_hash=hashed_password)
+    # bcrypt runs on the worker pool so the event loop stays free
+    hashed_password = await AuthService.hash_password_async(user.password_hash)
+    db_user = User(**user.model_dump(exclude={"password_hash"}), password_hash=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent registration took the email after the check above
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await db.refresh(db_user)
     return db_user
 
 # --------------------- Login Route ---------------------
 @router.post("/login")
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not AuthService.verify_password(form_data.password, user.password_hash):
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await AuthService.verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token = AuthService.create_access_token(data={"sub": str(user.id)})
@@ -44,23 +72,28 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
 
 # --------------------- Protected Routes ---------------------
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_active_user)):
+def get_me(current_user: UserOut = Depends(get_current_active_user)):
     return current_user
 
+@router.get("/cache/stats")
+def get_user_cache_stats(current_user: UserOut = Depends(get_current_active_user)):
+    """Hit/miss counters for the authenticated-user cache"""
+    return user_cache.stats()
+
 @router.get("/{user_id}", response_model=UserOut)
-def read_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def read_user(user_id: int, db: Session = Depends(get_read_db), current_user: UserOut = Depends(get_current_active_user)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.get("/", response_model=List[UserOut])
-def read_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def read_users(db: Session = Depends(get_read_db), current_user: UserOut = Depends(get_current_active_user)):
     users = db.query(User).all()
-    return users
+    return orm_json_response(users, UserOut)
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(user_id: int, updated: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def update_user(user_id: int, updated: UserUpdate, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_active_user)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -70,17 +103,23 @@ def update_user(user_id: int, updated: UserUpdate, db: Session = Depends(get_db)
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
 
-    for key, value in updated.dict(exclude_unset=True).items():
+    for key, value in updated.model_dump(exclude_unset=True).items():
         setattr(user, key, value)
     db.commit()
     db.refresh(user)
+    user_cache.invalidate_user(user_id)
+    # Doctor payloads embed the user's name and email
+    response_cache.invalidate(DOCTOR_CACHE_NAMESPACE)
     return user
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_active_user)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user)
     db.commit()
+    user_cache.invalidate_user(user_id)
+    # Doctor payloads embed the user's name and email
+    response_cache.invalidate(DOCTOR_CACHE_NAMESPACE)
     return {"detail": "User deleted successfully"}
@@ -0,0 +1,161 @@
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seeds a throwaway SQLite database and asks the app for free slots
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="availability-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'availability_benchmark.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+# Every request has to reach the route, not the response cache
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.database import SessionLocal, engine
+from app.main import create_app
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.scheduling.conflict_index import ACTIVE_STATUSES, WORKING_HOURS_END, WORKING_HOURS_START, scheduler
+
+SEED_BATCH_SIZE = 50000
+DURATION_MINUTES = 30
+SLOTS_PER_DAY = (WORKING_HOURS_END - WORKING_HOURS_START) * 60 // DURATION_MINUTES
+
+def seed(doctors: int, days: int, full_days: int, booked: float, first_day: datetime) -> int:
+    """``doctors`` cardiologists, fully booked for ``full_days`` days and ``booked`` of their 30-minute working slots after that.
+
+    Returns the number of appointments.
+    """
+    chooser = random.Random(0)
+    patient_id = doctors + 1
+
+    def slots(days: range) -> List[datetime]:
+        return [
+            first_day + timedelta(days=day, hours=WORKING_HOURS_START, minutes=DURATION_MINUTES * slot)
+            for day in days for slot in range(SLOTS_PER_DAY)
+        ]
+
+    full, partial = slots(range(full_days)), slots(range(full_days, days))
+    rows = [
+        {
+            "patient_id": patient_id, "doctor_id": doctor_id, "appointment_date": slot, "duration_minutes": DURATION_MINUTES,
+            "status": AppointmentStatus.CONFIRMED, "created_at": first_day, "updated_at": first_day,
+        }
+        for doctor_id in range(1, doctors + 1)
+        for slot in full + chooser.sample(partial, int(len(partial) * booked))
+    ]
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": "x", "role": "doctor"}
+            for index in range(1, patient_id + 1)
+        ])
+        conn.execute(Doctor.__table__.insert(), [
+            {"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"} for index in range(1, doctors + 1)
+        ])
+        conn.execute(Patient.__table__.insert(), [{"id": patient_id, "diagnosis": "Hypertension"}])
+        for offset in range(0, len(rows), SEED_BATCH_SIZE):
+            conn.execute(Appointment.__table__.insert(), rows[offset:offset + SEED_BATCH_SIZE])
+    return len(rows)
+
+def scan_first_free(doctor_ids: List[int], start: datetime, end: datetime) -> Optional[Tuple[datetime, int]]:
+    """What a client did before the API: fetch the doctors' appointments and diff them against working hours"""
+    db = SessionLocal()
+    try:
+        taken: Dict[int, set] = {doctor_id: set() for doctor_id in doctor_ids}
+        rows = db.execute(select(Appointment.doctor_id, Appointment.appointment_date, Appointment.duration_minutes).where(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.appointment_date >= start - timedelta(minutes=180),
+            Appointment.appointment_date < end,
+            Appointment.status.in_(ACTIVE_STATUSES),
+        ))
+        for doctor_id, appointment_date, duration_minutes in rows:
+            for minute in range(0, duration_minutes, DURATION_MINUTES):
+                taken[doctor_id].add(appointment_date + timedelta(minutes=minute))
+    finally:
+        db.close()
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        for slot in range(SLOTS_PER_DAY):
+            slot_start = day + timedelta(hours=WORKING_HOURS_START, minutes=DURATION_MINUTES * slot)
+            if slot_start < start or slot_start + timedelta(minutes=DURATION_MINUTES) > end:
+                continue
+            for doctor_id in doctor_ids:
+                if slot_start not in taken[doctor_id]:
+                    return slot_start, doctor_id
+        day += timedelta(days=1)
+    return None
+
+def time_it(function: Callable[[], object], repeat: int, before: Callable[[], None] = lambda: None) -> float:
+    timings = []
+    for _ in range(repeat):
+        before()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the earliest free slot across many doctors with mostly booked weeks")
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--full-days", type=int, default=6, help="leading days with every working slot booked")
+    parser.add_argument("--booked", type=float, default=0.9, help="fraction of working slots booked on the remaining days")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=50.0, help="slowest allowed warm median for the first-slot request")
+    args = parser.parse_args(argv)
+    first_day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = first_day, first_day + timedelta(days=args.days)
+    window = f"specialization=Cardiology&start={start.isoformat()}&end={end.isoformat()}&duration_minutes={DURATION_MINUTES}"
+
+    try:
+        with TestClient(create_app()) as client:
+            started = time.perf_counter()
+            appointments = seed(args.doctors, args.days, args.full_days, args.booked, first_day)
+            print(f"Seeded {args.doctors} doctors and {appointments} appointments in {time.perf_counter() - started:.1f}s")
+
+            def first_slot():
+                response = client.get(f"/appointments/doctors/availability/first?{window}")
+                response.raise_for_status()
+                return response.json()
+
+            def all_slots():
+                client.get(f"/appointments/doctors/availability?{window}&limit=20").raise_for_status()
+
+            found = first_slot()
+            expected = scan_first_free(list(range(1, args.doctors + 1)), start, end)
+            if expected is None or (datetime.fromisoformat(found["start"]), found["doctor_id"]) != expected:
+                print(f"❌ The API found {found}, the appointment scan {expected}")
+                return 1
+
+            cases = (
+                ("first free slot, cold index", first_slot, scheduler.invalidate),
+                ("first free slot, warm", first_slot, lambda: None),
+                ("20 slots per doctor, warm", all_slots, lambda: None),
+                ("scan of appointments", lambda: scan_first_free(list(range(1, args.doctors + 1)), start, end), lambda: None),
+            )
+            results = [(name, time_it(function, args.repeat, before)) for name, function, before in cases]
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+    print(f"Median of {args.repeat} requests over {args.days} days: {args.full_days} fully booked, then {args.booked:.0%} of working slots")
+    for name, median in results:
+        print(f"{name:30} {median * 1000:9.2f}ms")
+    warm = results[1][1]
+    if warm * 1000 > args.max_ms:
+        print(f"❌ The first free slot took {warm * 1000:.1f}ms, over {args.max_ms}ms")
+        return 1
+    print(f"✅ First free slot {found['start']} with doctor {found['doctor_id']}, as the scan found, in {warm * 1000:.1f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
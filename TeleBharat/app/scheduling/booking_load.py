@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Seeds a throwaway SQLite database and drives the app in-process, so
+# bookings, sockets and the routes all share one event loop as they
+# would in a single uvicorn worker
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="booking-load-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'booking_load.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+
+import httpx
+from app.database import engine
+from app.main import create_app
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+
+PATIENT_ID = 1
+SLOT_STEP_MINUTES = 30
+LOOP_PROBE_SECONDS = 0.01
+
+class AsgiWebSocket:
+    """A WebSocket client talking to the app over ASGI, without a server.
+
+    Records how long each message waited before the route read it, which
+    is how long a blocked event loop holds up every socket.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.received: List[str] = []
+        self.delays: List[float] = []
+        self.task: Optional[asyncio.Task] = None
+
+    async def open(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": self.path,
+            "raw_path": self.path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 0), "server": ("testserver", 80), "subprotocols": [],
+        }
+        self.inbox.put_nowait((None, {"type": "websocket.connect"}))
+        self.task = asyncio.create_task(self.app(scope, self._receive, self._send))
+        await self.accepted.wait()
+
+    def send_text(self, text: str):
+        self.inbox.put_nowait((time.perf_counter(), {"type": "websocket.receive", "text": text}))
+
+    async def close(self):
+        self.inbox.put_nowait((None, {"type": "websocket.disconnect", "code": 1000}))
+        await self.task
+
+    async def _receive(self) -> Dict:
+        sent_at, message = await self.inbox.get()
+        if sent_at is not None:
+            self.delays.append(time.perf_counter() - sent_at)
+        return message
+
+    async def _send(self, message: Dict):
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.send":
+            self.received.append(message["text"])
+
+def seed(doctors: int):
+    """One patient and ``doctors`` doctors, inserted with Core"""
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": "x",
+             "role": "patient" if index == PATIENT_ID else "doctor"}
+            for index in range(1, doctors + 2)
+        ])
+        conn.execute(Patient.__table__.insert(), [{"id": PATIENT_ID, "diagnosis": "Hypertension"}])
+        conn.execute(Doctor.__table__.insert(), [
+            {"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"}
+            for index in range(2, doctors + 2)
+        ])
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def describe(name: str, values: List[float]) -> str:
+    return (f"{name:20} {len(values):>7} {percentile(values, 0.5) * 1000:8.2f} "
+            f"{percentile(values, 0.99) * 1000:8.2f} {max(values, default=0) * 1000:8.2f}")
+
+async def chatter(sockets: List[AsgiWebSocket], interval: float, done: asyncio.Event):
+    """Each doctor socket sends a heartbeat every ``interval`` seconds, staggered"""
+    while not done.is_set():
+        for socket in sockets:
+            socket.send_text('{"type": "heartbeat"}')
+            await asyncio.sleep(interval / len(sockets))
+
+async def probe_loop(lags: List[float], done: asyncio.Event):
+    """How late the event loop wakes a sleeping coroutine"""
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_PROBE_SECONDS)
+        lags.append(time.perf_counter() - started - LOOP_PROBE_SECONDS)
+
+async def run(bookings: int, concurrency: int, doctors: int, listeners: int, interval: float, max_p99_ms: float) -> int:
+    app = create_app()
+    # Keep the manager's per-connection messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        async with app.router.lifespan_context(app):
+            seed(doctors)
+            doctor_ids = list(range(2, doctors + 2))
+            doctor_sockets = [AsgiWebSocket(app, f"/appointments/ws/doctors/{doctor_id}") for doctor_id in doctor_ids]
+            sockets = doctor_sockets + [AsgiWebSocket(app, "/appointments/ws/general") for _ in range(listeners)]
+            for socket in sockets:
+                await socket.open()
+
+            base = (datetime.utcnow() + timedelta(days=7)).replace(hour=9, minute=0, second=0, microsecond=0)
+            # As many slots as bookings per doctor, so about a third land on a taken slot
+            slots = max(1, bookings // doctors)
+            bodies = [{
+                "patient_id": PATIENT_ID,
+                "doctor_id": random.choice(doctor_ids),
+                "appointment_date": (base + timedelta(minutes=SLOT_STEP_MINUTES * random.randrange(slots))).isoformat(),
+                "duration_minutes": SLOT_STEP_MINUTES,
+            } for _ in range(bookings)]
+            latencies: List[float] = []
+            statuses: Dict[int, int] = {}
+            gate = asyncio.Semaphore(concurrency)
+
+            async def book(client: httpx.AsyncClient, body: Dict):
+                async with gate:
+                    started = time.perf_counter()
+                    response = await client.post("/appointments/", json=body)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            done = asyncio.Event()
+            lags: List[float] = []
+            background = [asyncio.create_task(chatter(doctor_sockets, interval, done)), asyncio.create_task(probe_loop(lags, done))]
+            transport = httpx.ASGITransport(app=app)
+            started = time.perf_counter()
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+                await asyncio.gather(*(book(client, body) for body in bodies))
+            elapsed = time.perf_counter() - started
+            done.set()
+            await asyncio.gather(*background)
+            # Let the writer tasks deliver the last notifications
+            await asyncio.sleep(0.2)
+            for socket in sockets:
+                await socket.close()
+
+    booked = statuses.get(200, 0)
+    refused = statuses.get(400, 0)
+    failed = bookings - booked - refused
+    notified = sum(
+        message.startswith('{"type": "appointment_created"')
+        for socket in doctor_sockets for message in socket.received
+    )
+    socket_delays = [delay for socket in sockets for delay in socket.delays]
+    print(f"{bookings} bookings, {concurrency} at a time, in {elapsed:.2f}s ({bookings / elapsed:.0f} requests/s); "
+          f"{len(sockets)} sockets, doctors sending a heartbeat every {interval * 1000:.0f}ms")
+    print(f"{booked} booked, {refused} refused as conflicts, {failed} failed, {notified} doctor notifications delivered")
+    print(f"{'':20} {'samples':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print(describe("booking", latencies))
+    print(describe("websocket message", socket_delays))
+    print(describe("event loop lag", lags))
+
+    if failed:
+        print(f"❌ {failed} bookings failed: {statuses}")
+        return 1
+    if notified != booked:
+        print(f"❌ {booked} bookings but {notified} doctor notifications")
+        return 1
+    if percentile(socket_delays, 0.99) * 1000 > max_p99_ms:
+        print(f"❌ WebSocket messages waited over {max_p99_ms}ms at p99 while bookings ran")
+        return 1
+    print(f"✅ WebSocket p99 stayed under {max_p99_ms}ms during {bookings} concurrent bookings")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure booking and WebSocket latency while bookings and socket traffic share one worker")
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--listeners", type=int, default=200, help="extra sockets on /appointments/ws/general")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between heartbeats from each doctor")
+    parser.add_argument("--max-p99-ms", type=float, default=5.0, help="largest allowed p99 wait of a WebSocket message")
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(run(args.bookings, args.concurrency, args.doctors, args.listeners, args.interval, args.max_p99_ms))
+    finally:
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
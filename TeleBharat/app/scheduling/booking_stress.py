@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import httpx
+
+# Every booking lands inside this window, so most requests overlap another
+SLOT_STEP_MINUTES = 10
+SLOTS_PER_DOCTOR = 24
+
+async def create_user(client: httpx.AsyncClient, role: str, tag: str) -> int:
+    response = await client.post("/users/register", json={
+        "name": f"Stress {role} {tag}",
+        "email": f"stress-{role}-{tag}@example.com",
+        "role": role,
+        "password_hash": uuid.uuid4().hex,
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+async def create_fixtures(client: httpx.AsyncClient, doctors: int) -> Tuple[int, List[int]]:
+    """Register one patient and ``doctors`` doctors to book against"""
+    run = uuid.uuid4().hex[:8]
+    patient_id = await create_user(client, "patient", run)
+    (await client.post("/patients/", json={"user_id": patient_id})).raise_for_status()
+    doctor_ids = []
+    for index in range(doctors):
+        doctor_id = await create_user(client, "doctor", f"{run}-{index}")
+        (await client.post("/doctors/", json={
+            "user_id": doctor_id, "specialization": "stress", "license_number": f"STRESS-{run}-{index}"
+        })).raise_for_status()
+        doctor_ids.append(doctor_id)
+    return patient_id, doctor_ids
+
+def find_overlaps(appointments: List[Dict]) -> List[Tuple[int, int]]:
+    """Pairs of active appointments of one doctor whose intervals intersect"""
+    intervals = sorted(
+        (datetime.fromisoformat(a["appointment_date"]), datetime.fromisoformat(a["appointment_date"]) + timedelta(minutes=a["duration_minutes"] or 30), a["id"])
+        for a in appointments if a["status"] in ("pending", "confirmed")
+    )
+    overlaps = []
+    latest_end: Optional[datetime] = None
+    latest_id = None
+    for start, end, appointment_id in intervals:
+        if latest_end is not None and start < latest_end:
+            overlaps.append((latest_id, appointment_id))
+        if latest_end is None or end > latest_end:
+            latest_end, latest_id = end, appointment_id
+    return overlaps
+
+async def book_batch(client: httpx.AsyncClient, bodies: List[Dict]) -> Tuple[int, int, int]:
+    """(booked, rejected, failed) for one POST /appointments/batch"""
+    response = await client.post("/appointments/batch", json=bodies)
+    if response.status_code != 200:
+        return 0, 0, len(bodies)
+    result = response.json()
+    rejected = sum(error["error"] == "Doctor already has an appointment at this time" for error in result["errors"])
+    return result["imported"], rejected, result["failed"] - rejected
+
+async def run(url: str, bookings: int, doctors: int, duration: int, batch_size: int = 0) -> int:
+    limits = httpx.Limits(max_connections=bookings)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        patient_id, doctor_ids = await create_fixtures(client, doctors)
+        base = (datetime.utcnow() + timedelta(days=7)).replace(hour=9, minute=0, second=0, microsecond=0)
+        requests = [{
+            "patient_id": patient_id,
+            "doctor_id": random.choice(doctor_ids),
+            "appointment_date": (base + timedelta(minutes=SLOT_STEP_MINUTES * random.randrange(SLOTS_PER_DOCTOR))).isoformat(),
+            "duration_minutes": duration,
+        } for _ in range(bookings)]
+        # With --batch-size, every other group of bookings goes through the batch endpoint instead
+        singles, batches = requests, []
+        if batch_size:
+            groups = [requests[index:index + batch_size] for index in range(0, len(requests), batch_size)]
+            singles = [body for group in groups[1::2] for body in group]
+            batches = groups[::2]
+
+        started = time.perf_counter()
+        responses, batch_results = await asyncio.gather(
+            asyncio.gather(*(client.post("/appointments/", json=body) for body in singles)),
+            asyncio.gather(*(book_batch(client, group) for group in batches))
+        )
+        elapsed = time.perf_counter() - started
+
+        booked = sum(response.status_code == 200 for response in responses) + sum(result[0] for result in batch_results)
+        rejected = sum(response.status_code == 400 for response in responses) + sum(result[1] for result in batch_results)
+        failed = bookings - booked - rejected
+        overlaps = []
+        for doctor_id in doctor_ids:
+            response = await client.get(f"/appointments/doctor/{doctor_id}")
+            response.raise_for_status()
+            overlaps.extend(find_overlaps(response.json()))
+
+    print(f"{bookings} concurrent bookings ({len(batches)} batches) in {elapsed:.2f}s ({bookings / elapsed:.0f} requests/s)")
+    print(f"{booked} booked ({booked / elapsed:.0f} bookings/s), {rejected} rejected as conflicts, {failed} failed")
+    for first, second in overlaps[:10]:
+        print(f"❌ Appointments {first} and {second} overlap")
+    if len(overlaps) > 10:
+        print(f"❌ ...and {len(overlaps) - 10} more overlapping pairs")
+    if overlaps or failed:
+        return 1
+    print("✅ No overlapping appointments")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fire concurrent bookings at overlapping slots and check none overlap")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--duration", type=int, default=30, help="minutes per booking")
+    parser.add_argument("--batch-size", type=int, default=0, help="send half the bookings through /appointments/batch in groups of this size")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args.url, args.bookings, args.doctors, args.duration, args.batch_size))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+# Seeds a throwaway SQLite database; bookings go through the app's engines
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="conflict-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'conflict_benchmark.db')}"
+
+from app.database import AsyncSessionLocal, SessionLocal, dispose_engines, engine
+from app.migrations.migrator import setup_schema
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.scheduling.conflict_index import scheduler
+from app.scheduling.reservations import book_slot, check_conflict
+
+DOCTOR_ID, PATIENT_ID = 1, 2
+HISTORY_START = datetime(2020, 1, 1)
+SEED_BATCH_SIZE = 50000
+
+def seed_people():
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": DOCTOR_ID, "name": "Dr Rao", "email": "rao@example.com", "password_hash": "x", "role": "doctor"},
+            {"id": PATIENT_ID, "name": "Asha", "email": "asha@example.com", "password_hash": "x", "role": "patient"},
+        ])
+        conn.execute(Doctor.__table__.insert(), [{"id": DOCTOR_ID, "specialization": "Cardiology", "license_number": "KA-1"}])
+        conn.execute(Patient.__table__.insert(), [{"id": PATIENT_ID, "diagnosis": "Hypertension"}])
+
+def grow_history(first: int, last: int):
+    """Back-to-back active appointments ``first`` to ``last`` of the doctor's history, inserted with Core"""
+    with engine.begin() as conn:
+        for offset in range(first, last, SEED_BATCH_SIZE):
+            conn.execute(Appointment.__table__.insert(), [
+                {
+                    "patient_id": PATIENT_ID, "doctor_id": DOCTOR_ID,
+                    "appointment_date": HISTORY_START + timedelta(minutes=30 * index), "duration_minutes": 30,
+                    "status": AppointmentStatus.CONFIRMED, "created_at": HISTORY_START, "updated_at": HISTORY_START,
+                }
+                for index in range(offset, min(offset + SEED_BATCH_SIZE, last))
+            ])
+
+async def book(start: datetime) -> Optional[int]:
+    """One booking through the same path as POST /appointments/"""
+    async with AsyncSessionLocal() as db:
+        def add_appointment():
+            appointment = Appointment(
+                patient_id=PATIENT_ID, doctor_id=DOCTOR_ID, appointment_date=start,
+                duration_minutes=30, status=AppointmentStatus.PENDING
+            )
+            db.add(appointment)
+            return appointment
+        return await book_slot(db, DOCTOR_ID, start, 30, add_appointment)
+
+def median_ms(timings: List[float]) -> float:
+    return statistics.median(timings) * 1000
+
+async def measure(history: int, bookings: int, next_slot: datetime):
+    """Median milliseconds to load the index, look up a slot, refuse a taken slot and book a free one"""
+    scheduler.invalidate(DOCTOR_ID)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        scheduler.get_schedule(db, DOCTOR_ID)
+        load = time.perf_counter() - started
+
+        lookups, refusals = [], []
+        for index in range(bookings):
+            # Taken slots spread over the whole history
+            taken = HISTORY_START + timedelta(minutes=30 * (index * history // bookings))
+            started = time.perf_counter()
+            scheduler.find_conflict(db, DOCTOR_ID, taken, 30)
+            lookups.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            conflicting_id = check_conflict(db, DOCTOR_ID, taken, 30)
+            refusals.append(time.perf_counter() - started)
+            if conflicting_id is None:
+                raise AssertionError(f"{taken} should be taken")
+            db.rollback()
+    finally:
+        db.close()
+
+    booked = []
+    for index in range(bookings):
+        started = time.perf_counter()
+        if await book(next_slot + timedelta(minutes=30 * index)) is not None:
+            raise AssertionError("a free slot was refused")
+        booked.append(time.perf_counter() - started)
+    return load * 1000, median_ms(lookups), median_ms(refusals), median_ms(booked)
+
+async def run(sizes: List[int], bookings: int, max_ratio: float) -> int:
+    try:
+        return await compare(sizes, bookings, max_ratio)
+    finally:
+        await dispose_engines()
+
+async def compare(sizes: List[int], bookings: int, max_ratio: float) -> int:
+    seed_people()
+    # Bookings land after the largest history so they never collide with it
+    next_slot = HISTORY_START + timedelta(minutes=30 * (sizes[-1] + 1))
+    print(f"{'history':>9} {'index load':>11} {'lookup':>9} {'refuse':>9} {'book':>9} {'book ratio':>11}")
+    grown, baseline, failed = 0, None, False
+    for size in sizes:
+        grow_history(grown, size)
+        grown = size
+        load, lookup, refuse, booked = await measure(size, bookings, next_slot)
+        next_slot += timedelta(minutes=30 * bookings)
+        baseline = baseline or booked
+        print(f"{size:>9} {load:9.1f}ms {lookup * 1000:7.1f}us {refuse:7.2f}ms {booked:7.2f}ms {booked / baseline:10.2f}x")
+        if booked / baseline > max_ratio:
+            failed = True
+    if failed:
+        print(f"❌ Booking latency grew more than {max_ratio}x with the doctor's history")
+        return 1
+    print(f"✅ Booking latency stays within {max_ratio}x from {sizes[0]} to {sizes[-1]} appointments of history")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time booking one doctor as their appointment history grows")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated history sizes, ascending")
+    parser.add_argument("--bookings", type=int, default=200, help="bookings timed per size")
+    parser.add_argument("--max-ratio", type=float, default=2.0, help="largest allowed booking slowdown over the smallest size")
+    args = parser.parse_args(argv)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    try:
+        setup_schema()
+        return asyncio.run(run(sizes, args.bookings, args.max_ratio))
+    finally:
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
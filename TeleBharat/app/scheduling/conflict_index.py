@@ -0,0 +1,371 @@
+from bisect import bisect_left, insort
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+from sqlalchemy.orm import Session
+from app.models.appointment import Appointment, AppointmentStatus
+
+# Only these statuses block a doctor's time slot
+ACTIVE_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+DEFAULT_DURATION_MINUTES = 30
+
+# Occupancy bitmaps split each day into cells of this many minutes
+SLOT_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOT = timedelta(minutes=SLOT_MINUTES)
+
+# Free slots are only offered inside working hours (UTC, like appointment_date)
+WORKING_HOURS_START = int(os.getenv("WORKING_HOURS_START", "9"))
+WORKING_HOURS_END = int(os.getenv("WORKING_HOURS_END", "17"))
+
+def appointment_interval(start: datetime, duration_minutes: Optional[int]) -> Tuple[datetime, datetime]:
+    """Return the (start, end) interval an appointment occupies"""
+    return start, start + timedelta(minutes=duration_minutes or DEFAULT_DURATION_MINUTES)
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+def cell_range(day: date, start: datetime, end: datetime) -> Tuple[int, int]:
+    """Return the cells of ``day`` touched by [start, end), clamped to the day"""
+    offset = start - day_start(day)
+    first = max(0, offset // SLOT)
+    last = min(CELLS_PER_DAY, -(-(end - day_start(day)) // SLOT))
+    return first, last
+
+def cell_mask(first: int, last: int) -> int:
+    """Bitmask with bits [first, last) set"""
+    return ((1 << last) - 1) ^ ((1 << first) - 1) if last > first else 0
+
+def run_starts(free: int, length: int) -> int:
+    """Bits of ``free`` that start a run of at least ``length`` set bits"""
+    covered = 1
+    while covered < length:
+        shift = min(covered, length - covered)
+        free &= free >> shift
+        covered += shift
+    return free
+
+def slot_windows(
+    start: datetime,
+    end: datetime,
+    step_minutes: int,
+    working_hours: Tuple[int, int] = (WORKING_HOURS_START, WORKING_HOURS_END)
+) -> List[Tuple[date, int, int]]:
+    """(day, window, aligned) for each day of [start, end).
+
+    ``window`` holds the cells a slot may cover that day - inside working
+    hours and the range - and ``aligned`` the cells a slot may start on.
+    They are the same for every doctor, so a search works them out once.
+    """
+    step = max(1, step_minutes // SLOT_MINUTES)
+    hours_first, hours_last = working_hours[0] * 60 // SLOT_MINUTES, working_hours[1] * 60 // SLOT_MINUTES
+    aligned = sum(1 << cell for cell in range(hours_first, hours_last, step))
+    windows = []
+    day = start.date()
+    while day_start(day) < end:
+        # A slot must start at or after ``start`` and finish by ``end``
+        first = max(0, -(-(start - day_start(day)) // SLOT))
+        last = min(CELLS_PER_DAY, (end - day_start(day)) // SLOT)
+        windows.append((day, cell_mask(max(first, hours_first), min(last, hours_last)), aligned))
+        day += timedelta(days=1)
+    return windows
+
+class DoctorSchedule:
+    """Sorted interval index of one doctor's active appointments.
+
+    Entries are kept ordered by start time. Because no appointment is longer
+    than ``max_duration``, only entries starting in
+    ``[start - max_duration, end)`` can overlap a query interval, so an
+    overlap lookup is a binary search plus a short forward scan.
+
+    Alongside the entries, ``days`` holds one occupancy bitmap per day that
+    has appointments: bit ``i`` is set when any appointment touches the
+    ``SLOT_MINUTES`` cell starting ``i`` cells after midnight. Free-slot
+    searches work on these bitmaps instead of the entries.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[datetime, int, datetime]] = []  # (start, appointment_id, end)
+        self.by_id: Dict[int, Tuple[datetime, int, datetime]] = {}
+        self.max_duration = timedelta(0)
+        self.days: Dict[date, int] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, appointment_id: int, start: datetime, end: datetime, refresh: bool = True):
+        self.remove(appointment_id)
+        entry = (start, appointment_id, end)
+        insort(self.entries, entry)
+        self.by_id[appointment_id] = entry
+        if end - start > self.max_duration:
+            self.max_duration = end - start
+        if refresh:
+            self._mark_days(start, end)
+
+    def remove(self, appointment_id: int):
+        entry = self.by_id.pop(appointment_id, None)
+        if entry is None:
+            return
+        index = bisect_left(self.entries, entry)
+        if index < len(self.entries) and self.entries[index] == entry:
+            del self.entries[index]
+        self._refresh_days(entry[0], entry[2])
+
+    def _overlapping(self, start: datetime, end: datetime):
+        index = bisect_left(self.entries, (start - self.max_duration,))
+        while index < len(self.entries):
+            entry = self.entries[index]
+            if entry[0] >= end:
+                break
+            if entry[2] > start:
+                yield entry
+            index += 1
+
+    def find_overlap(self, start: datetime, end: datetime, exclude_id: Optional[int] = None) -> Optional[int]:
+        """Return the id of an entry overlapping [start, end), if any"""
+        for _, appointment_id, _ in self._overlapping(start, end):
+            if appointment_id != exclude_id:
+                return appointment_id
+        return None
+
+    def _refresh_days(self, start: datetime, end: datetime):
+        # Recompute rather than flip bits: entries may overlap (rows written
+        # before conflict checks existed), so clearing one must keep the other
+        day = start.date()
+        while day_start(day) < end:
+            bits = 0
+            next_day = day_start(day) + timedelta(days=1)
+            for entry_start, _, entry_end in self._overlapping(day_start(day), next_day):
+                bits |= cell_mask(*cell_range(day, entry_start, entry_end))
+            if bits:
+                self.days[day] = bits
+            else:
+                self.days.pop(day, None)
+            day += timedelta(days=1)
+
+    def _mark_days(self, start: datetime, end: datetime):
+        day = start.date()
+        while day_start(day) < end:
+            self.days[day] = self.days.get(day, 0) | cell_mask(*cell_range(day, start, end))
+            day += timedelta(days=1)
+
+    def rebuild_days(self):
+        """Recompute every occupancy bitmap from the entries"""
+        self.days.clear()
+        for entry_start, _, entry_end in self.entries:
+            self._mark_days(entry_start, entry_end)
+
+    def free_slots(
+        self,
+        start: datetime,
+        end: datetime,
+        duration_minutes: int,
+        step_minutes: int,
+        limit: int,
+        working_hours: Tuple[int, int] = (WORKING_HOURS_START, WORKING_HOURS_END),
+        windows: Optional[List[Tuple[date, int, int]]] = None
+    ) -> List[Tuple[datetime, datetime]]:
+        """Return up to ``limit`` free (start, end) slots inside [start, end).
+
+        Slots start on ``step_minutes`` boundaries counted from the start of
+        working hours and never leave working hours. Each day costs a handful
+        of big-int operations on its bitmap. Pass ``windows`` from
+        ``slot_windows`` when searching many doctors over the same range.
+        """
+        length = -(-duration_minutes // SLOT_MINUTES)
+        slots = []
+        for day, window, aligned in windows if windows is not None else slot_windows(start, end, step_minutes, working_hours):
+            if len(slots) >= limit:
+                break
+            candidates = run_starts(window & ~self.days.get(day, 0), length) & aligned
+            while candidates and len(slots) < limit:
+                lowest = candidates & -candidates
+                slot_start = day_start(day) + (lowest.bit_length() - 1) * SLOT
+                slots.append((slot_start, slot_start + timedelta(minutes=duration_minutes)))
+                candidates ^= lowest
+        return slots
+
+class AppointmentScheduler:
+    """Per-doctor conflict detection backed by in-memory interval indexes.
+
+    A doctor's index is loaded from the database the first time it is needed
+    and then kept in sync through ``sync`` after every committed
+    create, update and cancel. Writes made by other workers arrive as
+    ``sync_row`` calls from the WebSocket backplane.
+    """
+
+    def __init__(self):
+        self._schedules: Dict[int, DoctorSchedule] = {}
+        # Bumped whenever a write lands for a doctor whose index is not loaded,
+        # so a load that raced with that write is discarded and retried
+        self._versions: Dict[int, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, doctor_id: int) -> DoctorSchedule:
+        schedule = DoctorSchedule()
+        rows = db.query(
+            Appointment.id, Appointment.appointment_date, Appointment.duration_minutes
+        ).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.status.in_(ACTIVE_STATUSES)
+        ).all()
+        for appointment_id, appointment_date, duration_minutes in rows:
+            schedule.add(appointment_id, *appointment_interval(appointment_date, duration_minutes), refresh=False)
+        schedule.rebuild_days()
+        return schedule
+
+    def get_schedule(self, db: Session, doctor_id: int) -> DoctorSchedule:
+        # The database read happens outside the lock: under an AsyncSession it
+        # yields to the event loop, and other coroutines share this thread
+        while True:
+            with self._lock:
+                schedule = self._schedules.get(doctor_id)
+                if schedule is not None:
+                    return schedule
+                version = (self._generation, self._versions.get(doctor_id, 0))
+            schedule = self._load(db, doctor_id)
+            with self._lock:
+                if (self._generation, self._versions.get(doctor_id, 0)) == version:
+                    return self._schedules.setdefault(doctor_id, schedule)
+
+    def get_schedules(self, db: Session, doctor_ids: Iterable[int]) -> Dict[int, DoctorSchedule]:
+        """Return the indexes of many doctors, loading the missing ones in one query"""
+        doctor_ids = list(dict.fromkeys(doctor_ids))
+        with self._lock:
+            schedules = {doctor_id: self._schedules[doctor_id] for doctor_id in doctor_ids if doctor_id in self._schedules}
+            missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in schedules]
+            versions = {doctor_id: (self._generation, self._versions.get(doctor_id, 0)) for doctor_id in missing}
+        if not missing:
+            return schedules
+        loaded = {doctor_id: DoctorSchedule() for doctor_id in missing}
+        rows = db.query(
+            Appointment.doctor_id, Appointment.id, Appointment.appointment_date, Appointment.duration_minutes
+        ).filter(
+            Appointment.doctor_id.in_(missing),
+            Appointment.status.in_(ACTIVE_STATUSES)
+        ).all()
+        for doctor_id, appointment_id, appointment_date, duration_minutes in rows:
+            loaded[doctor_id].add(appointment_id, *appointment_interval(appointment_date, duration_minutes), refresh=False)
+        for schedule in loaded.values():
+            schedule.rebuild_days()
+        raced = []
+        with self._lock:
+            for doctor_id, schedule in loaded.items():
+                if (self._generation, self._versions.get(doctor_id, 0)) == versions[doctor_id]:
+                    schedules[doctor_id] = self._schedules.setdefault(doctor_id, schedule)
+                else:
+                    raced.append(doctor_id)
+        # A write landed while loading; fall back to the per-doctor retry loop
+        for doctor_id in raced:
+            schedules[doctor_id] = self.get_schedule(db, doctor_id)
+        return schedules
+
+    def find_free_slots(
+        self,
+        db: Session,
+        doctor_ids: Iterable[int],
+        start: datetime,
+        end: datetime,
+        duration_minutes: int,
+        step_minutes: int,
+        limit: int
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """Return up to ``limit`` free slots per doctor inside [start, end)"""
+        schedules = self.get_schedules(db, doctor_ids)
+        windows = slot_windows(start, end, step_minutes)
+        slots = {}
+        for doctor_id, schedule in schedules.items():
+            with self._lock:
+                slots[doctor_id] = schedule.free_slots(start, end, duration_minutes, step_minutes, limit, windows=windows)
+        return slots
+
+    def find_first_free_slot(
+        self,
+        db: Session,
+        doctor_ids: Iterable[int],
+        start: datetime,
+        end: datetime,
+        duration_minutes: int,
+        step_minutes: int
+    ) -> Optional[Tuple[int, datetime, datetime]]:
+        """Return the earliest free slot across the doctors as (doctor_id, start, end), the lowest id on a tie.
+
+        Days are searched one at a time across every doctor, so the search
+        ends with the first day that has a free slot anywhere.
+        """
+        schedules = self.get_schedules(db, doctor_ids)
+        length = -(-duration_minutes // SLOT_MINUTES)
+        for day, window, aligned in slot_windows(start, end, step_minutes):
+            earliest = None
+            with self._lock:
+                for doctor_id, schedule in schedules.items():
+                    candidates = run_starts(window & ~schedule.days.get(day, 0), length) & aligned
+                    if candidates:
+                        found = ((candidates & -candidates).bit_length() - 1, doctor_id)
+                        if earliest is None or found < earliest:
+                            earliest = found
+            if earliest is not None:
+                cell, doctor_id = earliest
+                slot_start = day_start(day) + cell * SLOT
+                return doctor_id, slot_start, slot_start + timedelta(minutes=duration_minutes)
+        return None
+
+    def find_conflict(
+        self,
+        db: Session,
+        doctor_id: int,
+        start: datetime,
+        duration_minutes: Optional[int],
+        exclude_id: Optional[int] = None
+    ) -> Optional[int]:
+        """Return the id of an active appointment overlapping the requested slot.
+
+        Takes a sync Session; async callers go through ``AsyncSession.run_sync``.
+        """
+        schedule = self.get_schedule(db, doctor_id)
+        with self._lock:
+            return schedule.find_overlap(*appointment_interval(start, duration_minutes), exclude_id=exclude_id)
+
+    def sync(self, appointment: Appointment):
+        """Reflect a committed appointment row in the index"""
+        self.sync_row(appointment.doctor_id, appointment.id, appointment.appointment_date, appointment.duration_minutes, appointment.status)
+
+    def sync_row(
+        self,
+        doctor_id: int,
+        appointment_id: int,
+        appointment_date: datetime,
+        duration_minutes: Optional[int],
+        status: AppointmentStatus
+    ):
+        """Like ``sync`` for callers holding column values instead of an ORM object"""
+        with self._lock:
+            schedule = self._schedules.get(doctor_id)
+            if schedule is None:
+                # Not loaded yet - the next lookup will read the committed row
+                self._bump(doctor_id)
+                return
+            if status in ACTIVE_STATUSES:
+                schedule.add(appointment_id, *appointment_interval(appointment_date, duration_minutes))
+            else:
+                schedule.remove(appointment_id)
+
+    def _bump(self, doctor_id: int):
+        self._versions[doctor_id] = self._versions.get(doctor_id, 0) + 1
+
+    def invalidate(self, doctor_id: Optional[int] = None):
+        """Drop cached indexes so they are reloaded from the database"""
+        with self._lock:
+            if doctor_id is None:
+                self._schedules.clear()
+                self._versions.clear()
+                self._generation += 1
+            else:
+                self._schedules.pop(doctor_id, None)
+                self._bump(doctor_id)
+
+# Global scheduler instance
+scheduler = AppointmentScheduler()
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import random
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, TypeVar
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.scheduling.conflict_index import scheduler, DoctorSchedule, ACTIVE_STATUSES, appointment_interval
+
+# Retries after a lock timeout, deadlock or serialization failure
+BOOKING_MAX_RETRIES = int(os.getenv("BOOKING_MAX_RETRIES", "3"))
+
+# Longest appointment the schemas accept; bounds how far back an overlap can start
+MAX_DURATION_MINUTES = 180
+
+T = TypeVar("T")
+
+# Namespace of the per-doctor pg_advisory_xact_lock(namespace, doctor_id) keys
+POSTGRES_BOOKING_LOCK_NAMESPACE = 7_419_002
+
+class BookingLocks:
+    """Per-key asyncio locks so bookings on one worker queue up in memory.
+
+    Waiting here is cheaper than waiting on the database lock, and it keeps
+    a worker from opening a transaction per waiting request.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._users: Dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    @asynccontextmanager
+    async def hold_many(self, keys: Iterable[Hashable]):
+        """Hold several keys at once, taken in sorted order so two holders cannot deadlock"""
+        async with AsyncExitStack() as stack:
+            for key in sorted(set(keys)):
+                await stack.enter_async_context(self.hold(key))
+            yield
+
+def booking_lock_key(dialect: str, doctor_id: int) -> Hashable:
+    # SQLite has a single writer, so bookings for different doctors would
+    # only take turns on the database lock; queue them here instead
+    return "sqlite" if dialect == "sqlite" else doctor_id
+
+def lock_doctor_schedule(db: Session, doctor_id: int):
+    """Block other workers from booking this doctor until the transaction ends"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :doctor_id)"),
+            {"namespace": POSTGRES_BOOKING_LOCK_NAMESPACE, "doctor_id": doctor_id}
+        )
+    elif dialect == "sqlite":
+        # pysqlite only opens a transaction at the first write, so the conflict
+        # check below would otherwise read outside it. The booking routes have
+        # only read so far, so no transaction is open yet.
+        db.execute(text("BEGIN IMMEDIATE"))
+    else:
+        db.execute(select(Doctor.id).where(Doctor.id == doctor_id).with_for_update())
+
+def lock_doctor_schedules(db: Session, doctor_ids: Iterable[int]):
+    """``lock_doctor_schedule`` for several doctors, taken in id order so two batches cannot deadlock"""
+    doctor_ids = sorted(set(doctor_ids))
+    if not doctor_ids:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        for doctor_id in doctor_ids:
+            lock_doctor_schedule(db, doctor_id)
+    elif dialect == "sqlite":
+        # One write lock covers every doctor
+        lock_doctor_schedule(db, doctor_ids[0])
+    else:
+        db.execute(select(Doctor.id).where(Doctor.id.in_(doctor_ids)).order_by(Doctor.id).with_for_update())
+
+def load_stored_schedules(db: Session, doctor_ids: Iterable[int], start: datetime, end: datetime) -> Dict[int, DoctorSchedule]:
+    """Committed active appointments of these doctors that may overlap [start, end), in one query"""
+    schedules = {doctor_id: DoctorSchedule() for doctor_id in doctor_ids}
+    rows = db.execute(
+        select(Appointment.doctor_id, Appointment.id, Appointment.appointment_date, Appointment.duration_minutes).where(
+            Appointment.doctor_id.in_(list(schedules)),
+            Appointment.appointment_date < end,
+            Appointment.appointment_date > start - timedelta(minutes=MAX_DURATION_MINUTES),
+            Appointment.status.in_(ACTIVE_STATUSES)
+        )
+    )
+    for doctor_id, appointment_id, appointment_date, duration_minutes in rows:
+        schedules[doctor_id].add(appointment_id, *appointment_interval(appointment_date, duration_minutes), refresh=False)
+    return schedules
+
+def find_stored_conflict(
+    db: Session,
+    doctor_id: int,
+    start: datetime,
+    end: datetime,
+    exclude_id: Optional[int] = None
+) -> Optional[int]:
+    """Return the id of an active appointment overlapping [start, end), read from the database"""
+    rows = db.execute(
+        select(Appointment.id, Appointment.appointment_date, Appointment.duration_minutes).where(
+            Appointment.doctor_id == doctor_id,
+            Appointment.appointment_date < end,
+            Appointment.appointment_date > start - timedelta(minutes=MAX_DURATION_MINUTES),
+            Appointment.status.in_(ACTIVE_STATUSES)
+        )
+    )
+    for appointment_id, appointment_date, duration_minutes in rows:
+        if appointment_id != exclude_id and appointment_interval(appointment_date, duration_minutes)[1] > start:
+            return appointment_id
+    return None
+
+def check_conflict(
+    db: Session,
+    doctor_id: int,
+    start: datetime,
+    duration_minutes: Optional[int],
+    exclude_id: Optional[int] = None
+) -> Optional[int]:
+    """Early conflict check for the booking routes, without taking the doctor's lock.
+
+    The in-memory index is only a hint: it can lag writes made on other
+    workers, so a hit is confirmed against the database before the slot is
+    refused. A miss is left to ``claim_slot``, which reads the database
+    under the lock anyway.
+    """
+    if scheduler.find_conflict(db, doctor_id, start, duration_minutes, exclude_id) is None:
+        return None
+    conflicting_id = find_stored_conflict(db, doctor_id, *appointment_interval(start, duration_minutes), exclude_id=exclude_id)
+    if conflicting_id is None:
+        # The index still holds a booking that was moved or cancelled elsewhere
+        scheduler.invalidate(doctor_id)
+    return conflicting_id
+
+def claim_slot(
+    db: Session,
+    doctor_id: int,
+    start: datetime,
+    duration_minutes: Optional[int],
+    exclude_id: Optional[int] = None
+) -> Optional[int]:
+    """Lock the doctor's schedule and check the slot against committed rows.
+
+    The database decides; the in-memory index is only consulted to notice
+    that it has fallen behind. The lock is held until the caller commits or
+    rolls back, so nothing can be booked into the slot in between.
+    """
+    lock_doctor_schedule(db, doctor_id)
+    conflicting_id = find_stored_conflict(db, doctor_id, *appointment_interval(start, duration_minutes), exclude_id=exclude_id)
+    if conflicting_id is not None and scheduler.find_conflict(db, doctor_id, start, duration_minutes, exclude_id) is None:
+        # Another worker booked it; reload the index that missed the write
+        scheduler.invalidate(doctor_id)
+    return conflicting_id
+
+def retry_delay(attempt: int) -> float:
+    """Jittered backoff before retry number ``attempt`` (from 0)"""
+    return random.uniform(0, 0.01 * 2 ** attempt)
+
+async def retry_on_lock_errors(db: AsyncSession, work: Callable[[], Awaitable[T]]) -> T:
+    """Run ``work``, rolling back and running it again after a lock timeout, deadlock or serialization failure.
+
+    Gives up with the last OperationalError after BOOKING_MAX_RETRIES retries.
+    """
+    for attempt in range(BOOKING_MAX_RETRIES + 1):
+        try:
+            return await work()
+        except OperationalError:
+            await db.rollback()
+            if attempt == BOOKING_MAX_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+
+async def book_slot(
+    db: AsyncSession,
+    doctor_id: int,
+    start: datetime,
+    duration_minutes: Optional[int],
+    apply: Callable[[], Appointment],
+    exclude_id: Optional[int] = None
+) -> Optional[int]:
+    """Claim the slot, run ``apply`` to add or change the appointment and commit.
+
+    Returns the id of the conflicting appointment instead, with nothing
+    written, when the slot is taken. The committed appointment is synced
+    into the index before the next booking for the doctor goes ahead. Lock
+    timeouts, deadlocks and serialization failures roll back and retry with
+    jittered backoff.
+    """
+    async def attempt() -> Optional[int]:
+        conflicting_id = await db.run_sync(claim_slot, doctor_id, start, duration_minutes, exclude_id)
+        if conflicting_id is not None:
+            await db.rollback()
+            return conflicting_id
+        appointment = apply()
+        await db.commit()
+        scheduler.sync(appointment)
+        return None
+
+    async with booking_locks.hold(booking_lock_key(db.bind.dialect.name, doctor_id)):
+        return await retry_on_lock_errors(db, attempt)
+
+# Global booking lock instance
+booking_locks = BookingLocks()
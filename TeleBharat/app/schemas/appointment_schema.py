@@ -1,6 +1,6 @@
-from pydantic import BaseModel, validator
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
+from typing import Dict, List, Optional
+from datetime import date, datetime
 from enum import Enum
 from app.schemas.patient_schema import PatientBasicOut
 from app.schemas.doctor_schema import DoctorBasicOut
@@ -20,18 +20,49 @@ class AppointmentBase(BaseModel):
     reason: Optional[str] = None
 
 class AppointmentCreate(AppointmentBase):
-    @validator('appointment_date')
+    @field_validator('appointment_date')
+    @classmethod
     def validate_future_date(cls, v):
         if v <= datetime.utcnow():
             raise ValueError('Appointment date must be in the future')
         return v
     
-    @validator('duration_minutes')
+    @field_validator('duration_minutes')
+    @classmethod
     def validate_duration(cls, v):
         if v and (v < 15 or v > 180):
             raise ValueError('Duration must be between 15 and 180 minutes')
         return v
 
+class AppointmentImport(AppointmentBase):
+    """A row loaded through the bulk importer.
+
+    Unlike AppointmentCreate it accepts historical rows, as long as they are
+    no longer active.
+    """
+    # Validated even when defaulted, so a pending row is checked too
+    status: AppointmentStatus = Field(AppointmentStatus.PENDING, validate_default=True)
+    notes: Optional[str] = None
+    
+    @field_validator('duration_minutes')
+    @classmethod
+    def validate_duration(cls, v):
+        return AppointmentCreate.validate_duration(v)
+    
+    @field_validator('status')
+    @classmethod
+    def validate_active_in_future(cls, v, info: ValidationInfo):
+        appointment_date = info.data.get('appointment_date')
+        if v in (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED) and appointment_date and appointment_date <= datetime.utcnow():
+            raise ValueError('Pending or confirmed appointments must be in the future')
+        return v
+
+class AppointmentImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[dict]
+    errors_truncated: bool = False
+
 class AppointmentUpdate(BaseModel):
     appointment_date: Optional[datetime] = None
     duration_minutes: Optional[int] = None
@@ -39,11 +70,17 @@ class AppointmentUpdate(BaseModel):
     reason: Optional[str] = None
     notes: Optional[str] = None
     
-    @validator('appointment_date')
+    @field_validator('appointment_date')
+    @classmethod
     def validate_future_date(cls, v):
         if v and v <= datetime.utcnow():
             raise ValueError('Appointment date must be in the future')
         return v
+    
+    @field_validator('duration_minutes')
+    @classmethod
+    def validate_duration(cls, v):
+        return AppointmentCreate.validate_duration(v)
 
 class AppointmentOut(AppointmentBase):
     id: int
@@ -54,8 +91,7 @@ class AppointmentOut(AppointmentBase):
     patient: PatientBasicOut
     doctor: DoctorBasicOut
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AppointmentBasicOut(BaseModel):
     id: int
@@ -66,8 +102,41 @@ class AppointmentBasicOut(BaseModel):
     status: AppointmentStatus
     reason: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class StatusCounts(BaseModel):
+    total: int
+    by_status: Dict[AppointmentStatus, int]
+
+class DoctorStats(StatusCounts):
+    doctor_id: int
+
+class DayStats(StatusCounts):
+    day: date
+
+class StatsCell(BaseModel):
+    doctor_id: int
+    day: date
+    status: AppointmentStatus
+    count: int
+
+class AppointmentStats(StatusCounts):
+    date_from: date
+    date_to: date
+    by_doctor: List[DoctorStats]
+    by_day: List[DayStats]
+    cells: List[StatsCell]
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class DoctorAvailability(BaseModel):
+    doctor_id: int
+    slots: List[FreeSlot]
+
+class DoctorFreeSlot(FreeSlot):
+    doctor_id: int
 
 # WebSocket message schemas
 class NotificationMessage(BaseModel):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from app.schemas.user_schema import UserOut
 
@@ -17,11 +17,9 @@ class DoctorOut(DoctorBase):
     id: int
     user: UserOut  # Include full user details
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DoctorBasicOut(DoctorBase):
     id: int
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 class UserBase(BaseModel):
     name: str
@@ -20,5 +20,4 @@ class UserUpdate(BaseModel):
 class UserOut(UserBase):
     id: int
     
-    class Config:
-        from_attributes = True  # Updated for Pydantic v2
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -0,0 +1,101 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# Seeds a throwaway SQLite database; the search index is the FTS5 one
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="search-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'search_benchmark.db')}"
+
+from app.database import SessionLocal, engine
+from app.migrations.migrator import upgrade
+from app.models.doctor import Doctor
+from app.models.user import User
+from app.search.search_index import SearchBackend, search_backend
+
+SEED_BATCH_SIZE = 50000
+FIRST_NAMES = ("Asha", "Ravi", "Meera", "Arjun", "Priya", "Vikram", "Sunita", "Karan", "Neha", "Rahul")
+LAST_NAMES = ("Rao", "Sharma", "Iyer", "Gupta", "Nair", "Patel", "Reddy", "Khan", "Das", "Menon")
+SPECIALIZATIONS = ("Cardiology", "Dermatology", "Neurology", "Pediatrics", "Orthopedics", "Psychiatry", "Oncology", "Radiology")
+
+def seed(users: int):
+    """``users`` doctors with their users, inserted with Core before the index exists"""
+    with engine.begin() as conn:
+        for offset in range(0, users, SEED_BATCH_SIZE):
+            ids = range(offset + 1, min(offset + SEED_BATCH_SIZE, users) + 1)
+            conn.execute(User.__table__.insert(), [
+                {
+                    "id": index, "name": f"{FIRST_NAMES[index % 10]} {LAST_NAMES[index // 10 % 10]} {index}",
+                    "email": f"doctor{index}@example.com", "password_hash": "x", "role": "doctor",
+                }
+                for index in ids
+            ])
+            conn.execute(Doctor.__table__.insert(), [
+                {"id": index, "specialization": SPECIALIZATIONS[index % len(SPECIALIZATIONS)], "license_number": f"KA-{index:07d}"}
+                for index in ids
+            ])
+
+def time_it(function: Callable[[], list], repeat: int) -> float:
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time doctor search with ILIKE scans and with the search index")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    rare = args.users * 2 // 3 + 7
+    cases: Dict[str, Dict] = {
+        "name, one match": {"filters": {"name": f"{FIRST_NAMES[rare % 10]} {LAST_NAMES[rare // 10 % 10]} {rare}"}},
+        "license, one match": {"filters": {"license_number": f"{rare:07d}"}},
+        "specialization, many": {"filters": {"specialization": "cardio"}},
+        "name + specialization": {"filters": {"name": "Meera", "specialization": "neuro"}},
+        "q, one match": {"q": f"doctor{rare}@"},
+        "q, no match": {"q": "zzqx"},
+    }
+
+    try:
+        upgrade(engine)
+        started = time.perf_counter()
+        seed(args.users)
+        print(f"Seeded {args.users} doctors in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        # Backfills the index from the seeded rows, then installs its triggers
+        search_backend.setup(engine)
+        print(f"Built the {type(search_backend).__name__} index in {time.perf_counter() - started:.1f}s")
+
+        scan = SearchBackend()
+        db = SessionLocal()
+        try:
+            print(f"Median of {args.repeat} searches, limit {args.limit}")
+            print(f"{'search':24} {'hits':>5} {'ILIKE scan':>11} {'index':>10} {'speedup':>8}")
+            for name, case in cases.items():
+                def run_with(backend: SearchBackend) -> Callable[[], list]:
+                    return lambda: backend.search_doctors(db, case.get("filters", {}), case.get("q"), args.limit, None)
+                scan_hits, index_hits = run_with(scan)(), run_with(search_backend)()
+                # Rankings differ, so only complete result sets are compared
+                if len(scan_hits) < args.limit and sorted(id for _, id in scan_hits) != sorted(id for _, id in index_hits):
+                    print(f"❌ {name}: the scan and the index found different doctors")
+                    return 1
+                scan_time = time_it(run_with(scan), args.repeat)
+                index_time = time_it(run_with(search_backend), args.repeat)
+                print(f"{name:24} {len(index_hits):>5} {scan_time * 1000:9.2f}ms {index_time * 1000:8.2f}ms {scan_time / index_time:7.1f}x")
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text, func, literal, tuple_, or_, and_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.database import engine
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+
+# Searchable fields per entity, in index column order
+DOCTOR_FIELDS = ("name", "email", "specialization", "license_number")
+PATIENT_FIELDS = ("name", "email", "diagnosis")
+
+# The trigram tokenizer only indexes terms of at least this many characters
+MIN_TRIGRAM_LENGTH = 3
+
+# SQLite: FTS5 trigram tables mirroring doctors/patients joined to users, kept
+# in sync by triggers so every worker sees every write
+SQLITE_SETUP = {
+    "doctor_search": [
+        "CREATE VIRTUAL TABLE doctor_search USING fts5(name, email, specialization, license_number, tokenize='trigram')",
+        """INSERT INTO doctor_search(rowid, name, email, specialization, license_number)
+           SELECT d.id, u.name, u.email, d.specialization, d.license_number FROM doctors d JOIN users u ON u.id = d.id""",
+        """CREATE TRIGGER doctor_search_ai AFTER INSERT ON doctors BEGIN
+             INSERT INTO doctor_search(rowid, name, email, specialization, license_number)
+             SELECT NEW.id, u.name, u.email, NEW.specialization, NEW.license_number FROM users u WHERE u.id = NEW.id;
+           END""",
+        """CREATE TRIGGER doctor_search_au AFTER UPDATE ON doctors BEGIN
+             DELETE FROM doctor_search WHERE rowid = OLD.id;
+             INSERT INTO doctor_search(rowid, name, email, specialization, license_number)
+             SELECT NEW.id, u.name, u.email, NEW.specialization, NEW.license_number FROM users u WHERE u.id = NEW.id;
+           END""",
+        """CREATE TRIGGER doctor_search_ad AFTER DELETE ON doctors BEGIN
+             DELETE FROM doctor_search WHERE rowid = OLD.id;
+           END""",
+        """CREATE TRIGGER doctor_search_user_au AFTER UPDATE OF name, email ON users BEGIN
+             UPDATE doctor_search SET name = NEW.name, email = NEW.email WHERE rowid = NEW.id;
+           END""",
+        """CREATE TRIGGER doctor_search_user_ad AFTER DELETE ON users BEGIN
+             DELETE FROM doctor_search WHERE rowid = OLD.id;
+           END""",
+    ],
+    "patient_search": [
+        "CREATE VIRTUAL TABLE patient_search USING fts5(name, email, diagnosis, tokenize='trigram')",
+        """INSERT INTO patient_search(rowid, name, email, diagnosis)
+           SELECT p.id, u.name, u.email, p.diagnosis FROM patients p JOIN users u ON u.id = p.id""",
+        """CREATE TRIGGER patient_search_ai AFTER INSERT ON patients BEGIN
+             INSERT INTO patient_search(rowid, name, email, diagnosis)
+             SELECT NEW.id, u.name, u.email, NEW.diagnosis FROM users u WHERE u.id = NEW.id;
+           END""",
+        """CREATE TRIGGER patient_search_au AFTER UPDATE ON patients BEGIN
+             DELETE FROM patient_search WHERE rowid = OLD.id;
+             INSERT INTO patient_search(rowid, name, email, diagnosis)
+             SELECT NEW.id, u.name, u.email, NEW.diagnosis FROM users u WHERE u.id = NEW.id;
+           END""",
+        """CREATE TRIGGER patient_search_ad AFTER DELETE ON patients BEGIN
+             DELETE FROM patient_search WHERE rowid = OLD.id;
+           END""",
+        """CREATE TRIGGER patient_search_user_au AFTER UPDATE OF name, email ON users BEGIN
+             UPDATE patient_search SET name = NEW.name, email = NEW.email WHERE rowid = NEW.id;
+           END""",
+        """CREATE TRIGGER patient_search_user_ad AFTER DELETE ON users BEGIN
+             DELETE FROM patient_search WHERE rowid = OLD.id;
+           END""",
+    ],
+}
+
+# PostgreSQL: trigram GIN indexes make ILIKE '%term%' index-backed
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_specialization_trgm ON doctors USING gin (specialization gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_license_number_trgm ON doctors USING gin (license_number gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_patients_diagnosis_trgm ON patients USING gin (diagnosis gin_trgm_ops)",
+]
+
+# Hit = (rank, id); lower rank sorts first
+SearchHit = Tuple[float, int]
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def quote_fts(term: str) -> str:
+    """Quote a user term as an FTS5 string so its characters are never syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+class SearchBackend:
+    """Filters by field substrings plus an optional free-text ``q`` across all fields.
+
+    Returns one page of ``(rank, id)`` hits ordered by relevance, then id;
+    ``after`` is the last hit of the previous page.
+    """
+
+    def setup(self, engine: Engine):
+        pass
+
+    def search_doctors(self, db: Session, filters: Dict[str, str], q: Optional[str], limit: int, after: Optional[SearchHit]) -> List[SearchHit]:
+        columns = {"name": User.name, "email": User.email, "specialization": Doctor.specialization, "license_number": Doctor.license_number}
+        return self._search(db, db.query(Doctor.id).join(User), Doctor.id, columns, filters, q, limit, after)
+
+    def search_patients(self, db: Session, filters: Dict[str, str], q: Optional[str], limit: int, after: Optional[SearchHit]) -> List[SearchHit]:
+        columns = {"name": User.name, "email": User.email, "diagnosis": Patient.diagnosis}
+        return self._search(db, db.query(Patient.id).join(User), Patient.id, columns, filters, q, limit, after)
+
+    def _rank(self, columns: Dict, q: str):
+        return literal(0.0)
+
+    def _search(self, db: Session, query, id_column, columns: Dict, filters: Dict[str, str], q: Optional[str], limit: int, after: Optional[SearchHit]) -> List[SearchHit]:
+        for field, term in filters.items():
+            query = query.filter(columns[field].ilike(f"%{escape_like(term)}%", escape="\\"))
+        if q:
+            pattern = f"%{escape_like(q)}%"
+            query = query.filter(or_(*(column.ilike(pattern, escape="\\") for column in columns.values())))
+            rank = self._rank(columns, q)
+        else:
+            rank = literal(0.0)
+        query = query.add_columns(rank.label("rank"))
+        if after is not None:
+            query = query.filter(or_(rank > after[0], and_(rank == after[0], id_column > after[1])))
+        rows = query.order_by(rank, id_column).limit(limit).all()
+        return [(float(row.rank), row[0]) for row in rows]
+
+class PostgresSearchBackend(SearchBackend):
+    """pg_trgm indexes; ``q`` is ranked by best trigram similarity across fields"""
+
+    def setup(self, engine: Engine):
+        with engine.begin() as conn:
+            for statement in POSTGRES_SETUP:
+                conn.execute(text(statement))
+
+    def _rank(self, columns: Dict, q: str):
+        # Negated so that, like everywhere else, lower ranks sort first
+        return -func.greatest(*(func.similarity(func.coalesce(column, ""), q) for column in columns.values()))
+
+class SqliteFtsSearchBackend(SearchBackend):
+    """FTS5 trigram tables; ``q`` is ranked with bm25"""
+
+    def setup(self, engine: Engine):
+        with engine.begin() as conn:
+            existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            for table, statements in SQLITE_SETUP.items():
+                if table not in existing:
+                    # Creates the table, backfills it and installs the triggers
+                    for statement in statements:
+                        conn.execute(text(statement))
+
+    def search_doctors(self, db, filters, q, limit, after):
+        return self._search_fts(db, "doctor_search", DOCTOR_FIELDS, filters, q, limit, after)
+
+    def search_patients(self, db, filters, q, limit, after):
+        return self._search_fts(db, "patient_search", PATIENT_FIELDS, filters, q, limit, after)
+
+    def _search_fts(self, db: Session, table: str, fields: Tuple[str, ...], filters: Dict[str, str], q: Optional[str], limit: int, after: Optional[SearchHit]) -> List[SearchHit]:
+        params = {"limit": limit}
+        match_terms = []
+        like_clauses = []
+        for index, (field, term) in enumerate(filters.items()):
+            if len(term) >= MIN_TRIGRAM_LENGTH:
+                match_terms.append(f"{field} : {quote_fts(term)}")
+            else:
+                # Too short for a trigram lookup; LIKE on the index table is still correct
+                like_clauses.append(f"{field} LIKE :like_{index} ESCAPE '\\'")
+                params[f"like_{index}"] = f"%{escape_like(term)}%"
+        if q:
+            if len(q) >= MIN_TRIGRAM_LENGTH:
+                match_terms.append(quote_fts(q))
+            else:
+                like_clauses.append("(" + " OR ".join(f"{field} LIKE :q ESCAPE '\\'" for field in fields) + ")")
+                params["q"] = f"%{escape_like(q)}%"
+        where = list(like_clauses)
+        if match_terms:
+            where.insert(0, f"{table} MATCH :match")
+            params["match"] = " AND ".join(match_terms)
+            rank = f"bm25({table})"
+        else:
+            rank = "0.0"
+        inner = f"SELECT rowid AS id, {rank} AS rank FROM {table}"
+        if where:
+            inner += " WHERE " + " AND ".join(where)
+        sql = f"SELECT id, rank FROM ({inner})"
+        if after is not None:
+            sql += " WHERE rank > :after_rank OR (rank = :after_rank AND id > :after_id)"
+            params["after_rank"], params["after_id"] = after
+        sql += " ORDER BY rank, id LIMIT :limit"
+        return [(float(rank), id) for id, rank in db.execute(text(sql), params)]
+
+def create_search_backend(engine: Engine) -> SearchBackend:
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        return PostgresSearchBackend()
+    if dialect == "sqlite":
+        return SqliteFtsSearchBackend()
+    return SearchBackend()
+
+# Global search backend, chosen from the configured database
+search_backend = create_search_backend(engine)
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+# The models import the engine module, which needs a URL; nothing connects here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.schemas.appointment_schema import AppointmentOut
+from app.serialization.orm_json import serializer_for
+
+def build_rows(count: int, doctors: int) -> List[Appointment]:
+    """Unsaved appointments with their patient and doctor loaded, as the list routes return them"""
+    patient = Patient(id=1, diagnosis="Hypertension", user=User(id=1, name="Asha Rao", email="asha@example.com", role="patient"))
+    doctor_list = [
+        Doctor(id=index + 2, specialization="Cardiology", license_number=f"KA-{index}",
+               user=User(id=index + 2, name=f"Dr {index}", email=f"dr{index}@example.com", role="doctor"))
+        for index in range(doctors)
+    ]
+    start = datetime(2026, 1, 5, 9, 0)
+    return [
+        Appointment(
+            id=index + 1, patient_id=1, doctor_id=doctor_list[index % doctors].id,
+            appointment_date=start + timedelta(minutes=30 * index), duration_minutes=30,
+            status=AppointmentStatus.CONFIRMED, reason="Follow-up visit", notes=None,
+            created_at=start, updated_at=start, patient=patient, doctor=doctor_list[index % doctors],
+        )
+        for index in range(count)
+    ]
+
+def time_it(function: Callable[[], bytes], repeat: int) -> List[float]:
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time serializing AppointmentOut rows to JSON bytes")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rows = build_rows(args.rows, args.doctors)
+    adapter = TypeAdapter(List[AppointmentOut])
+    serializer = serializer_for(AppointmentOut)
+    candidates = {
+        # A model per row, dumped to a dict and encoded with the standard library
+        "model + json.dumps": lambda: json.dumps(jsonable_encoder(
+            [AppointmentOut.model_validate(row).model_dump() for row in rows]
+        )).encode(),
+        # What a route returning ORM rows with response_model=List[AppointmentOut] does
+        "adapter validate + dump_json": lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True)),
+        "orm_json (no validation)": lambda: serializer.dump_many(rows),
+    }
+
+    expected = json.loads(adapter.dump_json(adapter.validate_python(rows, from_attributes=True)))
+    baseline = None
+    print(f"{args.rows} AppointmentOut rows, median of {args.repeat} runs")
+    for name, function in candidates.items():
+        if json.loads(function()) != expected:
+            print(f"❌ {name} produced different JSON")
+            return 1
+        median = statistics.median(time_it(function, args.repeat))
+        baseline = baseline or median
+        print(f"{name:30} {median * 1000:8.2f} ms  {baseline / median:5.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from typing import Dict, Literal, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy.orm import joinedload
+from app.serialization.orm_json import nested_model
+
+# Listing shapes: the full schema with nested objects, or the flat basic one
+View = Literal["basic", "full"]
+
+def subset_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A schema with only ``fields`` of ``model``, for sparse fieldsets"""
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+class FieldSet:
+    """What a listing SELECTs and the schema that shapes it.
+
+    With ``joins`` the query loads whole entities and joins those
+    relationships into the same SELECT; without, it loads only the schema's
+    columns as plain rows.
+    """
+
+    def __init__(self, entity, model: Type[BaseModel], keys: Sequence[str] = (), joins: Optional[Sequence[str]] = None):
+        self.entity = entity
+        self.model = model
+        self.joins = joins
+        self.columns = None
+        if joins is None:
+            # Sort and cursor keys are loaded even when they are not returned
+            names = list(model.model_fields) + [key for key in keys if key not in model.model_fields]
+            self.columns = [getattr(entity, name) for name in names]
+
+    def query(self, db):
+        if self.joins is not None:
+            # Built per query; relationships cannot be resolved while the models are still importing
+            return db.query(self.entity).options(*(joinedload(getattr(self.entity, name)) for name in self.joins))
+        return db.query(*self.columns)
+
+class FieldSets:
+    """The views and sparse fieldsets a listing offers.
+
+    ``view=full`` (the default) keeps the full schema and its joins.
+    ``view=basic`` selects only the basic schema's columns, and ``fields=``
+    any of the full schema's own columns; neither loads nested objects.
+    """
+
+    def __init__(self, entity, full: Type[BaseModel], basic: Type[BaseModel], joins: Sequence[str] = (), keys: Sequence[str] = ("id",)):
+        self.entity = entity
+        self.keys = tuple(keys)
+        self.full = FieldSet(entity, full, joins=tuple(joins))
+        self.basic = FieldSet(entity, basic, self.keys)
+        # Nested schemas come from joins, so only plain columns can be picked
+        self.selectable = tuple(
+            name for name, field in full.model_fields.items()
+            if nested_model(field.annotation) is None and hasattr(entity, name)
+        )
+        self._sparse: Dict[Tuple[str, ...], FieldSet] = {}
+
+    def resolve(self, view: View = "full", fields: Optional[str] = None) -> FieldSet:
+        """The listing's shape; ``fields`` wins over ``view``"""
+        if fields:
+            return self.sparse(fields)
+        return self.basic if view == "basic" else self.full
+
+    def sparse(self, fields: str) -> FieldSet:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested.difference(self.selectable)
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}. Choose from: {', '.join(self.selectable)}"
+            )
+        # Schema order, so the same set in any order shares one model
+        names = tuple(name for name in self.selectable if name in requested)
+        fieldset = self._sparse.get(names)
+        if fieldset is None:
+            fieldset = self._sparse[names] = FieldSet(self.entity, subset_model(self.full.model, names), self.keys)
+        return fieldset
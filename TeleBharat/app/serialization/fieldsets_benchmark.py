@@ -0,0 +1,121 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+# Seeds a throwaway SQLite database and requests each listing in every shape
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="fieldsets-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'fieldsets_benchmark.db')}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+# Every request has to reach the route, not the response cache
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient
+from app.database import engine
+from app.main import create_app
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+
+SEED_BATCH_SIZE = 50000
+START = datetime(2026, 1, 5, 9, 0)
+
+# (listing, fields= a calendar or picker would ask for)
+LISTINGS = (
+    ("/appointments/", "appointment_date,duration_minutes,doctor_id,status"),
+    ("/doctors/", "specialization"),
+    ("/patients/", "diagnosis"),
+)
+
+def seed(rows: int):
+    """``rows`` users, each a doctor and a patient, and ``rows`` appointments with a reason and notes"""
+    with engine.begin() as conn:
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            ids = range(offset + 1, min(offset + SEED_BATCH_SIZE, rows) + 1)
+            conn.execute(User.__table__.insert(), [
+                {"id": index, "name": f"Person {index}", "email": f"person{index}@example.com", "password_hash": "x", "role": "doctor"}
+                for index in ids
+            ])
+            conn.execute(Doctor.__table__.insert(), [{"id": index, "specialization": "Cardiology", "license_number": f"KA-{index}"} for index in ids])
+            conn.execute(Patient.__table__.insert(), [
+                {"id": index, "medical_record": f"MR-{index:08d}", "diagnosis": "Hypertension"} for index in ids
+            ])
+            conn.execute(Appointment.__table__.insert(), [
+                {
+                    "patient_id": index, "doctor_id": (index * 7) % rows + 1,
+                    "appointment_date": START + timedelta(minutes=30 * index), "duration_minutes": 30,
+                    "status": AppointmentStatus.CONFIRMED, "reason": "Follow-up visit for blood pressure",
+                    "notes": "Continue current medication, review in four weeks", "created_at": START, "updated_at": START,
+                }
+                for index in ids
+            ])
+
+def time_it(function: Callable[[], object], repeat: int) -> float:
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bytes and time per page of each listing as view=full, view=basic and fields=")
+    parser.add_argument("--rows", type=int, default=10000, help="users, doctors, patients and appointments to seed")
+    parser.add_argument("--limit", type=int, default=100, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results, failures = [], []
+    try:
+        with TestClient(create_app()) as client:
+            started = time.perf_counter()
+            seed(args.rows)
+            print(f"Seeded {args.rows} users, doctors, patients and appointments in {time.perf_counter() - started:.1f}s")
+
+            for listing, fields in LISTINGS:
+                shapes = (("view=full", "view=full"), ("view=basic", "view=basic"), ("fields=", f"fields={fields}"))
+                full = None
+                for name, query in shapes:
+                    url = f"{listing}?limit={args.limit}&{query}"
+
+                    def page(url=url):
+                        response = client.get(url)
+                        response.raise_for_status()
+                        return response
+
+                    response = page()
+                    body = response.json()
+                    full = full or body
+                    # A narrower shape must be the same rows, each a subset of the full one
+                    if len(body) != len(full) or any(
+                        row.keys() - full_row.keys() or any(full_row[key] != value for key, value in row.items())
+                        for row, full_row in zip(body, full)
+                    ):
+                        failures.append(f"{url} does not match the view=full rows")
+                    results.append((listing, name, len(response.content), time_it(page, args.repeat)))
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+    print(f"{args.limit} rows per page, median of {args.repeat} requests")
+    print(f"{'listing':16} {'shape':11} {'bytes':>9} {'ms':>8} {'vs full':>16}")
+    for listing, name, size, median in results:
+        full_size, full_median = next((size, median) for other, shape, size, median in results if other == listing and shape == "view=full")
+        print(f"{listing:16} {name:11} {size:9d} {median * 1000:8.2f} "
+              f"{size / full_size:6.0%} bytes {full_median / median:4.1f}x")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ view=basic and fields= return the view=full rows, narrowed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import json
+import os
+from datetime import date, datetime
+from enum import Enum
+from operator import attrgetter
+from types import UnionType
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialization configuration - override through environment variables.
+# SERIALIZATION_VALIDATE_ORM=true sends ORM rows through the schema's
+# TypeAdapter again, to catch a schema and model drifting apart in development.
+SERIALIZATION_VALIDATE_ORM = os.getenv("SERIALIZATION_VALIDATE_ORM", "false").lower() in ("1", "true", "yes")
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes; orjson when installed, the standard library otherwise"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def nested_model(annotation: Any):
+    """(model, many) when a field holds a schema, Optional schema or list of schemas"""
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType):
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                return nested_model(arg)
+        return None
+    if origin in (list, List):
+        found = nested_model(get_args(annotation)[0])
+        return (found[0], True) if found else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None
+
+class OrmSerializer:
+    """Turns ORM objects into the JSON a response schema would produce, without validating them.
+
+    The schema's fields are read once up front; each row then costs one
+    attribute read per field. Nested schemas (a doctor's user, an
+    appointment's patient) get their own serializer, and an object shared
+    by many rows is converted once per call and schema. Datetimes and enums are left
+    to the JSON encoder, which writes them the way Pydantic does.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.names = tuple(model.model_fields)
+        # A single-name attrgetter returns the value rather than a tuple
+        self._read = attrgetter(*self.names) if len(self.names) > 1 else (lambda obj: (getattr(obj, self.names[0]),))
+        self.nested = []
+        for name, field in model.model_fields.items():
+            found = nested_model(field.annotation)
+            if found:
+                self.nested.append((name, serializer_for(found[0]), found[1]))
+        self._adapter: Optional[TypeAdapter] = None
+
+    @property
+    def adapter(self) -> TypeAdapter:
+        """TypeAdapter for a list of the schema, built on first use"""
+        if self._adapter is None:
+            self._adapter = TypeAdapter(List[self.model])
+        return self._adapter
+
+    def to_builtins(self, obj: Any, seen: Optional[Dict[Tuple["OrmSerializer", int], dict]] = None) -> Dict[str, Any]:
+        values = dict(zip(self.names, self._read(obj)))
+        for name, serializer, many in self.nested:
+            value = values[name]
+            if value is None:
+                continue
+            if many:
+                values[name] = [serializer.shared(item, seen) for item in value]
+            else:
+                values[name] = serializer.shared(value, seen)
+        return values
+
+    def shared(self, obj: Any, seen: Optional[Dict[Tuple["OrmSerializer", int], dict]]) -> Dict[str, Any]:
+        if seen is None:
+            return self.to_builtins(obj)
+        # One object can be reached through two different schemas in the same response
+        key = (self, id(obj))
+        values = seen.get(key)
+        if values is None:
+            values = seen[key] = self.to_builtins(obj, seen)
+        return values
+
+    def dump_many(self, rows: Iterable[Any]) -> bytes:
+        if SERIALIZATION_VALIDATE_ORM:
+            adapter = self.adapter
+            return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+        # The objects stay alive until the call returns, so id() cannot be reused
+        seen: Dict[Tuple[OrmSerializer, int], dict] = {}
+        return dumps([self.to_builtins(row, seen) for row in rows])
+
+    def dump_one(self, obj: Any) -> bytes:
+        if SERIALIZATION_VALIDATE_ORM:
+            return self.model.model_validate(obj, from_attributes=True).model_dump_json().encode()
+        return dumps(self.to_builtins(obj))
+
+_serializers: Dict[Type[BaseModel], OrmSerializer] = {}
+
+def serializer_for(model: Type[BaseModel]) -> OrmSerializer:
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = OrmSerializer(model)
+    return serializer
+
+def orm_json_response(rows: Union[Any, List[Any]], model: Type[BaseModel], response: Optional[Response] = None) -> Response:
+    """A JSON response of ORM rows (or one row) shaped by ``model``.
+
+    Meant for routes whose rows come straight from the database, so the
+    schema has nothing to check. Keep the schema as the route's
+    response_model for the OpenAPI docs. Headers set on the route's
+    ``response`` parameter (like X-Next-Cursor) are copied over, since
+    FastAPI only merges them into responses it builds itself.
+    """
+    serializer = serializer_for(model)
+    body = serializer.dump_many(rows) if isinstance(rows, list) else serializer.dump_one(rows)
+    result = Response(content=body, media_type="application/json")
+    if response is not None:
+        result.headers.update(response.headers)
+        if response.status_code:
+            result.status_code = response.status_code
+    return result
@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, uvicorn arguments, extra environment)
+MODES = (
+    ("app.main:app", ["app.main:app"], {}),
+    ("create_app --factory", ["app.main:create_app", "--factory"], {}),
+    ("factory + DB_AUTO_MIGRATE", ["app.main:create_app", "--factory"], {"DB_AUTO_MIGRATE": "true"}),
+)
+
+# Run in a fresh interpreter to split a cold start into import and build time
+PHASES_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.create_app()
+built = time.perf_counter()
+print(json.dumps({"import app.main": imported - started, "create_app()": built - imported}))
+"""
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def cold_start(arguments: List[str], env: Dict[str, str], timeout: float) -> float:
+    """Seconds from spawning uvicorn to its first 200 from /health"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *arguments, "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIRECTORY, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn {' '.join(arguments)} exited with {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"uvicorn {' '.join(arguments)} did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time worker cold start to the first /health response, per way of loading the app")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for one worker")
+    args = parser.parse_args(argv)
+
+    # A migrated throwaway SQLite database, as after `migrator upgrade` in a deploy
+    directory = tempfile.mkdtemp(prefix="startup-benchmark-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'startup_benchmark.db')}", DB_AUTO_MIGRATE="false")
+    try:
+        subprocess.run([sys.executable, "-m", "app.migrations.migrator", "upgrade"], cwd=APP_DIRECTORY, env=env, check=True, stdout=subprocess.DEVNULL)
+        timings: Dict[str, List[float]] = {name: [] for name, _, _ in MODES}
+        # Modes take turns so drift in machine load hits them alike
+        for _ in range(args.runs):
+            for name, arguments, extra in MODES:
+                timings[name].append(cold_start(arguments, {**env, **extra}, args.timeout))
+        phases = [
+            json.loads(subprocess.run([sys.executable, "-c", PHASES_SCRIPT], cwd=APP_DIRECTORY, env=env, check=True, capture_output=True, text=True).stdout)
+            for _ in range(args.runs)
+        ]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"Cold start to the first /health response, {args.runs} runs each")
+    print(f"{'mode':28} {'median':>9} {'min':>9} {'max':>9}")
+    for name, values in timings.items():
+        print(f"{name:28} {statistics.median(values) * 1000:7.0f}ms {min(values) * 1000:7.0f}ms {max(values) * 1000:7.0f}ms")
+    print("In a fresh interpreter: " + ", ".join(
+        f"{phase} {statistics.median(run[phase] for run in phases) * 1000:.0f}ms" for phase in phases[0]
+    ))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
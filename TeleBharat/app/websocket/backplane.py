@@ -0,0 +1,319 @@
+import asyncio
+import fcntl
+import json
+import os
+import sys
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+MessageHandler = Callable[[Dict], Awaitable[None]]
+
+# Largest frame the Unix-socket backplane carries; bigger events are not published
+WS_BACKPLANE_MAX_FRAME_BYTES = int(os.getenv("WS_BACKPLANE_MAX_FRAME_BYTES", str(8 * 1024 * 1024)))
+# Unsent bytes the broker lets pile up for one worker before disconnecting it
+WS_BACKPLANE_MAX_BUFFER_BYTES = int(os.getenv("WS_BACKPLANE_MAX_BUFFER_BYTES", str(32 * 1024 * 1024)))
+# Events a worker holds for the broker before it starts dropping new ones
+WS_BACKPLANE_MAX_PENDING_EVENTS = int(os.getenv("WS_BACKPLANE_MAX_PENDING_EVENTS", "1000"))
+# How often a worker retries the broker election lock while another worker holds it
+BROKER_LOCK_POLL_SECONDS = 0.05
+
+class Backplane:
+    """Carries WebSocket events between worker processes.
+
+    Each worker publishes events it originates and receives every event
+    published by the other workers; a publisher never gets its own events back.
+    """
+
+    async def start(self, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def publish(self, message: Dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+class InMemoryBackplane(Backplane):
+    """Fan-out between managers living in the same process.
+
+    The default for a single worker, where it is effectively a no-op, and
+    handy for wiring several managers together without any IPC.
+    """
+
+    _channels: Dict[str, List["InMemoryBackplane"]] = {}
+
+    def __init__(self, channel: str = "default"):
+        self.channel = channel
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._channels.setdefault(self.channel, []).append(self)
+
+    async def publish(self, message: Dict):
+        for peer in list(self._channels.get(self.channel, [])):
+            if peer is not self and peer._handler is not None:
+                await peer._handler(message)
+
+    async def stop(self):
+        peers = self._channels.get(self.channel, [])
+        if self in peers:
+            peers.remove(self)
+        self._handler = None
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """The next newline-terminated frame, b"" at end of stream, or None for a frame over the reader's limit.
+
+    An oversized frame is read past and thrown away piece by piece, so the
+    stream stays in step and never buffers more than the limit.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError:
+        return b""
+    except asyncio.LimitOverrunError as e:
+        overrun = e
+    while True:
+        await reader.readexactly(overrun.consumed)
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return b""
+        except asyncio.LimitOverrunError as e:
+            overrun = e
+
+class UnixSocketBroker:
+    """Relays newline-delimited JSON frames between clients of a Unix socket.
+
+    Frames are written without waiting for each client to read them, so
+    one slow worker cannot hold up the rest. A client whose unsent frames
+    pass ``max_buffer`` bytes is disconnected instead; it reconnects and
+    misses the events in between.
+    """
+
+    def __init__(self, path: str, max_frame: int = WS_BACKPLANE_MAX_FRAME_BYTES, max_buffer: int = WS_BACKPLANE_MAX_BUFFER_BYTES):
+        self.path = path
+        self.max_frame = max_frame
+        self.max_buffer = max_buffer
+        self.disconnected_slow = 0
+        self.dropped_frames = 0
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "UnixSocketBroker":
+        # The limit leaves room for the newline after the largest frame
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.path, limit=self.max_frame + 1)
+        return self
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await read_frame(reader)
+                if line is None:
+                    self.dropped_frames += 1
+                    continue
+                if not line:
+                    break
+                for client in list(self._clients):
+                    if client is not writer:
+                        self._relay(client, line)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancellation means the broker is stopping; end the handler quietly
+            pass
+        finally:
+            self._tasks.discard(task)
+            self._clients.discard(writer)
+            writer.close()
+
+    def _relay(self, client: asyncio.StreamWriter, line: bytes):
+        try:
+            if client.transport.get_write_buffer_size() > self.max_buffer:
+                print("❌ Backplane client is not keeping up; disconnecting it")
+                self.disconnected_slow += 1
+                self._clients.discard(client)
+                client.close()
+                return
+            client.write(line)
+        except (ConnectionError, RuntimeError):
+            self._clients.discard(client)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+class UnixSocketBackplane(Backplane):
+    """Connects workers on one host through a Unix-socket broker.
+
+    The broker can run on its own (``python -m app.websocket.backplane PATH``);
+    otherwise the first worker that finds no live broker embeds one, and a
+    surviving worker takes over if that worker exits. Events published while
+    the connection is down are dropped - local delivery still happens - and
+    so are events bigger than ``max_frame``.
+
+    Publishing only queues the frame; a sender task writes it to the broker,
+    so a request never waits on a busy broker. When ``max_pending`` frames
+    are already waiting, new ones are dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embed_broker: bool = True,
+        max_frame: int = WS_BACKPLANE_MAX_FRAME_BYTES,
+        max_pending: int = WS_BACKPLANE_MAX_PENDING_EVENTS,
+    ):
+        self.path = path
+        self.embed_broker = embed_broker
+        self.max_frame = max_frame
+        self.dropped_events = 0
+        self.connected = asyncio.Event()
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._handler: Optional[MessageHandler] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._broker: Optional[UnixSocketBroker] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        delay = 0.05
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=self.max_frame + 1)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if self.embed_broker and await self._start_embedded_broker():
+                    continue
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 2.0)
+                continue
+            delay = 0.05
+            self._writer = writer
+            self.connected.set()
+            sender = asyncio.create_task(self._send(writer))
+            try:
+                while True:
+                    line = await read_frame(reader)
+                    if line is None:
+                        print("❌ Dropped a backplane frame over the size limit")
+                        continue
+                    if not line:
+                        break
+                    await self._dispatch(line)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                # Never let the subscriber die; reconnect instead
+                print("❌ Backplane connection failed:", e)
+                await asyncio.sleep(delay)
+            finally:
+                self.connected.clear()
+                self._writer = None
+                sender.cancel()
+                writer.close()
+                # Frames queued for the lost connection are dropped with it
+                while not self._outbox.empty():
+                    self._outbox.get_nowait()
+                    self.dropped_events += 1
+
+    async def _send(self, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                writer.write(await self._outbox.get())
+                await writer.drain()
+        except (ConnectionError, RuntimeError):
+            # The reading side notices the broken connection and reconnects
+            pass
+
+    async def _dispatch(self, line: bytes):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        try:
+            await self._handler(message)
+        except Exception as e:
+            print("❌ Backplane handler failed:", e)
+
+    async def _start_embedded_broker(self) -> bool:
+        # The lock stops two workers from both clearing a stale socket and
+        # binding, which would split them across two brokers
+        with open(self.path + ".lock", "w") as lock_file:
+            # Polled without blocking, so the event loop keeps running while another worker holds it
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(BROKER_LOCK_POLL_SECONDS)
+            try:
+                try:
+                    _, probe = await asyncio.open_unix_connection(self.path)
+                    probe.close()
+                    return True  # someone else just started one
+                except (FileNotFoundError, ConnectionRefusedError):
+                    pass
+                if os.path.exists(self.path):
+                    os.unlink(self.path)  # left behind by a broker that died
+                self._broker = await UnixSocketBroker(self.path, max_frame=self.max_frame).start()
+                print(f"✅ Started WebSocket backplane broker on {self.path}")
+                return True
+            except OSError as e:
+                print("❌ Failed to start backplane broker:", e)
+                return False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def publish(self, message: Dict):
+        if self._writer is None:
+            return
+        frame = json.dumps(message).encode()
+        if len(frame) > self.max_frame:
+            print(f"❌ Backplane event of {len(frame)} bytes is over the {self.max_frame} byte limit; not published")
+            return
+        try:
+            self._outbox.put_nowait(frame + b"\n")
+        except asyncio.QueueFull:
+            self.dropped_events += 1
+            if self.dropped_events % 100 == 1:
+                print(f"❌ Backplane broker is not keeping up; dropped {self.dropped_events} events so far")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._broker is not None:
+            await self._broker.stop()
+            self._broker = None
+
+def create_backplane(url: Optional[str]) -> Backplane:
+    """Build a backplane from WS_BACKPLANE_URL (memory:// or unix:///path)"""
+    if not url or url.startswith("memory://"):
+        return InMemoryBackplane((url or "")[len("memory://"):] or "default")
+    if url.startswith("unix://"):
+        return UnixSocketBackplane(url[len("unix://"):])
+    raise ValueError(f"Unsupported WS_BACKPLANE_URL: {url}")
+
+async def _serve(path: str):
+    broker = await UnixSocketBroker(path).start()
+    print(f"✅ WebSocket backplane broker listening on {path}")
+    await broker.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(_serve(sys.argv[1] if len(sys.argv) > 1 else "/tmp/telebharat-ws.sock"))
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# The manager imports the models, which need a URL; nothing connects here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.websocket.backplane import UnixSocketBackplane, WS_BACKPLANE_MAX_FRAME_BYTES
+from app.websocket.manager import ConnectionManager
+
+# Sent once every worker listens; the receivers finish when this arrives
+DONE_MARKER = "backplane-check-done"
+PATIENT_ID_BASE = 100
+DOCTOR_ID = 7
+
+class RecordingSocket:
+    """Stands in for a WebSocket and keeps what was sent to it"""
+
+    def __init__(self):
+        self.received: List[str] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.received.append(message)
+
+async def publish_events(manager: ConnectionManager, path: str, workers: int, large_bytes: int, max_frame: int):
+    for index in range(1, workers):
+        await manager.send_personal_message(f"personal-{index}", PATIENT_ID_BASE + index)
+    await manager.update_doctor_status(DOCTOR_ID, "busy")
+    # Over asyncio's default 64 KiB line limit, but under the backplane's
+    await manager.broadcast_to_type("large-" + "x" * large_bytes, "general")
+    # A frame over the limit, written straight to the broker as an older or
+    # misbehaving publisher would; it must be dropped without losing the stream
+    _, writer = await asyncio.open_unix_connection(path)
+    writer.write(json.dumps({"kind": "broadcast", "user_type": "general", "message": "y" * (max_frame + 1), "origin": "check"}).encode() + b"\n")
+    await writer.drain()
+    writer.close()
+    await asyncio.sleep(0.2)
+    await manager.broadcast_to_type(DONE_MARKER, "general")
+
+async def run_worker(index: int, workers: int, path: str, large_bytes: int, max_frame: int, barrier, timeout: float) -> Dict:
+    manager = ConnectionManager(backplane=UnixSocketBackplane(path, max_frame=max_frame))
+    manager.presence_flush_interval = 3600
+    await manager.start()
+    await asyncio.wait_for(manager.backplane.connected.wait(), timeout)
+    patient, general = RecordingSocket(), RecordingSocket()
+    await manager.connect(patient, "patients", PATIENT_ID_BASE + index)
+    await manager.connect(general, "general")
+
+    loop = asyncio.get_running_loop()
+    # Every worker is subscribed before anything is published
+    await loop.run_in_executor(None, barrier.wait)
+    await asyncio.sleep(0.2)
+    result = {"worker": index}
+    if index == 0:
+        await publish_events(manager, path, workers, large_bytes, max_frame)
+    else:
+        deadline = time.monotonic() + timeout
+        while DONE_MARKER not in general.received and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        result.update({
+            "personal": patient.received == [f"personal-{index}"],
+            "large": any(message == "large-" + "x" * large_bytes for message in general.received),
+            "oversized_dropped": not any(message.startswith("y") for message in general.received),
+            "after_oversized": DONE_MARKER in general.received,
+            "doctor_status": manager.get_doctor_status(DOCTOR_ID).get("status") == "busy",
+        })
+    # The worker that embedded the broker stays up until everyone has checked
+    await loop.run_in_executor(None, barrier.wait)
+    await manager.stop()
+    return result
+
+def worker_main(index: int, workers: int, path: str, large_bytes: int, max_frame: int, barrier, results, timeout: float):
+    # Keep the managers' connection chatter out of the report
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results.put(asyncio.run(run_worker(index, workers, path, large_bytes, max_frame, barrier, timeout)))
+    except Exception as e:
+        results.put({"worker": index, "error": repr(e)})
+        barrier.abort()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check events fan out across worker processes over the Unix-socket backplane")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--large-bytes", type=int, default=256 * 1024, help="size of the large broadcast")
+    parser.add_argument("--max-frame", type=int, default=min(WS_BACKPLANE_MAX_FRAME_BYTES, 1024 * 1024))
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    if args.workers < 2:
+        parser.error("--workers must be at least 2")
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "backplane.sock")
+        processes = [
+            context.Process(target=worker_main, args=(index, args.workers, path, args.large_bytes, args.max_frame, barrier, results, args.timeout))
+            for index in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        reports = [results.get(timeout=args.timeout * 3) for _ in processes]
+        for process in processes:
+            process.join(args.timeout)
+
+    failed = False
+    for report in sorted(reports, key=lambda report: report["worker"]):
+        if "error" in report:
+            print(f"❌ Worker {report['worker']} failed: {report['error']}")
+            failed = True
+            continue
+        if report["worker"] == 0:
+            continue
+        missing = [name for name, ok in report.items() if name != "worker" and not ok]
+        if missing:
+            print(f"❌ Worker {report['worker']}: {', '.join(missing)}")
+            failed = True
+        else:
+            print(f"✅ Worker {report['worker']} got the personal message, the large broadcast and the doctor status")
+    if failed:
+        return 1
+    print(f"✅ Events from worker 0 reached all {args.workers - 1} other workers")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
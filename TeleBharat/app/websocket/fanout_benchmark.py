@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+# The manager imports the models, which need a URL; nothing connects here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.websocket.manager import ConnectionManager
+
+USER_TYPES = ("doctors", "patients", "general")
+
+class Deliveries:
+    """Counts sends to the fast sockets and wakes the benchmark when all have arrived"""
+
+    def __init__(self):
+        self.count = 0
+        self.target = 0
+        self.arrived = asyncio.Event()
+
+    def expect(self, target: int):
+        self.target = target
+        self.arrived.clear()
+
+    def record(self):
+        self.count += 1
+        if self.count >= self.target:
+            self.arrived.set()
+
+class MockSocket:
+    """Stands in for a WebSocket; slow ones take ``delay`` seconds per send"""
+
+    def __init__(self, deliveries: Deliveries, delay: float = 0.0):
+        self.deliveries = deliveries
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            self.deliveries.record()
+        self.received += 1
+
+async def sequential(sockets: List[MockSocket], message: str) -> float:
+    """How broadcast_to_type used to send: one awaited send after another"""
+    started = time.perf_counter()
+    for socket in sockets:
+        await socket.send_text(message)
+    return time.perf_counter() - started
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def run(connections: int, slow_every: int, slow_delay: float, broadcasts: int) -> int:
+    deliveries = Deliveries()
+    sockets = [MockSocket(deliveries, slow_delay if index % slow_every == 0 else 0.0) for index in range(connections)]
+    fast = [socket for socket in sockets if not socket.delay]
+    slow = [socket for socket in sockets if socket.delay]
+    print(f"{connections} sockets, {len(slow)} of them slow ({slow_delay * 1000:.0f}ms per send), {broadcasts} broadcasts")
+
+    manager = ConnectionManager()
+    # Keep the manager's per-connection messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await manager.start()
+        for index, socket in enumerate(sockets):
+            await manager.connect(socket, USER_TYPES[index % len(USER_TYPES)], index + 1)
+
+    enqueue_times, delivery_times = [], []
+    for number in range(1, broadcasts + 1):
+        deliveries.expect(len(fast) * number)
+        started = time.perf_counter()
+        await manager.broadcast_to_all(f'{{"type": "announcement", "number": {number}}}')
+        enqueue_times.append(time.perf_counter() - started)
+        # Every fast socket has the message, however far behind the slow ones are
+        await deliveries.arrived.wait()
+        delivery_times.append(time.perf_counter() - started)
+    backlog = max(len(manager.writers[socket]) for socket in slow) if slow else 0
+    slow_received = min((socket.received for socket in slow), default=0)
+    missing = sum(socket.received != broadcasts for socket in fast)
+    dropped = manager.dropped_messages
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await manager.stop()
+
+    # The old loop, on a sample holding two slow sockets; its cost scales with the slow sends it meets
+    sample = sockets[:slow_every * 2]
+    before = await sequential(sample, "{}") * len(sockets) / len(sample)
+
+    print(f"{'':34} {'p50 ms':>9} {'p99 ms':>9}")
+    print(f"{'broadcast_to_all returns':34} {statistics.median(enqueue_times) * 1000:9.2f} {percentile(enqueue_times, 0.99) * 1000:9.2f}")
+    print(f"{'every fast socket has it':34} {statistics.median(delivery_times) * 1000:9.2f} {percentile(delivery_times, 0.99) * 1000:9.2f}")
+    print(f"{'sequential sends (before, est.)':34} {before * 1000:9.0f}")
+    print(f"Slow sockets: {slow_received} received, up to {backlog} still queued, {dropped} dropped")
+    if missing:
+        print(f"❌ {missing} fast sockets did not get every broadcast")
+        return 1
+    print(f"✅ {len(fast)} fast sockets got every broadcast in {statistics.median(delivery_times) * 1000:.1f}ms at the median")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time broadcasts to many mock sockets when a few are slow")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--slow-every", type=int, default=100, help="one socket in this many is slow")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="seconds a slow socket takes per send")
+    parser.add_argument("--broadcasts", type=int, default=20)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args.connections, args.slow_every, args.slow_delay, args.broadcasts))
+
+if __name__ == "__main__":
+    sys.exit(main())
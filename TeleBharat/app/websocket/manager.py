@@ -1,96 +1,228 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import Dict, List, Optional, Set
 import json
+import os
+import time
+import uuid
 from datetime import datetime
 import asyncio
+from app.monitoring.metrics import broadcast_fanout_duration
+from app.models.appointment import Appointment, AppointmentStatus
+from app.scheduling.conflict_index import scheduler
+from app.websocket.backplane import Backplane, create_backplane
+from app.websocket.outbox import ConnectionWriter
+from app.websocket.presence import PresenceService, PRESENCE_FLUSH_INTERVAL_SECONDS
+
+# memory:// (single worker) or unix:///path/to.sock to fan out across workers
+WS_BACKPLANE_URL = os.getenv("WS_BACKPLANE_URL")
 
 class ConnectionManager:
-    def __init__(self):
-        # Store active connections by user type and ID
-        self.active_connections: Dict[str, List[WebSocket]] = {
-            "doctors": [],
-            "patients": [],
-            "general": []
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # Store active connections by user type (sets give O(1) add and remove)
+        self.active_connections: Dict[str, Set[WebSocket]] = {
+            "doctors": set(),
+            "patients": set(),
+            "general": set()
         }
-        # Store user-specific connections
-        self.user_connections: Dict[int, WebSocket] = {}
-        # Store doctor status
-        self.doctor_status: Dict[int, Dict] = {}
+        # Store user-specific connections - one user may have several devices/tabs open
+        self.user_connections: Dict[int, Set[WebSocket]] = {}
+        # Doctor presence; changes go out as one batch per flush interval
+        self.presence = PresenceService()
+        self.presence_flush_interval = PRESENCE_FLUSH_INTERVAL_SECONDS
+        self._presence_task: Optional[asyncio.Task] = None
+        # Every socket gets a bounded outbound queue drained by its own task
+        self.writers: Dict[WebSocket, ConnectionWriter] = {}
+        self.dropped_messages = 0
+        # Events from other workers arrive through the backplane
+        self.worker_id = uuid.uuid4().hex
+        self.backplane = backplane or create_backplane(WS_BACKPLANE_URL)
+    
+    async def start(self):
+        """Subscribe to events published by other workers and start presence flushing"""
+        await self.backplane.start(self._handle_backplane_message)
+        self._presence_task = asyncio.create_task(self._run_presence())
+    
+    async def stop(self):
+        if self._presence_task is not None:
+            self._presence_task.cancel()
+            try:
+                await self._presence_task
+            except asyncio.CancelledError:
+                pass
+            self._presence_task = None
+        await self.backplane.stop()
+    
+    async def _publish(self, event: Dict):
+        await self.backplane.publish({**event, "origin": self.worker_id})
+    
+    async def _handle_backplane_message(self, event: Dict):
+        """Apply an event published by another worker to local connections"""
+        if event.get("origin") == self.worker_id:
+            return
+        kind = event.get("kind")
+        if kind == "personal":
+            await self._send_personal_local(event["message"], event["user_id"])
+        elif kind == "broadcast":
+            if event.get("user_type"):
+                await self._broadcast_to_type_local(event["message"], event["user_type"])
+            else:
+                await self._broadcast_to_all_local(event["message"])
+        elif kind == "presence":
+            self.presence.set_status(event["doctor_id"], event["status"], event["last_updated"])
+        elif kind == "presence_heartbeat":
+            self.presence.heartbeat(event["doctor_ids"])
+        elif kind == "schedule_invalidate":
+            for doctor_id in event["doctor_ids"]:
+                scheduler.invalidate(doctor_id)
+        elif kind == "schedule_sync":
+            scheduler.sync_row(
+                event["doctor_id"], event["appointment_id"], datetime.fromisoformat(event["appointment_date"]),
+                event["duration_minutes"], AppointmentStatus(event["status"])
+            )
     
     async def connect(self, websocket: WebSocket, user_type: str = "general", user_id: int = None):
         await websocket.accept()
         
+        writer = ConnectionWriter(websocket, user_type, user_id, self._remove_connection, self._count_dropped)
+        self.writers[websocket] = writer
+        writer.start()
+        
         # Add to general connections
         if user_type in self.active_connections:
-            self.active_connections[user_type].append(websocket)
+            self.active_connections[user_type].add(websocket)
         
-        # Store user-specific connection
+        # Store user-specific connection alongside any other sessions of the same user
         if user_id:
-            self.user_connections[user_id] = websocket
+            self.user_connections.setdefault(user_id, set()).add(websocket)
             
         print(f"New {user_type} connection established. User ID: {user_id}")
     
     def disconnect(self, websocket: WebSocket, user_type: str = "general", user_id: int = None):
+        writer = self.writers.get(websocket)
+        if writer is not None:
+            # Stops the writer task, which then removes the connection
+            writer.close()
+        else:
+            self._forget(websocket, user_type, user_id)
+            
+        print(f"{user_type} connection closed. User ID: {user_id}")
+    
+    def _remove_connection(self, writer: ConnectionWriter):
+        self._forget(writer.websocket, writer.user_type, writer.user_id)
+    
+    def _forget(self, websocket: WebSocket, user_type: str, user_id: int = None):
+        self.writers.pop(websocket, None)
+        
         # Remove from general connections
         if user_type in self.active_connections:
-            if websocket in self.active_connections[user_type]:
-                self.active_connections[user_type].remove(websocket)
+            self.active_connections[user_type].discard(websocket)
         
-        # Remove user-specific connection
-        if user_id and user_id in self.user_connections:
-            del self.user_connections[user_id]
-            
-        print(f"{user_type} connection closed. User ID: {user_id}")
+        # Remove this session only; the user's other sockets stay live
+        sessions = self.user_connections.get(user_id) if user_id else None
+        if sessions is not None:
+            sessions.discard(websocket)
+            if not sessions:
+                del self.user_connections[user_id]
+    
+    def _count_dropped(self, count: int):
+        self.dropped_messages += count
+    
+    def is_connected(self, user_id: int) -> bool:
+        """Whether the user still has at least one open socket on this worker"""
+        return user_id in self.user_connections
     
     async def send_personal_message(self, message: str, user_id: int):
-        """Send message to specific user"""
-        if user_id in self.user_connections:
-            websocket = self.user_connections[user_id]
-            try:
-                await websocket.send_text(message)
-            except:
-                # Connection might be closed, remove it
-                del self.user_connections[user_id]
+        """Send message to specific user, wherever they are connected"""
+        await self._send_personal_local(message, user_id)
+        await self._publish({"kind": "personal", "user_id": user_id, "message": message})
+    
+    async def _send_personal_local(self, message: str, user_id: int):
+        # Queued on every session at once; each writer task sends independently
+        for websocket in list(self.user_connections.get(user_id, ())):
+            writer = self.writers.get(websocket)
+            if writer is not None:
+                writer.enqueue(message)
     
     async def broadcast_to_type(self, message: str, user_type: str):
         """Broadcast message to all users of a specific type"""
+        await self._broadcast_to_type_local(message, user_type)
+        await self._publish({"kind": "broadcast", "user_type": user_type, "message": message})
+    
+    async def _broadcast_to_type_local(self, message: str, user_type: str):
+        # Only queues the already-encoded message; writer tasks do the sends
+        # concurrently and drop themselves when their connection dies
         if user_type in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_type]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    disconnected.append(connection)
-            
-            # Remove disconnected connections
-            for conn in disconnected:
-                self.active_connections[user_type].remove(conn)
+            started = time.perf_counter()
+            for connection in list(self.active_connections[user_type]):
+                writer = self.writers.get(connection)
+                if writer is not None:
+                    writer.enqueue(message)
+            broadcast_fanout_duration.observe(time.perf_counter() - started, user_type)
     
     async def broadcast_to_all(self, message: str):
         """Broadcast message to all connected users"""
+        await self._broadcast_to_all_local(message)
+        await self._publish({"kind": "broadcast", "user_type": None, "message": message})
+    
+    async def _broadcast_to_all_local(self, message: str):
         for user_type in self.active_connections:
-            await self.broadcast_to_type(message, user_type)
+            await self._broadcast_to_type_local(message, user_type)
     
     async def update_doctor_status(self, doctor_id: int, status: str):
-        """Update doctor status and notify all connected users"""
-        self.doctor_status[doctor_id] = {
-            "status": status,
-            "last_updated": datetime.utcnow().isoformat()
-        }
-        
-        # Broadcast status update
-        status_message = {
-            "type": "doctor_status_update",
-            "doctor_id": doctor_id,
-            "status": status,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        await self.broadcast_to_all(json.dumps(status_message))
+        """Update doctor status; clients hear about it in the next presence batch"""
+        last_updated = time.time()
+        self.presence.set_status(doctor_id, status, last_updated)
+        # Other workers update their copy of the status and batch it for their clients
+        await self._publish({"kind": "presence", "doctor_id": doctor_id, "status": status, "last_updated": last_updated})
+    
+    def doctor_heartbeat(self, doctor_id: int):
+        """Keep a doctor's current status from expiring"""
+        self.presence.heartbeat([doctor_id])
     
     def get_doctor_status(self, doctor_id: int) -> Dict:
         """Get current status of a doctor"""
-        return self.doctor_status.get(doctor_id, {"status": "offline", "last_updated": None})
+        return self.presence.get(doctor_id)
+    
+    def get_doctor_statuses(self, doctor_ids: List[int]) -> Dict[int, Dict]:
+        """Get current status of many doctors in one call"""
+        return self.presence.get_many(doctor_ids)
+    
+    def _local_doctor_ids(self) -> Set[int]:
+        ids = set()
+        for websocket in self.active_connections["doctors"]:
+            writer = self.writers.get(websocket)
+            if writer is not None and writer.user_id:
+                ids.add(writer.user_id)
+        return ids
+    
+    async def flush_presence(self):
+        """Broadcast every presence change since the last flush as one message"""
+        changes = self.presence.drain_changes()
+        if not changes:
+            return
+        await self._broadcast_to_all_local(json.dumps({
+            "type": "doctor_status_batch",
+            "updates": changes,
+            "timestamp": datetime.utcnow().isoformat()
+        }))
+    
+    async def _run_presence(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.presence_flush_interval)
+            try:
+                # Doctors with a live socket here stay online; tell the other
+                # workers so they don't expire them
+                if time.monotonic() - last_heartbeat >= self.presence.ttl / 3:
+                    last_heartbeat = time.monotonic()
+                    doctor_ids = self._local_doctor_ids()
+                    if doctor_ids:
+                        self.presence.heartbeat(doctor_ids)
+                        await self._publish({"kind": "presence_heartbeat", "doctor_ids": sorted(doctor_ids)})
+                self.presence.expire()
+                await self.flush_presence()
+            except Exception as e:
+                print("❌ Presence flush failed:", e)
     
     async def notify_appointment_update(self, appointment_data: Dict, action: str):
         """Notify relevant users about appointment updates"""
@@ -114,5 +246,35 @@ class ConnectionManager:
                 appointment_data["doctor_id"]
             )
 
+    async def publish_schedule_change(self, appointment: Appointment):
+        """Mirror a committed create, reschedule or cancel into the other workers' conflict indexes"""
+        await self._publish({
+            "kind": "schedule_sync",
+            "doctor_id": appointment.doctor_id,
+            "appointment_id": appointment.id,
+            "appointment_date": appointment.appointment_date.isoformat(),
+            "duration_minutes": appointment.duration_minutes,
+            "status": appointment.status.value
+        })
+
+    async def invalidate_schedules(self, doctor_ids: List[int]):
+        """Make other workers reload these doctors' conflict indexes after a bulk write"""
+        await self._publish({"kind": "schedule_invalidate", "doctor_ids": doctor_ids})
+    
+    async def notify_appointments_imported(self, appointments: List[Dict]):
+        """Send one coalesced message per patient and doctor for a batch of new appointments"""
+        by_user: Dict[int, List[int]] = {}
+        for appointment in appointments:
+            by_user.setdefault(appointment["patient_id"], []).append(appointment["id"])
+            by_user.setdefault(appointment["doctor_id"], []).append(appointment["id"])
+        timestamp = datetime.utcnow().isoformat()
+        for user_id, appointment_ids in by_user.items():
+            await self.send_personal_message(json.dumps({
+                "type": "appointments_imported",
+                "message": f"{len(appointment_ids)} appointments have been added",
+                "data": {"appointment_ids": appointment_ids},
+                "timestamp": timestamp
+            }), user_id)
+
 # Global connection manager instance
 manager = ConnectionManager()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from collections import deque
+from typing import Callable, Deque, Optional
+from fastapi import WebSocket
+
+# Outbound queue tuning - override through environment variables
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+# What to do when a client's queue is full:
+#   drop_oldest - discard the oldest queued message (default)
+#   drop_newest - discard the message being queued
+#   disconnect  - close the slow connection
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+class ConnectionWriter:
+    """Bounded outbound queue for one WebSocket, drained by its own task.
+
+    ``enqueue`` never awaits, so a broadcast costs one queue append per
+    socket and a slow client only ever delays itself.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_type: str,
+        user_id: Optional[int],
+        on_close: Callable[["ConnectionWriter"], None],
+        on_drop: Optional[Callable[[int], None]] = None,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.user_type = user_type
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.closed = False
+        self._on_close = on_close
+        self._on_drop = on_drop
+        self._queue: Deque[str] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain())
+
+    def __len__(self):
+        return len(self._queue)
+
+    def enqueue(self, message: str) -> bool:
+        """Queue a message without waiting; returns False if it was not queued"""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                self._record_drop(len(self._queue) + 1)
+                self._abort()
+                return False
+            if self.policy == "drop_newest":
+                self._record_drop(1)
+                return False
+            self._queue.popleft()
+            self._record_drop(1)
+        self._queue.append(message)
+        self._wakeup.set()
+        return True
+
+    def _record_drop(self, count: int):
+        self.dropped += count
+        if self._on_drop is not None:
+            self._on_drop(count)
+
+    async def _drain(self):
+        while not self.closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            message = self._queue.popleft()
+            # asyncio.wait rather than wait_for: wait_for can swallow a
+            # cancellation that races with the send finishing
+            send = asyncio.ensure_future(self.websocket.send_text(message))
+            try:
+                done, _ = await asyncio.wait((send,), timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                send.cancel()
+                raise
+            if not done:
+                send.cancel()
+            if not done or send.exception() is not None:
+                # Dead or stalled connection - stop writing and let the manager forget it
+                self._abort()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._on_close(self)
+
+    def _abort(self):
+        """Close because the client cannot keep up, and tell it so"""
+        self.close()
+        asyncio.ensure_future(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=1013)  # try again later
+        except Exception:
+            pass
@@ -0,0 +1,103 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+# Presence tuning - override through environment variables
+PRESENCE_TTL_SECONDS = float(os.getenv("PRESENCE_TTL_SECONDS", "60"))
+PRESENCE_FLUSH_INTERVAL_SECONDS = float(os.getenv("PRESENCE_FLUSH_INTERVAL_SECONDS", "0.5"))
+
+OFFLINE = "offline"
+
+class DoctorPresence:
+    """Compact presence record for one doctor"""
+    __slots__ = ("status", "last_updated", "expires_at")
+
+    def __init__(self, status: str, last_updated: float, expires_at: float):
+        self.status = status
+        self.last_updated = last_updated  # wall-clock epoch seconds
+        self.expires_at = expires_at      # monotonic deadline
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "last_updated": datetime.utcfromtimestamp(self.last_updated).isoformat()
+        }
+
+class PresenceService:
+    """Doctor presence with heartbeat expiry and batched change tracking.
+
+    A status stays valid for ``ttl`` seconds unless refreshed by a heartbeat,
+    so doctors whose worker died fall back to offline on their own. Offline
+    records are kept for one more ``ttl`` so clients can see when the doctor
+    left, then dropped, which keeps the table bounded by recently active
+    doctors. Changes accumulate in a dirty set that ``drain_changes`` hands
+    out once per flush interval, instead of one broadcast per change.
+    """
+
+    def __init__(self, ttl: float = PRESENCE_TTL_SECONDS):
+        self.ttl = ttl
+        self._states: Dict[int, DoctorPresence] = {}
+        self._dirty: Set[int] = set()
+
+    def __len__(self):
+        return len(self._states)
+
+    def set_status(self, doctor_id: int, status: str, last_updated: Optional[float] = None) -> bool:
+        """Record a status; returns True if it differs from the current one"""
+        now = time.monotonic()
+        last_updated = last_updated if last_updated is not None else time.time()
+        state = self._states.get(doctor_id)
+        if state is not None and state.last_updated > last_updated:
+            return False  # an out-of-order update from another worker
+        changed = state is None or state.status != status
+        if state is None:
+            self._states[doctor_id] = DoctorPresence(status, last_updated, now + self.ttl)
+        else:
+            state.status = status
+            state.last_updated = last_updated
+            state.expires_at = now + self.ttl
+        if changed:
+            self._dirty.add(doctor_id)
+        return changed
+
+    def heartbeat(self, doctor_ids: Iterable[int]):
+        """Extend the expiry of doctors that are still online"""
+        deadline = time.monotonic() + self.ttl
+        for doctor_id in doctor_ids:
+            state = self._states.get(doctor_id)
+            if state is not None and state.status != OFFLINE:
+                state.expires_at = deadline
+
+    def expire(self):
+        """Mark timed-out doctors offline and drop old offline records"""
+        now = time.monotonic()
+        for doctor_id, state in list(self._states.items()):
+            if state.expires_at > now:
+                continue
+            if state.status == OFFLINE:
+                del self._states[doctor_id]
+            else:
+                state.status = OFFLINE
+                state.last_updated = time.time()
+                state.expires_at = now + self.ttl
+                self._dirty.add(doctor_id)
+
+    def drain_changes(self) -> List[Dict]:
+        """Return and clear the changes since the previous call"""
+        changes = []
+        for doctor_id in self._dirty:
+            state = self._states.get(doctor_id)
+            if state is not None:
+                changes.append({"doctor_id": doctor_id, **state.to_dict()})
+        self._dirty.clear()
+        return changes
+
+    def get(self, doctor_id: int) -> Dict:
+        state = self._states.get(doctor_id)
+        if state is None:
+            return {"status": OFFLINE, "last_updated": None}
+        return state.to_dict()
+
+    def get_many(self, doctor_ids: Iterable[int]) -> Dict[int, Dict]:
+        return {doctor_id: self.get(doctor_id) for doctor_id in doctor_ids}
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+# The manager imports the models, which need a URL; nothing connects here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.websocket.manager import ConnectionManager
+from app.websocket.presence import OFFLINE, PRESENCE_FLUSH_INTERVAL_SECONDS, PresenceService
+
+class ListenerSocket:
+    """Stands in for a dashboard WebSocket and keeps the presence batches it gets"""
+
+    def __init__(self):
+        self.batches: List[tuple] = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        event = json.loads(message)
+        if event.get("type") == "doctor_status_batch":
+            self.batches.append((time.monotonic(), event["updates"]))
+
+async def run(doctors: int, listeners: int, changes: int, ttl: float, interval: float) -> int:
+    manager = ConnectionManager()
+    manager.presence.ttl = ttl
+    manager.presence_flush_interval = interval
+    sockets = [ListenerSocket() for _ in range(listeners)]
+    failures = []
+    # Keep the manager's per-connection messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await manager.start()
+        for index, socket in enumerate(sockets):
+            await manager.connect(socket, "general", 1_000_000 + index)
+
+        # Batching: every doctor changes status ``changes`` times within one second
+        changed_at: Dict[int, float] = {}
+        started = time.monotonic()
+        for step in range(changes):
+            for doctor_id in range(1, doctors + 1):
+                await manager.update_doctor_status(doctor_id, "busy" if step % 2 else "online")
+                changed_at[doctor_id] = time.monotonic()
+            await asyncio.sleep(max(0.0, started + (step + 1) / changes - time.monotonic()))
+        await asyncio.sleep(interval * 2)
+        batching_messages = len(sockets[0].batches)
+        # How long after a doctor's last change a listener saw it
+        delays = [
+            received - changed_at[update["doctor_id"]]
+            for received, updates in sockets[0].batches for update in updates
+            if received >= changed_at[update["doctor_id"]]
+        ]
+        last_seen = {update["doctor_id"]: update["status"] for _, updates in sockets[0].batches for update in updates}
+        expected = "busy" if (changes - 1) % 2 else "online"
+        if any(last_seen.get(doctor_id) != expected for doctor_id in range(1, doctors + 1)):
+            failures.append("a listener's last batch does not hold every doctor's final status")
+
+        # Expiry: half the doctors keep sending heartbeats, the rest go quiet
+        quiet_from = time.monotonic()
+        offline_at: Dict[int, float] = {}
+        for socket in sockets:
+            socket.batches.clear()
+        while time.monotonic() - quiet_from < ttl + interval * 3:
+            manager.presence.heartbeat(range(2, doctors + 1, 2))
+            await asyncio.sleep(interval / 2)
+        for received, updates in sockets[0].batches:
+            for update in updates:
+                if update["status"] == OFFLINE:
+                    offline_at.setdefault(update["doctor_id"], received - changed_at[update["doctor_id"]])
+        expired = [offline_at.get(doctor_id) for doctor_id in range(1, doctors + 1, 2)]
+        kept = [doctor_id for doctor_id in range(2, doctors + 1, 2) if manager.get_doctor_status(doctor_id)["status"] == OFFLINE]
+        if None in expired:
+            failures.append(f"{expired.count(None)} quiet doctors were never reported offline")
+        if kept:
+            failures.append(f"{len(kept)} doctors with heartbeats were marked offline")
+        await manager.stop()
+
+    # The cost of one expiry sweep and one flush over a large presence table
+    presence = PresenceService(ttl=0)
+    for doctor_id in range(1, doctors * 100 + 1):
+        presence.set_status(doctor_id, "online")
+    presence.drain_changes()
+    started = time.perf_counter()
+    presence.expire()
+    sweep = time.perf_counter() - started
+    started = time.perf_counter()
+    presence.drain_changes()
+    drain = time.perf_counter() - started
+
+    total_changes = doctors * changes
+    print(f"{doctors} doctors, {listeners} listeners, TTL {ttl:g}s, flush every {interval * 1000:.0f}ms")
+    print(f"Batching: {total_changes} changes in 1s reached each listener as {batching_messages} messages "
+          f"(one per change would be {total_changes})")
+    if delays:
+        print(f"  change to listener: p50 {statistics.median(delays) * 1000:.0f}ms, max {max(delays) * 1000:.0f}ms")
+    reported = [delay for delay in expired if delay is not None]
+    if reported:
+        print(f"Expiry: quiet doctors reported offline {min(reported):.2f}-{max(reported):.2f}s after their last update; "
+              f"{doctors // 2} with heartbeats stayed online")
+    print(f"Sweep over {doctors * 100} records: expire {sweep * 1000:.1f}ms, drain_changes {drain * 1000:.1f}ms")
+    if delays and max(delays) > interval * 2:
+        failures.append(f"a change took {max(delays) * 1000:.0f}ms to reach listeners, over two flush intervals")
+    if reported and max(reported) > ttl + interval * 2:
+        failures.append(f"a quiet doctor was reported offline after {max(reported):.2f}s, over TTL plus two flush intervals")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Changes arrive in batches within a flush interval and quiet doctors expire on time")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check presence batching and heartbeat expiry with mock dashboard sockets")
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--listeners", type=int, default=1000)
+    parser.add_argument("--changes", type=int, default=10, help="status changes per doctor, spread over one second")
+    parser.add_argument("--ttl", type=float, default=2.0, help="presence TTL in seconds")
+    parser.add_argument("--interval", type=float, default=PRESENCE_FLUSH_INTERVAL_SECONDS, help="flush interval in seconds")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args.doctors, args.listeners, args.changes, args.ttl, args.interval))
+
+if __name__ == "__main__":
+    sys.exit(main())
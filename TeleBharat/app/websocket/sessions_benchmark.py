@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import List, Optional
+
+# The manager imports the models, which need a URL; nothing connects here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.websocket.manager import ConnectionManager
+
+USER_TYPES = ("doctors", "patients", "general")
+
+class MockSocket:
+    """Stands in for a WebSocket and counts what it was sent"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        self.received += 1
+
+def user_of(index: int, sessions: int) -> int:
+    return index // sessions + 1
+
+async def connect_all(manager: ConnectionManager, sockets: List[MockSocket], sessions: int):
+    for index, socket in enumerate(sockets):
+        await manager.connect(socket, USER_TYPES[user_of(index, sessions) % len(USER_TYPES)], user_of(index, sessions))
+
+async def settle():
+    """Let the writer tasks send everything queued so far"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+async def memory_per_connection(connections: int, sessions: int) -> float:
+    """Bytes each connection adds to the manager, its writer, queue and task included"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        manager = ConnectionManager()
+        sockets = [MockSocket() for _ in range(connections)]
+        before = tracemalloc.get_traced_memory()[0]
+        await connect_all(manager, sockets, sessions)
+        await settle()
+        gc.collect()
+        return (tracemalloc.get_traced_memory()[0] - before) / connections
+    finally:
+        tracemalloc.stop()
+
+async def run(connections: int, sessions: int) -> int:
+    users = user_of(connections - 1, sessions)
+    print(f"{connections} connections, {sessions} sessions per user, {users} users")
+    manager = ConnectionManager()
+    sockets = [MockSocket() for _ in range(connections)]
+    failures = []
+    # Keep the manager's per-connection messages out of the report
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        started = time.perf_counter()
+        await connect_all(manager, sockets, sessions)
+        connect_time = (time.perf_counter() - started) / connections
+        await settle()
+
+        started = time.perf_counter()
+        for user_id in range(1, users + 1):
+            manager.is_connected(user_id)
+        lookup_time = (time.perf_counter() - started) / users
+
+        started = time.perf_counter()
+        for user_id in range(1, users + 1):
+            await manager.send_personal_message("{}", user_id)
+        personal_time = (time.perf_counter() - started) / users
+        await settle()
+        if any(socket.received != 1 for socket in sockets):
+            failures.append("a personal message missed one of the user's sessions")
+
+        # Close every user's first session, as when one tab of several is closed
+        closing = [(index, socket) for index, socket in enumerate(sockets) if index % sessions == 0]
+        started = time.perf_counter()
+        for index, socket in closing:
+            user_id = user_of(index, sessions)
+            manager.disconnect(socket, USER_TYPES[user_id % len(USER_TYPES)], user_id)
+        disconnect_time = (time.perf_counter() - started) / len(closing)
+        await settle()
+        still_connected = sum(manager.is_connected(user_id) for user_id in range(1, users + 1))
+        if still_connected != (users if sessions > 1 else 0):
+            failures.append(f"{still_connected} of {users} users still connected after closing one session each")
+        if len(manager.writers) != connections - len(closing):
+            failures.append(f"{len(manager.writers)} writers left, expected {connections - len(closing)}")
+
+        for socket in list(manager.writers):
+            manager.writers[socket].close()
+        await settle()
+        memory = await memory_per_connection(connections, sessions)
+
+    print(f"{'connect':26} {connect_time * 1e6:8.2f}us per socket")
+    print(f"{'is_connected':26} {lookup_time * 1e9:8.0f}ns per user")
+    print(f"{'send_personal_message':26} {personal_time * 1e6:8.2f}us per user ({sessions} sessions)")
+    print(f"{'disconnect one session':26} {disconnect_time * 1e6:8.2f}us per socket")
+    print(f"{'memory':26} {memory / 1024:8.2f}KB per connection, {memory * connections / 1024 ** 2:.1f}MB in all")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Every session got its messages and closing one left the others connected")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Connect many mock WebSocket sessions and time lookups, sends and disconnects")
+    parser.add_argument("--connections", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=2, help="sessions (tabs or devices) per user")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args.connections, args.sessions))
+
+if __name__ == "__main__":
+    sys.exit(main())